@@ -0,0 +1,65 @@
+import queue
+import threading
+
+# ============================================================================================================================================================
+# Classe: BackgroundJob
+# Descrição: Executa uma função (um algoritmo, um benchmark ou uma comparação) numa thread à parte, para o loop do Pygame
+# continuar a desenhar e a processar eventos. A função recebe o callback progress(passo, total, melhor_custo), que mete
+# o progresso numa fila e devolve True quando foi pedido o cancelamento (os algoritmos param nesse caso).
+#
+# O loop principal chama poll() em cada frame: esvazia a fila, atualiza o último progresso e indica se a tarefa acabou.
+# No fim, result tem o valor devolvido pela função ou error a exceção que ela lançou.
+# ============================================================================================================================================================
+
+class BackgroundJob:
+
+    def __init__(self, label, target, *args, **kwargs):
+        self.label = label
+        self.step = 0
+        self.total = None
+        self.best_cost = None
+        self.result = None
+        self.error = None
+
+        self._queue = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(target, args, kwargs), daemon=True)
+        self._thread.start()
+
+    def _run(self, target, args, kwargs):
+        try:
+            self.result = target(*args, progress=self.report, **kwargs)
+        except Exception as e:
+            self.error = e
+
+    # Chamado pela thread da tarefa
+    def report(self, step, total, best_cost):
+        self._queue.put((step, total, best_cost))
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    # Chamado pelo loop principal: devolve True quando a tarefa terminou
+    def poll(self):
+        while True:
+            try:
+                self.step, self.total, best_cost = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if best_cost is not None:
+                self.best_cost = best_cost
+        return not self._thread.is_alive()
+
+    # Texto de estado para a interface
+    def status_text(self):
+        text = f"{self.label}: {'cancelling...' if self.cancelled else 'running'}"
+        if self.total:
+            text += f" {self.step}/{self.total}"
+        if self.best_cost is not None:
+            text += f" | best cost {round(self.best_cost, 2)}"
+        return text
@@ -1,76 +1,196 @@
 import os
-import matplotlib.pyplot as plt
+import json
+import time
+import random
+import tracemalloc
+import platform
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 import Project1.seater as seater
 import Project1.file_handler as file_handler
+import Project1.plotting as plotting
+import Project1.problem as problem_model
+import Project1.exact as exact
 
-def run_benchmark(guests, params, algorithm, n_runs=10, benchmark_folder=None):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    if benchmark_folder is None:
-        benchmark_folder = os.path.join("benchmarks", f"benchmark_{timestamp}_{algorithm.replace(' ', '_').lower()}")
-    
-    os.makedirs(benchmark_folder, exist_ok=True)
+try:
+    import resource     # Só existe em sistemas Unix (pico de memória das corridas)
+except ImportError:
+    resource = None
+
+# ========================================================================================================================================================
+# Função: run_single_benchmark
+# Descrição: Executa uma única corrida de um algoritmo (com a semente indicada, num gerador próprio da corrida) e guarda o
+# seating.txt na pasta da corrida. Devolve o registo da corrida (ver run_record), com o custo e o score.
+# Os gráficos de cada corrida só são gerados com plot_runs=True (o matplotlib pesa muito em corridas curtas).
+# Com measure_memory=True o pico de memória da própria corrida é medido com o tracemalloc (alocações Python e NumPy entre
+# o início e o fim do solve). O tracemalloc torna as corridas várias vezes mais lentas, por isso os tempos dessas corridas
+# não são comparáveis com os das outras: a medição é opcional e desligada por omissão.
+# É uma função de topo para poder ser executada pelos processos do ProcessPoolExecutor.
+# ========================================================================================================================================================
+
+def run_single_benchmark(guests, params, algorithm, run_folder, seed, plot_runs=False, measure_memory=False):
+
+    os.makedirs(run_folder, exist_ok=True)
+    problem = problem_model.as_problem(guests)
+
+    peak_memory_kb = None
+    if measure_memory:
+        tracemalloc.start()
+    try:
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        tables, metrics = seater.solve(problem, algorithm, dict(params, seed=seed))
+        wall_time, cpu_time = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+        if measure_memory:
+            peak_memory_kb = tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        if measure_memory:
+            tracemalloc.stop()
+    if plot_runs:
+        plotting.plot_metrics(metrics, save_dir=run_folder)
+
+    cost = seater.calculate_cost(problem_model.encode_tables(tables, problem), problem)
+    score = -cost
+    perfect_score = seater.calculate_theoretical_perfect_score(problem)
+
+    file_handler.write_seating_arrangement(
+        tables,
+        filename=os.path.join(run_folder, "seating.txt"),
+        current_score=score,
+        perfect_score=perfect_score,
+        algorithm=algorithm
+    )
+
+    return run_record(algorithm, run_folder, seed, params, metrics, cost, score, wall_time, cpu_time, peak_memory_kb)
+
+# ========================================================================================================================================================
+# Função: run_record
+# Descrição: Registo de uma corrida para o results.jsonl (uma linha JSON por corrida, ver write_run_records / load_results):
+#   - cost / score, stop_reason (sem % do score perfeito, que quase nunca é atingível: a referência de qualidade é a do
+#     branch and bound, ver compute_reference, e só existe em listas minúsculas)
+#   - wall_time e cpu_time (segundos do solve; o CPU é o da thread da corrida, sem os processos de réplicas / ilhas)
+#   - evaluations (soluções ou movimentos avaliados pelo algoritmo) e evaluations_per_second
+#   - steps_to_best / time_to_best: passo e tempo da última melhoria (ver seater.SearchBudget)
+#   - peak_memory_kb: pico de memória alocada pela corrida (tracemalloc), só com measure_memory=True (senão None)
+#   - process_peak_memory_kb: pico de memória residente do processo desde o arranque (ru_maxrss, None fora de Unix). É o
+#     máximo do processo, não da corrida: inclui as corridas anteriores no mesmo processo, a interface e os dados carregados
+#   - seed, params (só os valores simples) e machine (host, plataforma, Python e número de cores)
+# ========================================================================================================================================================
+
+def run_record(algorithm, run_folder, seed, params, metrics, cost, score, wall_time, cpu_time, peak_memory_kb=None):
+    trace = metrics.get('trace') or {'step': [None], 'time': [None]}
+    evaluations = metrics.get('evaluations')
+    return {
+        'timestamp': datetime.now().isoformat(timespec="seconds"),
+        'algorithm': algorithm,
+        'folder': run_folder,
+        'seed': seed,
+        'cost': float(cost),
+        'score': float(score),
+        'stop_reason': metrics.get('stop_reason'),
+        'wall_time': wall_time,
+        'cpu_time': cpu_time,
+        'evaluations': evaluations,
+        'evaluations_per_second': evaluations / wall_time if evaluations is not None and wall_time > 0 else None,
+        'steps_to_best': trace['step'][-1],
+        'time_to_best': trace['time'][-1],
+        'peak_memory_kb': peak_memory_kb,
+        'process_peak_memory_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else None,
+        'params': {key: value for key, value in params.items() if isinstance(value, (int, float, str, bool, type(None)))},
+        'machine': {
+            'host': platform.node(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count()
+        }
+    }
+
+# ========================================================================================================================================================
+# Função: execute_runs
+# Descrição: Executa uma lista de corridas (algoritmo, pasta, semente) ou (algoritmo, pasta, semente, parâmetros), em que os
+# parâmetros da corrida substituem os de params (ex.: {'crossover': "gpx"}). Com workers=1 corre tudo neste processo;
+# caso contrário distribui as corridas por um pool de processos (workers=None usa todos os cores).
+# Devolve os registos das corridas (ver run_record) pela mesma ordem das corridas.
+# progress(corridas_feitas, total, melhor_custo) é chamado no fim de cada corrida; se devolver True as corridas que
+# ainda não começaram são canceladas (as que já estão a correr terminam) e é lançado um ValueError.
+# ========================================================================================================================================================
 
-    best_costs = []
-    scores = []
-    folders = []
-
-    for i in range(n_runs):
-        print(f"[{algorithm}] Benchmark Run {i+1}/{n_runs}")
-        
-        run_folder = os.path.join(benchmark_folder, f"run_{i+1}")
-        os.makedirs(run_folder, exist_ok=True)
-
-        if algorithm == "Simulated Annealing":
-            tables = seater.simulated_annealing(
-                guests=guests,
-                initial_temperature=params["initial_temperature"],
-                cooling_rate=params["cooling_rate"],
-                iterations=params["iterations"],
-                cooling_type=params["cooling_type"],
-                min_per_table=params["min_per_table"],
-                max_per_table=params["max_per_table"],
-                output_folder=run_folder
-            )
-        elif algorithm == "Genetic Algorithm":
-            tables = seater.genetic_algorithm(
-                guests=guests,
-                min_per_table=params["min_per_table"],
-                max_per_table=params["max_per_table"],
-                generations=params["iterations"],
-                mutation_rate=params["mutation_rate"],
-                population_size=params["population_size"],
-                output_folder=run_folder
-            )
-        elif algorithm == "Hill Climbing":
-            tables = seater.hill_climbing(
-                guests=guests,
-                min_per_table=params["min_per_table"],
-                max_per_table=params["max_per_table"],
-                iterations=params["iterations"],
-                output_folder=run_folder
-            )
-        else:
-            raise ValueError(f"Unsupported algorithm: {algorithm}")
-
-        cost = seater.calculate_cost(tables, guests)
-        score = -cost
-        perfect_score = seater.calculate_theoretical_perfect_score(guests)
-        optimality = (score / perfect_score) * 100 if perfect_score else 0
-
-        file_handler.write_seating_arrangement(
-            tables,
-            filename=os.path.join(run_folder, "seating.txt"),
-            current_score=score,
-            perfect_score=perfect_score,
-            optimality=optimality,
-            algorithm=algorithm
-        )
-
-        best_costs.append(cost)
-        scores.append(score)
-        folders.append(run_folder)
+def execute_runs(guests, params, runs, workers=1, plot_runs=False, progress=None, measure_memory=False):
+
+    # Compila os convidados uma só vez; os processos recebem o Problem no arranque
+    problem = problem_model.as_problem(guests)
+
+    if workers == 1 or len(runs) <= 1:
+        results = []
+        for i, (algorithm, run_folder, seed, *overrides) in enumerate(runs):
+            print(f"[{algorithm}] Benchmark Run {i+1}/{len(runs)}")
+            results.append(run_single_benchmark(problem, dict(params, **overrides[0]) if overrides else params, algorithm, run_folder,
+                                                seed, plot_runs, measure_memory))
+            if progress is not None and progress(i + 1, len(runs), min(record['cost'] for record in results)):
+                raise ValueError("Execução cancelada.")
+        return results
+
+    workers = min(workers or os.cpu_count() or 1, len(runs))
+    print(f"A executar {len(runs)} corridas em {workers} processos...")
+
+    # Dentro do pool cada corrida usa um só processo (sem pools dentro de pools)
+    worker_params = dict(params, workers=1)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(problem, worker_params, plot_runs, measure_memory)) as executor:
+        futures = [executor.submit(_run_in_worker, *run) for run in runs]
+        best_cost = None
+        for done, future in enumerate(as_completed(futures), start=1):
+            cost = future.result()['cost']  # Propaga logo erros de qualquer corrida
+            best_cost = cost if best_cost is None else min(best_cost, cost)
+            if progress is not None and progress(done, len(runs), best_cost):
+                for pending in futures:
+                    pending.cancel()
+                raise ValueError("Execução cancelada.")
+        return [future.result() for future in futures]
+
+# Estado de cada processo do pool (evita enviar o Problem em todas as tarefas)
+_worker_problem = None
+_worker_params = None
+_worker_plot_runs = False
+_worker_measure_memory = False
+
+def _init_worker(problem, params, plot_runs, measure_memory=False):
+    global _worker_problem, _worker_params, _worker_plot_runs, _worker_measure_memory
+    _worker_problem = problem
+    _worker_params = params
+    _worker_plot_runs = plot_runs
+    _worker_measure_memory = measure_memory
+
+def _run_in_worker(algorithm, run_folder, seed, overrides=None):
+    params = dict(_worker_params, **overrides) if overrides else _worker_params
+    return run_single_benchmark(_worker_problem, params, algorithm, run_folder, seed, _worker_plot_runs, _worker_measure_memory)
+
+# ========================================================================================================================================================
+# Funções: base_seed / run_seeds
+# Descrição: A semente base de um benchmark pode ser um inteiro, um random.Random ou um numpy.random.Generator (sem semente
+# é sorteada uma); é sempre registada como inteiro para a execução poder ser repetida. Cada corrida recebe uma semente
+# independente derivada da base (ver seater.spawn_seeds), por isso as corridas não dependem da ordem nem do processo.
+# ========================================================================================================================================================
+
+def base_seed(seed):
+    if seed is None:
+        return random.randrange(2**32)
+    if isinstance(seed, int):
+        return seed
+    return seater.make_rng(seed).getrandbits(32)
+
+def run_seeds(seed, n_runs):
+    return seater.spawn_seeds(seed, n_runs)
+
+# ========================================================================================================================================================
+# Função: write_benchmark_summary
+# Descrição: Escreve o results.txt e o boxplot.png de um benchmark a partir dos resultados das corridas.
+# reference é o info de exact.branch_and_bound (opcional): se o ótimo foi provado, cada corrida mostra a distância a ele
+# (ver reference_gap); senão o resumo só indica que não há referência.
+# ========================================================================================================================================================
+
+def write_benchmark_summary(guests, algorithm, benchmark_folder, folders, seeds, best_costs, scores, base_seed=None, reference=None):
+    n_runs = len(best_costs)
 
     # Criar ficheiro resumo
     summary_path = os.path.join(benchmark_folder, "results.txt")
@@ -78,65 +198,232 @@ def run_benchmark(guests, params, algorithm, n_runs=10, benchmark_folder=None):
         f.write("Benchmark Summary\n")
         f.write("=================\n")
         f.write(f"Algorithm: {algorithm}\n")
-        f.write(f"Runs: {n_runs}\n\n")
+        f.write(f"Runs: {n_runs}\n")
+        if base_seed is not None:
+            f.write(f"Base Seed: {base_seed}\n")
+        if reference is not None:
+            f.write(_reference_line(reference))
+        f.write("\n")
         for i in range(n_runs):
             f.write(f"Run {i+1}:\n")
             f.write(f"  Cost: {best_costs[i]}\n")
             f.write(f"  Score: {scores[i]}\n")
-            f.write(f"  Optimality: {scores[i] / perfect_score * 100:.2f}%\n")
+            if reference is not None and reference['optimal']:
+                f.write(f"  Gap to optimum: {reference_gap(best_costs[i], reference):.2f}%\n")
+            f.write(f"  Seed: {seeds[i]}\n")
             f.write(f"  Folder: {folders[i]}\n\n")
         f.write(f"Average Score: {sum(scores)/n_runs:.2f}\n")
         f.write(f"Best Score: {max(scores)}\n")
         f.write(f"Best Cost: {min(best_costs)}\n")
 
     # Criar boxplot individual
-    plt.figure(figsize=(6, 6))
-    plt.boxplot(best_costs, vert=True, patch_artist=True)
-    plt.title(f"{algorithm} - Cost Distribution over {n_runs} Runs")
-    plt.ylabel("Final Cost")
-    plt.grid(True)
-    plt.savefig(os.path.join(benchmark_folder, "boxplot.png"))
-    plt.close()
+    plotting.plot_cost_boxplot(best_costs, algorithm, benchmark_folder)
+
+# ========================================================================================================================================================
+# Função: write_run_records
+# Descrição: Escreve o results.jsonl de um benchmark: uma linha JSON por corrida (ver run_record), com o número da corrida
+# e a semente base. É o formato para comparar execuções entre versões e máquinas (ver load_results).
+# ========================================================================================================================================================
+
+def write_run_records(benchmark_folder, records, base_seed=None):
+    with open(os.path.join(benchmark_folder, "results.jsonl"), "w") as f:
+        for i, record in enumerate(records):
+            f.write(json.dumps(dict(record, run=i + 1, base_seed=base_seed)) + "\n")
+
+# ========================================================================================================================================================
+# Funções: load_results / aggregate_results
+# Descrição: load_results lê os results.jsonl de uma ou mais pastas (procura em todas as subpastas, por omissão em
+# "benchmarks" e "comparisons") e devolve a lista de registos, cada um com o ficheiro de origem em 'source'.
+# aggregate_results agrupa os registos pelos campos de "by" (ex.: ('algorithm',) ou ('algorithm', 'machine.host'); os
+# campos com ponto são procurados dentro dos dicionários) e devolve uma linha por grupo com o número de corridas, custo
+# médio / melhor / desvio padrão, tempos médios e avaliações por segundo (total de avaliações / total de tempo).
+# ========================================================================================================================================================
+
+def load_results(folders=("benchmarks", "comparisons")):
+    if isinstance(folders, str):
+        folders = [folders]
+
+    records = []
+    for folder in folders:
+        for root, _, files in sorted(os.walk(folder)):
+            if "results.jsonl" not in files:
+                continue
+            path = os.path.join(root, "results.jsonl")
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        records.append(dict(json.loads(line), source=path))
+    return records
+
+def _field(record, name):
+    value = record
+    for part in name.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+def aggregate_results(records, by=("algorithm",)):
+    groups = {}
+    for record in records:
+        groups.setdefault(tuple(_field(record, name) for name in by), []).append(record)
+
+    rows = []
+    for key, group in groups.items():
+        costs = np.array([record['cost'] for record in group])
+        wall_times = np.array([record['wall_time'] for record in group])
+        evaluations = [record.get('evaluations') for record in group]
+        times_to_best = [record['time_to_best'] for record in group if record.get('time_to_best') is not None]
+
+        row = dict(zip(by, key))
+        row.update({
+            'runs': len(group),
+            'mean_cost': float(costs.mean()),
+            'best_cost': float(costs.min()),
+            'std_cost': float(costs.std()),
+            'mean_wall_time': float(wall_times.mean()),
+            'mean_cpu_time': float(np.mean([record['cpu_time'] for record in group])),
+            'mean_time_to_best': float(np.mean(times_to_best)) if times_to_best else None,
+            'evaluations_per_second': (float(sum(evaluations) / wall_times.sum())
+                                       if None not in evaluations and wall_times.sum() > 0 else None)
+        })
+        rows.append(row)
+    return rows
+
+# ========================================================================================================================================================
+# Funções: compute_reference / reference_gap
+# Descrição: A referência de otimalidade é calculada uma vez por benchmark com o branch and bound (limitado a time_limit
+# segundos). Só existe para listas minúsculas: acima de exact.EXACT_GUEST_LIMIT convidados o branch and bound não prova o
+# ótimo e o seu limite inferior é tão largo que não diz nada sobre a qualidade de uma solução, por isso compute_reference
+# devolve None. reference_gap é a distância (em %) de um custo ao ótimo e só é usada quando o ótimo foi provado.
+# ========================================================================================================================================================
+
+def compute_reference(guests, params, time_limit, seed=None):
+    num_guests = problem_model.as_problem(guests).num_guests
+    if num_guests > exact.EXACT_GUEST_LIMIT:
+        print(f"Sem referência exata: {num_guests} convidados (o branch and bound só serve até {exact.EXACT_GUEST_LIMIT})")
+        return None
+    print(f"A calcular a referência exata (até {time_limit}s)...")
+    _, info = exact.branch_and_bound(guests, params["min_per_table"], params["max_per_table"], time_limit=time_limit, seed=seed)
+    return info
+
+def reference_gap(cost, reference):
+    target = reference['cost']
+    return (cost - target) / abs(target) * 100 if target else 0
+
+def _reference_line(reference):
+    if reference['optimal']:
+        return f"Reference (Branch and Bound): optimum cost {reference['cost']}\n"
+    return "Reference (Branch and Bound): none, optimum not proven within the time limit (no gaps reported)\n"
+
+# ========================================================================================================================================================
+# Função: run_benchmark
+# Descrição: Executa um algoritmo n_runs vezes e guarda os resultados, o resumo e o boxplot.
+# workers controla o número de processos (1 = sequencial, None = todos os cores), seed a semente base das corridas e
+# plot_runs se são gerados os gráficos de cada corrida. progress é passado a execute_runs e measure_memory a
+# run_single_benchmark (pico de memória por corrida, à custa de tempos mais lentos).
+# Com reference_time_limit (segundos) é calculada a referência exata (ver compute_reference) para o resumo.
+# ========================================================================================================================================================
+
+def run_benchmark(guests, params, algorithm, n_runs=10, benchmark_folder=None, workers=1, seed=None, plot_runs=False, progress=None,
+                  reference_time_limit=None, measure_memory=False):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    if benchmark_folder is None:
+        benchmark_folder = os.path.join("benchmarks", f"benchmark_{timestamp}_{algorithm.replace(' ', '_').lower()}")
+    
+    os.makedirs(benchmark_folder, exist_ok=True)
+
+    # Sem semente, sorteia uma base e regista-a para a execução poder ser repetida
+    seed = base_seed(seed)
+    seeds = run_seeds(seed, n_runs)
+    folders = [os.path.join(benchmark_folder, f"run_{i+1}") for i in range(n_runs)]
+
+    results = execute_runs(guests, params, [(algorithm, folders[i], seeds[i]) for i in range(n_runs)], workers, plot_runs, progress,
+                           measure_memory)
+    best_costs = [record['cost'] for record in results]
+    scores = [record['score'] for record in results]
+    write_run_records(benchmark_folder, results, base_seed=seed)
+
+    reference = compute_reference(guests, params, reference_time_limit, seed) if reference_time_limit else None
+    write_benchmark_summary(guests, algorithm, benchmark_folder, folders, seeds, best_costs, scores, base_seed=seed, reference=reference)
 
     print(f"[✓] Benchmark concluído em: {benchmark_folder}")
     
     return benchmark_folder, best_costs, scores
 
 
-def compare_algorithms(guests, algorithms_to_test, params, n_runs=10):
+# ========================================================================================================================================================
+# Função: crossover_variants
+# Descrição: Variantes de um algoritmo genético, uma por operador de crossover (ver seater.GA_CROSSOVERS), para comparar os
+# operadores com compare_algorithms. Cada variante é (nome, algoritmo, parâmetros), ex.: "Genetic Algorithm (gpx)".
+# ========================================================================================================================================================
+
+def crossover_variants(algorithm="Genetic Algorithm", crossovers=None):
+    return [(f"{algorithm} ({crossover})", algorithm, {'crossover': crossover}) for crossover in (crossovers or seater.GA_CROSSOVERS)]
+
+# Pasta de um algoritmo ou variante numa comparação (ex.: "Genetic Algorithm (gpx)" -> genetic_algorithm_gpx)
+def _folder_name(name):
+    return name.replace(" ", "_").replace("(", "").replace(")", "").lower()
+
+# ========================================================================================================================================================
+# Função: compare_algorithms
+# Descrição: Corre n_runs de cada algoritmo e compara-os (boxplot e resumo). Todas as corridas de todos os algoritmos
+# são distribuídas pelo mesmo pool de processos quando workers != 1. reference_time_limit e measure_memory como em
+# run_benchmark.
+# Cada entrada de algorithms_to_test é o nome de um algoritmo ou uma variante (nome, algoritmo, parâmetros) que corre o
+# algoritmo com parâmetros próprios (ex.: crossover_variants); o resumo mostra também o número médio de passos (gerações
+# nos genéticos) até à melhor solução, para comparar a velocidade de convergência.
+# ========================================================================================================================================================
+
+def compare_algorithms(guests, algorithms_to_test, params, n_runs=10, workers=1, seed=None, plot_runs=False, progress=None,
+                       reference_time_limit=None, measure_memory=False):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     comparison_folder = os.path.join("comparisons", f"comparison_{timestamp}")
     os.makedirs(comparison_folder, exist_ok=True)
 
+    seed = base_seed(seed)
+    variants = [entry if isinstance(entry, tuple) else (entry, entry, {}) for entry in algorithms_to_test]
+    algorithms_to_test = [name for name, _, _ in variants]
+
+    # Todos os algoritmos usam as mesmas sementes, corrida a corrida
+    seeds = run_seeds(seed, n_runs)
+    runs = []
+    for algo, algorithm, overrides in variants:
+        print(f"\n🔍 Benchmarking {algo}...")
+        algo_folder = os.path.join(comparison_folder, _folder_name(algo))
+        runs.extend((algorithm, os.path.join(algo_folder, f"run_{i+1}"), seeds[i], overrides) for i in range(n_runs))
+
+    results = execute_runs(guests, params, runs, workers, plot_runs, progress, measure_memory)
+
     all_costs = {}
     all_scores = {}
+    all_steps = {}
+    reference = compute_reference(guests, params, reference_time_limit, seed) if reference_time_limit else None
 
-    for algo in algorithms_to_test:
-        print(f"\n🔍 Benchmarking {algo}...")
-        algo_folder = os.path.join(comparison_folder, algo.replace(" ", "_").lower())
-        benchmark_folder, costs, scores = run_benchmark(
-            guests=guests,
-            params=params,
-            algorithm=algo,
-            n_runs=n_runs,
-            benchmark_folder=algo_folder
-        )
+    for a, algo in enumerate(algorithms_to_test):
+        algo_folder = os.path.join(comparison_folder, _folder_name(algo))
+        algo_results = results[a * n_runs:(a + 1) * n_runs]
+        costs = [record['cost'] for record in algo_results]
+        scores = [record['score'] for record in algo_results]
+        write_run_records(algo_folder, algo_results, base_seed=seed)
+        folders = [run_folder for _, run_folder, _, _ in runs[a * n_runs:(a + 1) * n_runs]]
+
+        write_benchmark_summary(guests, algo, algo_folder, folders, seeds, costs, scores, base_seed=seed, reference=reference)
+        print(f"[✓] Benchmark concluído em: {algo_folder}")
 
         all_costs[algo] = costs
         all_scores[algo] = scores
+        all_steps[algo] = [record['steps_to_best'] for record in algo_results if record['steps_to_best'] is not None]
 
     # Criar gráfico comparativo
-    plt.figure(figsize=(8, 6))
-    plt.boxplot(all_costs.values(), labels=all_costs.keys())
-    plt.title(f"Cost Comparison over {n_runs} Runs")
-    plt.ylabel("Final Cost")
-    plt.grid(True)
-    plt.savefig(os.path.join(comparison_folder, "comparison_boxplot.png"))
-    plt.close()
+    plotting.plot_cost_comparison(all_costs, n_runs, comparison_folder)
 
     with open(os.path.join(comparison_folder, "comparison_summary.txt"), "w") as f:
         f.write(f"Comparison Summary ({n_runs} runs)\n")
-        f.write("=" * 50 + "\n\n")
+        f.write("=" * 50 + "\n")
+        f.write(f"Base Seed: {seed}\n")
+        if reference is not None:
+            f.write(_reference_line(reference))
+        f.write("\n")
         for algo in algorithms_to_test:
             scores = all_scores[algo]
             avg = sum(scores) / len(scores)
@@ -145,6 +432,11 @@ def compare_algorithms(guests, algorithms_to_test, params, n_runs=10):
             f.write(f"{algo}:\n")
             f.write(f"  Avg Score: {avg:.2f}\n")
             f.write(f"  Best Score: {best}\n")
-            f.write(f"  Worst Score: {worst}\n\n")
+            f.write(f"  Worst Score: {worst}\n")
+            if reference is not None and reference['optimal']:
+                f.write(f"  Best Gap to optimum: {reference_gap(min(all_costs[algo]), reference):.2f}%\n")
+            if all_steps[algo]:
+                f.write(f"  Avg Steps to Best: {sum(all_steps[algo]) / len(all_steps[algo]):.1f}\n")
+            f.write("\n")
 
     print(f"\n✅ Comparação concluída em: {comparison_folder}")
\ No newline at end of file
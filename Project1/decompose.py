@@ -0,0 +1,315 @@
+import time
+from array import array
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import Manager
+from datetime import datetime
+import Project1.problem as problem_model
+import Project1.seater as seater
+
+# ============================================================================================================================================================
+# Função: solve_decomposed
+# Descrição: Modo de decomposição para listas muito grandes. O grafo de relações é partido em comunidades (ver
+# partition_guests), cada parte é resolvida como um problema independente com seater.solve e o algoritmo escolhido e, no
+# fim, as mesas das partes são juntadas nas mesas do problema completo (ver assemble_tables) e refinadas com
+# seater.local_search_polish, que respeita min_per_table / max_per_table.
+#
+# Parâmetros (em params, além dos do algoritmo):
+#   - part_size: número máximo de convidados por parte (por omissão 250)
+#   - workers: processos para resolver as partes (1 = na própria thread, None = todos os cores); com mais de um processo
+#     cada parte corre com workers = 1
+#   - repair: estratégia do refinamento final ("first" ou "steepest", por omissão "first"; "off" para não refinar)
+#   - time_limit: orçamento total; cada parte recebe a sua fração (pelo número de convidados e de processos) e o
+#     refinamento final usa o tempo que sobrar
+# As partes são resolvidas com mesas até ao maior tamanho das mesas do problema completo, para encaixarem nelas (e, se
+# for preciso, com um mínimo por mesa mais baixo, para o número de convidados da parte ser possível).
+# progress(partes_resolvidas, partes, None) é chamado como nos algoritmos (com processos, também periodicamente enquanto
+# se espera pelas partes); se devolver True, as partes em curso param na próxima verificação de progresso e entram com
+# a melhor disposição que tinham, e as partes por começar entram na montagem sem otimização.
+# Devolve (mesas com nomes, métricas), como seater.solve.
+# ============================================================================================================================================================
+
+def solve_decomposed(guests, algorithm, params, progress=None):
+
+    start = time.perf_counter()
+    problem = problem_model.as_problem(guests)
+    min_per_table, max_per_table = params["min_per_table"], params["max_per_table"]
+    capacities = seater._table_sizes(problem.num_guests, min_per_table, max_per_table)
+    part_max = max(capacities) if capacities else max_per_table
+
+    rng = seater.make_rng(params.get("seed"))
+    parts, info = partition_guests(problem, params.get("part_size", 250), rng)
+    seeds = seater.spawn_seeds(rng, len(parts))
+
+    workers = params.get("workers", 1)
+    part_params = dict(params, max_per_table=part_max, polish="off")
+    if workers != 1:
+        part_params['workers'] = 1
+    time_limit = params.get("time_limit")
+    slots = min(workers or len(parts), len(parts)) if workers != 1 else 1
+
+    # Partes que cabem numa só mesa não precisam de ser resolvidas
+    subgroups = []
+    jobs = []
+    for k, part in enumerate(parts):
+        if len(part) <= part_max:
+            subgroups.append(list(part))
+        else:
+            # O mínimo por mesa desce se for preciso para a parte ter mesas equilibradas até part_max
+            part_min = min(min_per_table, len(part) // -(-len(part) // part_max))
+            share = None if time_limit is None else time_limit * len(part) / problem.num_guests * slots
+            jobs.append((k, dict(part_params, min_per_table=part_min, seed=seeds[k], time_limit=share)))
+
+    metrics = {
+        'algorithm': "Decomposition",
+        'base_algorithm': algorithm,
+        'timestamp': datetime.now().strftime("%Y%m%d_%H%M%S"),
+        'parts': [len(part) for part in parts],
+        'part_costs': {},
+        'evaluations': 0
+    }
+    metrics.update(info)
+
+    solved = set()
+    cancelled = False
+
+    def collect(k, result):
+        tables, part_metrics = result
+        subproblem = subproblems[k]
+        metrics['part_costs'][k] = seater.calculate_cost(problem_model.encode_tables(tables, subproblem), subproblem)
+        metrics['evaluations'] += part_metrics.get('evaluations', 0)
+        subgroups.extend([problem.index[name] for name in table] for table in tables)
+        solved.add(k)
+
+    subproblems = {k: subproblem(problem, parts[k]) for k, _ in jobs}
+    if workers == 1:
+        for k, job_params in jobs:
+            if progress is not None and progress(len(solved), len(jobs), None):
+                cancelled = True
+                break
+            part_progress = None if progress is None else (lambda step, total, best: progress(len(solved), len(jobs), None))
+            collect(k, seater.solve(subproblems[k], algorithm, job_params, progress=part_progress))
+    elif jobs:
+        # O evento partilhado chega aos processos: ao cancelar, as partes em curso param e as outras nem começam
+        with Manager() as manager, ProcessPoolExecutor(max_workers=slots) as executor:
+            stop = manager.Event()
+            futures = {executor.submit(_solve_part, subproblems[k], algorithm, job_params, stop): k for k, job_params in jobs}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if not future.cancelled():
+                        collect(futures[future], future.result())
+                if not cancelled and progress is not None and progress(len(solved), len(jobs), None):
+                    cancelled = True
+                    stop.set()
+                    for future in pending:
+                        future.cancel()
+
+    # Partes por resolver (cancelamento): os convidados entram um a um na montagem
+    for k, _ in jobs:
+        if k not in solved:
+            subgroups.extend([guest] for guest in parts[k])
+
+    tables = assemble_tables(problem, subgroups, capacities)
+    metrics['assembled_cost'] = seater.calculate_cost(tables, problem)
+    tables = problem_model.decode_tables(tables, problem)
+
+    repair = params.get("repair", "first")
+    remaining = None if time_limit is None else time_limit - (time.perf_counter() - start)
+    if repair != "off" and not cancelled and (remaining is None or remaining > 0):
+        tables, metrics['repair'] = seater.local_search_polish(problem, tables, min_per_table, max_per_table, repair, time_limit=remaining)
+
+    metrics['cost'] = seater.calculate_cost(problem_model.encode_tables(tables, problem), problem)
+    metrics['stop_reason'] = "cancelled" if cancelled else "completed"
+    metrics['elapsed'] = time.perf_counter() - start
+    return tables, metrics
+
+# Resolve uma parte num processo do pool; para quando o evento stop é ativado (cancelamento na interface)
+def _solve_part(subproblem, algorithm, params, stop):
+    return seater.solve(subproblem, algorithm, params, progress=lambda step, total, best_cost: stop.is_set())
+
+# ============================================================================================================================================================
+# Função: partition_guests
+# Descrição: Parte os convidados em grupos com no máximo part_size convidados, cortando o mínimo de preferências possível:
+#   1. comunidades por propagação de etiquetas (label propagation) no grafo das preferências: cada convidado fica com a
+#      etiqueta com mais peso de preferência entre os vizinhos, até nenhuma mudar (as componentes ligadas nunca se juntam)
+#   2. comunidades maiores que part_size são cortadas em pedaços de part_size pela ordem de uma procura em largura, para
+#      os pedaços ficarem ligados
+#   3. as comunidades são empacotadas em partes (da maior para a menor, na parte mais cheia onde ainda cabem)
+# Devolve (partes, info) com info = {'components', 'communities', 'cut_weight'}; cut_weight é a soma dos pesos das
+# preferências entre partes diferentes (o que a decomposição não consegue aproveitar).
+# ============================================================================================================================================================
+
+def partition_guests(problem, part_size, rng):
+
+    if part_size < 1:
+        raise ValueError("part_size must be at least 1.")
+
+    num_guests = problem.num_guests
+    offsets, neighbors, weights = problem.offsets, problem.neighbors, problem.weights
+
+    # 1. Propagação de etiquetas (peso de uma preferência = -peso do par)
+    labels = list(range(num_guests))
+    order = list(range(num_guests))
+    for _ in range(30):
+        rng.shuffle(order)
+        changed = 0
+        for guest in order:
+            votes = {}
+            for k in range(offsets[guest], offsets[guest + 1]):
+                if weights[k] < 0:
+                    label = labels[neighbors[k]]
+                    votes[label] = votes.get(label, 0) - weights[k]
+            if not votes:
+                continue
+            current = labels[guest]
+            best = max(votes, key=lambda label: (votes[label], label == current))
+            if best != current and votes[best] > votes.get(current, 0):
+                labels[guest] = best
+                changed += 1
+        if not changed:
+            break
+
+    communities = {}
+    for guest in range(num_guests):
+        communities.setdefault(labels[guest], []).append(guest)
+
+    # 2. Comunidades grandes: pedaços ligados pela ordem de uma procura em largura dentro da comunidade
+    pieces = []
+    for members in communities.values():
+        if len(members) <= part_size:
+            pieces.append(members)
+            continue
+        label = labels[members[0]]
+        seen = set()
+        ordered = []
+        for root in members:
+            if root in seen:
+                continue
+            seen.add(root)
+            queue = deque([root])
+            while queue:
+                guest = queue.popleft()
+                ordered.append(guest)
+                for k in range(offsets[guest], offsets[guest + 1]):
+                    other = neighbors[k]
+                    if labels[other] == label and other not in seen:
+                        seen.add(other)
+                        queue.append(other)
+        pieces.extend(ordered[i:i + part_size] for i in range(0, len(ordered), part_size))
+
+    # 3. Empacotamento das comunidades em partes (best fit decreasing)
+    pieces.sort(key=len, reverse=True)
+    parts = []
+    room = []
+    for piece in pieces:
+        fits = [p for p in range(len(parts)) if room[p] >= len(piece)]
+        if fits:
+            target = min(fits, key=lambda p: room[p])
+            parts[target].extend(piece)
+            room[target] -= len(piece)
+        else:
+            parts.append(list(piece))
+            room.append(part_size - len(piece))
+
+    part_of = array('i', [0]) * num_guests
+    for p, part in enumerate(parts):
+        for guest in part:
+            part_of[guest] = p
+    cut_weight = sum(weights[k] for guest in range(num_guests) for k in range(offsets[guest], offsets[guest + 1])
+                     if weights[k] < 0 and part_of[neighbors[k]] != part_of[guest]) / 2
+
+    info = {
+        'components': _count_components(problem),
+        'communities': len(communities),
+        'cut_weight': cut_weight
+    }
+    return parts, info
+
+# Número de componentes ligadas do grafo de pares
+def _count_components(problem):
+
+    offsets, neighbors = problem.offsets, problem.neighbors
+    seen = bytearray(problem.num_guests)
+    components = 0
+    for root in range(problem.num_guests):
+        if seen[root]:
+            continue
+        components += 1
+        seen[root] = 1
+        stack = [root]
+        while stack:
+            guest = stack.pop()
+            for k in range(offsets[guest], offsets[guest + 1]):
+                if not seen[neighbors[k]]:
+                    seen[neighbors[k]] = 1
+                    stack.append(neighbors[k])
+    return components
+
+# ============================================================================================================================================================
+# Função: subproblem
+# Descrição: Problem só com os convidados de "members" (ids do problema completo) e as relações entre eles, com o mesmo
+# modelo de pontuação e as mesmas forças. Os nomes são os do problema completo.
+# ============================================================================================================================================================
+
+def subproblem(problem, members):
+
+    local = {guest: i for i, guest in enumerate(members)}
+    relations = []
+    for offsets, targets, strengths in ((problem.prefer_offsets, problem.prefer_targets, problem.prefer_strengths),
+                                        (problem.avoid_offsets, problem.avoid_targets, problem.avoid_strengths)):
+        sub_offsets, sub_targets, sub_strengths = array('i', [0]), array('i'), array('d')
+        for guest in members:
+            for k in range(offsets[guest], offsets[guest + 1]):
+                if targets[k] in local:
+                    sub_targets.append(local[targets[k]])
+                    sub_strengths.append(strengths[k] if strengths is not None else 1)
+            sub_offsets.append(len(sub_targets))
+        relations.append((sub_offsets, sub_targets, sub_strengths if strengths is not None else None))
+
+    (prefer_offsets, prefer_targets, prefer_strengths), (avoid_offsets, avoid_targets, avoid_strengths) = relations
+    return problem_model.Problem([problem.names[guest] for guest in members], prefer_offsets, prefer_targets, avoid_offsets,
+                                 avoid_targets, scoring=problem.scoring, prefer_strengths=prefer_strengths,
+                                 avoid_strengths=avoid_strengths)
+
+# ============================================================================================================================================================
+# Função: assemble_tables
+# Descrição: Junta os subgrupos (mesas das partes, com ids) nas mesas do problema completo, com as capacidades de
+# seater._table_sizes. Cada subgrupo vai inteiro para a mesa onde cabe com menos lugares a sobrar (do maior para o mais
+# pequeno); os convidados dos subgrupos que já não cabem inteiros são sentados um a um na mesa com lugar onde têm melhor
+# afinidade (ou, sem vizinhos sentados, na mais vazia).
+# ============================================================================================================================================================
+
+def assemble_tables(problem, subgroups, capacities):
+
+    offsets, neighbors, weights = problem.offsets, problem.neighbors, problem.weights
+    num_tables = len(capacities)
+    tables = [[] for _ in range(num_tables)]
+    room = list(capacities)
+    seat_of = array('i', [-1]) * problem.num_guests
+
+    leftovers = []
+    for group in sorted(subgroups, key=len, reverse=True):
+        fits = [t for t in range(num_tables) if room[t] >= len(group)]
+        if not fits:
+            leftovers.extend(group)
+            continue
+        target = min(fits, key=lambda t: room[t])
+        tables[target].extend(group)
+        room[target] -= len(group)
+        for guest in group:
+            seat_of[guest] = target
+
+    for guest in leftovers:
+        affinity = {}
+        for k in range(offsets[guest], offsets[guest + 1]):
+            table = seat_of[neighbors[k]]
+            if table >= 0 and room[table] > 0:
+                affinity[table] = affinity.get(table, 0) + weights[k]
+        target = min((t for t in range(num_tables) if room[t] > 0), key=lambda t: (affinity.get(t, 0), -room[t]))
+        tables[target].append(guest)
+        room[target] -= 1
+        seat_of[guest] = target
+
+    return tables
@@ -0,0 +1,280 @@
+import sys
+import time
+import Project1.problem as problem_model
+import Project1.seater as seater
+
+# Número de convidados até ao qual o branch and bound costuma provar o ótimo em poucos segundos
+EXACT_GUEST_LIMIT = 20
+
+# ============================================================================================================================================================
+# Função: branch_and_bound
+# Descrição: Solver exato (branch and bound) para instâncias pequenas, usado como referência de otimalidade.
+# Procura no mesmo espaço dos algoritmos: o número de mesas de create_balanced_seating e mesas entre min_per_table e
+# max_per_table convidados, com o custo de calculate_cost.
+#
+# - Perfis de tamanhos: cada combinação de tamanhos das mesas tem uma penalização de equilíbrio fixa. Os perfis são
+#   explorados da menor para a maior penalização e a procura acaba quando a penalização do perfil seguinte mais o limite
+#   inferior dos pares já não consegue bater a melhor solução (na prática só o perfil equilibrado é explorado).
+# - Quebra de simetria: mesas com a mesma capacidade são idênticas, por isso um convidado só pode abrir a primeira mesa
+#   vazia de cada capacidade.
+# - Limite inferior de cada nó: custo dos pares já sentados + para cada convidado por sentar, a melhor mesa livre para ele
+#   face aos já sentados + todas as preferências entre convidados por sentar (os "avoids" entre eles não contam).
+#
+# Tamanho útil: prova o ótimo em poucos segundos até cerca de EXACT_GUEST_LIMIT convidados (ex.: 22 convidados aleatórios
+# em ~7s). A partir de ~25 convidados a prova deixa de caber em 20s e o limite inferior fica muito largo (na lista de 54
+# convidados do repositório, ~-1513 para uma melhor solução de ~-913, 66% de diferença): nesses casos o limite não mede
+# a qualidade de uma solução. Não há nenhum limite de relaxação (LP/ILP ou Lagrangiano), por isso as listas maiores
+# (incluindo a do repositório) ficam sem referência de otimalidade: benchmark.compute_reference só a calcula até
+# EXACT_GUEST_LIMIT convidados.
+# seed é a semente das soluções iniciais (ver seater.make_rng); a procura em si é determinística.
+# Com time_limit / node_limit (ou se progress(nós, node_limit, melhor_custo) devolver True) a procura pode parar antes
+# de provar o ótimo; nesse caso devolve a melhor disposição encontrada e um limite inferior válido do custo ótimo.
+# Devolve (mesas, info) com info = {'cost', 'lower_bound', 'optimal', 'nodes', 'elapsed', 'profiles'}.
+# ============================================================================================================================================================
+
+def branch_and_bound(guests, min_per_table, max_per_table, time_limit=None, node_limit=None, initial_tables=None, progress=None,
+                     seed=None):
+
+    problem = problem_model.as_problem(guests)
+    num_guests = problem.num_guests
+    num_tables = len(seater._table_sizes(num_guests, min_per_table, max_per_table))
+    search = _Search(problem, num_tables, time_limit, node_limit, progress)
+
+    # Solução inicial (quanto melhor, mais a procura corta): a fornecida ou um Simulated Annealing curto
+    rng = seater.make_rng(seed)
+    if initial_tables is None:
+        initial_tables, _ = seater.simulated_annealing(problem, 100, 0.9995, 20000, min_per_table, max_per_table, "exponential",
+                                                       seed=rng)
+    elif problem is guests:
+        initial_tables = problem_model.decode_tables(initial_tables, problem)
+    candidates = [problem_model.encode_tables(initial_tables, problem)]
+    candidates += [seater.create_balanced_seating(problem, min_per_table, max_per_table, rng=rng) for _ in range(5)]
+    for tables in candidates:
+        search.offer([list(table) for table in tables], seater.calculate_cost(tables, problem))
+
+    profiles = sorted(_size_profiles(num_guests, num_tables, min_per_table, max_per_table), key=problem.scoring.balance_penalty)
+    root_bound = problem.self_cost + sum(min(0, w) for w in problem.weights) / 2
+    lower_bound = None
+
+    for k, capacities in enumerate(profiles):
+        penalty = problem.scoring.balance_penalty(capacities)
+        if penalty + root_bound >= search.best_cost - 1e-9:
+            break
+        search.run(capacities, penalty)
+        search.profiles += 1
+        if search.stopped:
+            # O que ficou por explorar: os nós abandonados deste perfil e os perfis seguintes
+            remaining = [problem.scoring.balance_penalty(other) + root_bound for other in profiles[k + 1:]]
+            lower_bound = min([search.abandoned_bound] + remaining)
+            break
+
+    optimal = lower_bound is None
+    if optimal:
+        lower_bound = search.best_cost
+    lower_bound = min(lower_bound, search.best_cost)
+
+    info = {
+        'cost': search.best_cost,
+        'lower_bound': lower_bound,
+        'optimal': optimal,
+        'nodes': search.nodes,
+        'elapsed': time.perf_counter() - search.start,
+        'profiles': search.profiles
+    }
+    tables = search.best_tables
+    if problem is not guests:
+        tables = problem_model.decode_tables(tables, problem)
+    return tables, info
+
+# ============================================================================================================================================================
+# Função: _size_profiles
+# Descrição: Todas as combinações (sem ordem) de num_tables tamanhos entre min_per_table e max_per_table que somam num_guests,
+# com os tamanhos por ordem decrescente.
+# ============================================================================================================================================================
+
+def _size_profiles(num_guests, num_tables, min_per_table, max_per_table):
+
+    profiles = []
+
+    def extend(prefix, remaining, tables_left, largest):
+        if tables_left == 0:
+            if remaining == 0:
+                profiles.append(list(prefix))
+            return
+        for size in range(min(largest, remaining - min_per_table * (tables_left - 1)), min_per_table - 1, -1):
+            if size * tables_left < remaining:
+                break
+            prefix.append(size)
+            extend(prefix, remaining - size, tables_left - 1, size)
+            prefix.pop()
+
+    extend([], num_guests, num_tables, max_per_table)
+    return profiles
+
+# ============================================================================================================================================================
+# Classe: _Search
+# Descrição: Estado da procura em profundidade (mesa de cada convidado, ocupação das mesas, afinidades incrementais).
+# ============================================================================================================================================================
+
+class _Search:
+
+    def __init__(self, problem, num_tables, time_limit, node_limit, progress):
+        self.problem = problem
+        self.num_tables = num_tables
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.progress = progress
+
+        self.start = time.perf_counter()
+        self.nodes = 0
+        self.profiles = 0
+        self.stopped = False
+        self.abandoned_bound = float('inf')
+
+        self.best_cost = float('inf')
+        self.best_tables = None
+
+        # Vizinhos de cada convidado como listas (mais rápidas que os arrays nos ciclos)
+        offsets, neighbors, weights = problem.offsets, problem.neighbors, problem.weights
+        self.adjacency = [[(neighbors[k], weights[k]) for k in range(offsets[g], offsets[g + 1])] for g in range(problem.num_guests)]
+        self.order = _branching_order(self.adjacency)
+
+    def offer(self, tables, cost):
+        if cost < self.best_cost:
+            self.best_cost = cost
+            self.best_tables = [list(table) for table in tables]
+
+    # Verifica os limites de tempo/nós e o progresso (a cada 1000 nós)
+    def should_stop(self):
+        if self.nodes % 1000:
+            return False
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            return True
+        if self.time_limit is not None and time.perf_counter() - self.start >= self.time_limit:
+            return True
+        return self.progress is not None and self.progress(self.nodes, self.node_limit, self.best_cost)
+
+    def run(self, capacities, penalty):
+        num_guests = self.problem.num_guests
+        self.capacities = capacities
+        self.penalty = penalty
+        self.fill = [0] * self.num_tables
+        self.seat = [-1] * num_guests
+        self.affinity = [[0.0] * self.num_tables for _ in range(num_guests)]
+        self.open_tables = self.num_tables
+
+        # Soma das preferências entre convidados ainda por sentar (cada par uma vez)
+        self.free_prefers = sum(min(0, w) for g in range(num_guests) for other, w in self.adjacency[g] if other > g)
+
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, num_guests + 200))
+        try:
+            self.descend(0, self.problem.self_cost + penalty)
+        finally:
+            sys.setrecursionlimit(limit)
+
+    # Limite inferior do custo de qualquer solução que complete a atribuição atual
+    def bound(self, depth, cost):
+        seat, fill, capacities, affinity = self.seat, self.fill, self.capacities, self.affinity
+        total = cost + self.free_prefers
+        for guest in self.order[depth:]:
+            # Mesas livres com vizinhos já sentados; se houver outra mesa livre, o convidado pode ficar a 0
+            best = None
+            seen = set()
+            for other, _ in self.adjacency[guest]:
+                t = seat[other]
+                if t >= 0 and fill[t] < capacities[t] and t not in seen:
+                    seen.add(t)
+                    if best is None or affinity[guest][t] < best:
+                        best = affinity[guest][t]
+            if len(seen) < self.open_tables:
+                best = 0 if best is None else min(best, 0)
+            if best is not None:
+                total += best
+        return total
+
+    def descend(self, depth, cost):
+        self.nodes += 1
+        if self.stopped or self.should_stop():
+            self.stopped = True
+            self.abandoned_bound = min(self.abandoned_bound, self.bound(depth, cost))
+            return
+
+        order = self.order
+        if depth == len(order):
+            if cost < self.best_cost - 1e-9:
+                tables = [[] for _ in range(self.num_tables)]
+                for guest, t in enumerate(self.seat):
+                    tables[t].append(guest)
+                self.offer(tables, cost)
+            return
+
+        node_bound = self.bound(depth, cost)
+        if node_bound >= self.best_cost - 1e-9:
+            return
+
+        guest = order[depth]
+        seat, fill, capacities, affinity = self.seat, self.fill, self.capacities, self.affinity
+
+        # Mesas possíveis: com lugar, e só a primeira mesa vazia de cada capacidade (as outras são simétricas)
+        choices = []
+        opened = set()
+        for t in range(self.num_tables):
+            if fill[t] >= capacities[t]:
+                continue
+            if fill[t] == 0:
+                if capacities[t] in opened:
+                    continue
+                opened.add(capacities[t])
+            choices.append(t)
+        choices.sort(key=lambda t: affinity[guest][t])
+
+        for t in choices:
+            if self.stopped:
+                # Os ramos que ficam por explorar estão limitados pelo limite deste nó
+                self.abandoned_bound = min(self.abandoned_bound, node_bound)
+                return
+
+            # Senta o convidado
+            seat[guest] = t
+            fill[t] += 1
+            if fill[t] == capacities[t]:
+                self.open_tables -= 1
+            for other, w in self.adjacency[guest]:
+                affinity[other][t] += w
+                if seat[other] < 0 and w < 0:
+                    self.free_prefers -= w
+
+            self.descend(depth + 1, cost + affinity[guest][t])
+
+            # Levanta o convidado
+            for other, w in self.adjacency[guest]:
+                affinity[other][t] -= w
+                if seat[other] < 0 and w < 0:
+                    self.free_prefers += w
+            if fill[t] == capacities[t]:
+                self.open_tables += 1
+            fill[t] -= 1
+            seat[guest] = -1
+
+# ============================================================================================================================================================
+# Função: _branching_order
+# Descrição: Ordem de decisão dos convidados: começa pelo mais ligado e escolhe sempre o convidado com mais peso (em valor
+# absoluto) para os já escolhidos, para que as decisões fortes aconteçam cedo e o limite inferior corte mais.
+# ============================================================================================================================================================
+
+def _branching_order(adjacency):
+
+    num_guests = len(adjacency)
+    strength = [0.0] * num_guests
+    chosen = [False] * num_guests
+    order = []
+    degree = [sum(abs(w) for _, w in adjacency[g]) for g in range(num_guests)]
+
+    for _ in range(num_guests):
+        guest = max((g for g in range(num_guests) if not chosen[g]), key=lambda g: (strength[g], degree[g]))
+        chosen[guest] = True
+        order.append(guest)
+        for other, w in adjacency[guest]:
+            strength[other] += abs(w)
+    return order
@@ -1,6 +1,12 @@
 import csv
+from array import array
 from datetime import datetime
+import hashlib
+import json
+import mmap
 import os
+import sys
+import Project1.problem as problem_model
 
 # ========================================================================================================================================================
 # Função: read_guest_preferences
@@ -9,28 +15,295 @@ import os
 # ---------------------------------------------------------------------------------------------------
 # Espera um CSV com colunas:
 # Guest, Together1, Together2, Together3, Apart1, Apart2, Apart3
+# (qualquer número de colunas Together* / Apart*, cada uma com uma coluna de força opcional, ex.: Together1Weight; ver
+# load_guest_problem, que faz a leitura e a validação, e load_problem, que reaproveita a cache binária)
 # ========================================================================================================================================================
 
-def read_guest_preferences(filename):
-    guests = {}
-    
+def read_guest_preferences(filename, strict=False):
+    return problem_model.to_guests(load_problem(filename, strict=strict))
+
+# ========================================================================================================================================================
+# Função: load_guest_problem
+# Descrição: Lê o CSV de convidados linha a linha (sem guardar as linhas) e devolve logo o Problem (ids inteiros e arrays CSR).
+# Numa só passagem:
+#   - descobre as colunas pelo cabeçalho: "Guest" e qualquer número de colunas começadas por "Together" e "Apart"
+#   - lê a força de cada relação da coluna com o mesmo nome acabado em "Weight" (ex.: Together1Weight), se existir: um
+#     número positivo que multiplica o peso da relação no modelo de pontuação (vazio = 1)
+#   - converte cada nome num id (os nomes referidos antes de aparecerem como convidados recebem um id provisório)
+#   - deteta convidados repetidos e referências a nomes que não são convidados
+# No fim os ids provisórios são renumerados pela ordem dos convidados no ficheiro e as referências inválidas são removidas.
+# Com strict=True, convidados repetidos ou referências inválidas lançam ValueError; caso contrário são reportados com um
+# print (um convidado repetido fica com a última linha, como no dicionário antigo).
+# O número de problemas encontrados fica em problem.issues (guardado na cache binária).
+# scoring é o ScoringModel com que o grafo de pares é compilado (por omissão o custo original).
+# ========================================================================================================================================================
+
+def load_guest_problem(filename, strict=False, scoring=None):
+
     with open(filename, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            name = row['Guest'].strip()
-
-            # Lê os nomes das pessoas com quem o convidado quer ficar
-            prefers = [row[f'Together{i}'].strip() for i in range(1, 4) if row.get(f'Together{i}') and row[f'Together{i}'].strip()]
-
-            # Lê os nomes das pessoas que o convidado quer evitar
-            avoids = [row[f'Apart{i}'].strip() for i in range(1, 4) if row.get(f'Apart{i}') and row[f'Apart{i}'].strip()]
-            
-            guests[name] = {
-                'prefers': prefers,
-                'avoids': avoids
-            }
-    
-    return guests
+        reader = csv.reader(csvfile)
+        header = [column.strip().lower() for column in next(reader, [])]
+        if "guest" not in header:
+            raise ValueError(f"{filename}: falta a coluna 'Guest'.")
+
+        guest_column = header.index("guest")
+        prefer_columns = [i for i, column in enumerate(header) if column.startswith("together") and not column.endswith("weight")]
+        avoid_columns = [i for i, column in enumerate(header) if column.startswith("apart") and not column.endswith("weight")]
+        weight_column = {i: header.index(header[i] + "weight") for i in prefer_columns + avoid_columns if header[i] + "weight" in header}
+
+        ids = {}                                    # nome -> id provisório
+        names = []                                  # id provisório -> nome
+        row_of = []                                 # id provisório -> linha do convidado (-1 se só foi referido)
+        guest_order = []                            # ids provisórios dos convidados, pela ordem do ficheiro
+        duplicates = []
+        invalid_strengths = []
+
+        # Relações (origem, destino, força) em ids provisórios; a origem é a linha do convidado
+        prefer_sources, prefer_targets, prefer_strengths = array('i'), array('i'), array('d')
+        avoid_sources, avoid_targets, avoid_strengths = array('i'), array('i'), array('d')
+
+        def intern(name):
+            guest_id = ids.get(name)
+            if guest_id is None:
+                guest_id = ids[name] = len(names)
+                names.append(name)
+                row_of.append(-1)
+            return guest_id
+
+        for line, row in enumerate(reader, start=2):
+            if guest_column >= len(row) or not row[guest_column].strip():
+                continue
+            guest = intern(row[guest_column].strip())
+
+            if row_of[guest] >= 0:
+                # Fica com a última linha: as relações da anterior deixam de ter origem válida (ver _csr)
+                duplicates.append((names[guest], line))
+            else:
+                guest_order.append(guest)
+            row_of[guest] = line
+
+            for columns, sources, targets, strengths in ((prefer_columns, prefer_sources, prefer_targets, prefer_strengths),
+                                                         (avoid_columns, avoid_sources, avoid_targets, avoid_strengths)):
+                for i in columns:
+                    if i < len(row) and row[i].strip():
+                        sources.append(line)
+                        targets.append(intern(row[i].strip()))
+                        strengths.append(_read_strength(row, weight_column.get(i), line, invalid_strengths))
+
+    # Validação
+    dangling = sorted({names[target] for targets in (prefer_targets, avoid_targets) for target in targets if row_of[target] < 0})
+    problems = [f"convidado repetido '{name}' (linha {line})" for name, line in duplicates]
+    problems += [f"'{name}' é referido mas não é convidado" for name in dangling]
+    problems += [f"força inválida '{value}' (linha {line}), usada 1" for value, line in invalid_strengths]
+    if problems:
+        if strict:
+            raise ValueError(f"{filename}: " + "; ".join(problems))
+        for message in problems:
+            print(f"[!] {filename}: {message}")
+
+    # Renumeração: ids finais pela ordem dos convidados; linhas -> id final
+    final_id = {}
+    for new_id, guest in enumerate(guest_order):
+        final_id[row_of[guest]] = new_id
+    target_id = array('i', [-1]) * len(names)
+    for new_id, guest in enumerate(guest_order):
+        target_id[guest] = new_id
+
+    prefer_offsets, prefer_list, prefer_strengths = _csr(len(guest_order), prefer_sources, prefer_targets, prefer_strengths,
+                                                         final_id, target_id)
+    avoid_offsets, avoid_list, avoid_strengths = _csr(len(guest_order), avoid_sources, avoid_targets, avoid_strengths,
+                                                      final_id, target_id)
+
+    # Sem colunas de força (ou com todas a 1) o problema fica sem forças, como antes
+    if all(strength == 1 for strengths in (prefer_strengths, avoid_strengths) for strength in strengths):
+        prefer_strengths = avoid_strengths = None
+
+    problem = problem_model.Problem([names[guest] for guest in guest_order], prefer_offsets, prefer_list, avoid_offsets, avoid_list,
+                                    scoring=scoring, prefer_strengths=prefer_strengths, avoid_strengths=avoid_strengths)
+    problem.issues = len(problems)
+    return problem
+
+# Força de uma relação: o número da coluna de força (vazio ou sem coluna = 1). Valores inválidos ficam a 1 e são reportados.
+def _read_strength(row, column, line, invalid_strengths):
+    if column is None or column >= len(row) or not row[column].strip():
+        return 1.0
+    value = row[column].strip()
+    try:
+        strength = float(value)
+    except ValueError:
+        strength = -1
+    if not strength > 0 or strength == float('inf'):
+        invalid_strengths.append((value, line))
+        return 1.0
+    return strength
+
+# Constrói os arrays CSR (offsets + destinos + forças) a partir das relações, ignorando os destinos que não são convidados
+# e as origens que não são a última linha de um convidado.
+# As relações de cada convidado mantêm a ordem das colunas (ordenação por contagem, estável).
+def _csr(num_guests, sources, targets, strengths, final_id, target_id):
+    offsets = array('i', [0]) * (num_guests + 1)
+    for k in range(len(sources)):
+        if target_id[targets[k]] >= 0 and sources[k] in final_id:
+            offsets[final_id[sources[k]] + 1] += 1
+    for g in range(num_guests):
+        offsets[g + 1] += offsets[g]
+
+    position = array('i', offsets[:-1])
+    result = array('i', [0]) * offsets[num_guests]
+    result_strengths = array('d', [0.0]) * offsets[num_guests]
+    for k in range(len(sources)):
+        target = target_id[targets[k]]
+        if target >= 0 and sources[k] in final_id:
+            source = final_id[sources[k]]
+            result[position[source]] = target
+            result_strengths[position[source]] = strengths[k]
+            position[source] += 1
+    return offsets, result, result_strengths
+
+# ========================================================================================================================================================
+# Função: load_problem
+# Descrição: Devolve o Problem de um CSV de convidados usando uma cache binária guardada ao lado do CSV ("<csv>.cache").
+# A cache é reutilizada quando o tamanho e a data de modificação do CSV não mudaram (ou, se só a data mudou, quando o
+# hash do conteúdo é o mesmo); caso contrário o CSV é lido com load_guest_problem e a cache é reescrita.
+# Com um modelo de pontuação (scoring) diferente do que está na cache, as relações da cache são reaproveitadas e só o
+# grafo de pares é recompilado.
+# Os arrays da cache são mapeados em memória (mmap) e usados diretamente como memoryviews, sem cópia nem parsing.
+# ========================================================================================================================================================
+
+CACHE_MAGIC = b"SEATCACHE2\n"
+
+def load_problem(filename, strict=False, use_cache=True, scoring=None):
+
+    cache_path = filename + ".cache"
+    if use_cache:
+        problem = read_problem_cache(cache_path, filename, strict, scoring)
+        if problem is not None:
+            return problem
+
+    problem = load_guest_problem(filename, strict=strict, scoring=scoring)
+
+    if use_cache:
+        try:
+            write_problem_cache(problem, cache_path, filename)
+        except OSError as e:
+            print(f"[!] Não foi possível escrever a cache {cache_path}: {e}")
+    return problem
+
+# Identificação do CSV guardada na cache
+def _csv_signature(filename, with_hash=True):
+    stat = os.stat(filename)
+    signature = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        signature['hash'] = digest.hexdigest()
+    return signature
+
+# ========================================================================================================================================================
+# Funções: write_problem_cache / read_problem_cache
+# Descrição: Formato da cache: CACHE_MAGIC, uma linha JSON com a identificação do CSV e a posição de cada bloco, e os blocos
+# (nomes em UTF-8 separados por "\0" e os arrays do Problem em binário nativo, alinhados a 8 bytes). As forças só são
+# guardadas se o problema as tiver; o modelo de pontuação do grafo de pares fica no cabeçalho.
+# read_problem_cache devolve None se a cache não existir, for de outra versão/máquina ou estiver desatualizada.
+# ========================================================================================================================================================
+
+_CACHE_ARRAYS = (('prefer_offsets', 'i'), ('prefer_targets', 'i'), ('avoid_offsets', 'i'), ('avoid_targets', 'i'),
+                 ('offsets', 'i'), ('neighbors', 'i'), ('weights', 'd'))
+_CACHE_STRENGTHS = ('prefer_strengths', 'avoid_strengths')
+
+def write_problem_cache(problem, cache_path, csv_path):
+
+    blocks = [('names', "\0".join(problem.names).encode('utf-8'))]
+    for field, typecode in _CACHE_ARRAYS:
+        blocks.append((field, array(typecode, getattr(problem, field)).tobytes()))
+    for field in _CACHE_STRENGTHS:
+        if getattr(problem, field) is not None:
+            blocks.append((field, array('d', getattr(problem, field)).tobytes()))
+
+    layout = {}
+    position = 0
+    for field, data in blocks:
+        layout[field] = [position, len(data)]
+        position += len(data) + (-len(data) % 8)
+
+    header = {
+        'csv': _csv_signature(csv_path),
+        'byteorder': sys.byteorder,
+        'itemsize': {typecode: array(typecode).itemsize for _, typecode in _CACHE_ARRAYS},
+        'num_guests': problem.num_guests,
+        'perfect_score': problem.perfect_score,
+        'self_cost': problem.self_cost,
+        'scoring': problem.scoring.to_dict(),
+        'issues': getattr(problem, 'issues', 0),
+        'layout': layout
+    }
+    header_bytes = json.dumps(header).encode('utf-8') + b"\n"
+    start = len(CACHE_MAGIC) + len(header_bytes)
+    padding = -start % 8
+
+    # Escreve num ficheiro temporário e troca no fim (nunca fica uma cache a meio)
+    temporary = cache_path + ".tmp"
+    with open(temporary, 'wb') as f:
+        f.write(CACHE_MAGIC)
+        f.write(header_bytes)
+        f.write(b"\0" * padding)
+        for field, data in blocks:
+            f.write(data)
+            f.write(b"\0" * (-len(data) % 8))
+    os.replace(temporary, cache_path)
+
+def read_problem_cache(cache_path, csv_path, strict=False, scoring=None):
+
+    if not os.path.exists(cache_path):
+        return None
+
+    with open(cache_path, 'rb') as f:
+        if f.readline() != CACHE_MAGIC:
+            return None
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            return None
+        start = f.tell()
+        start += -start % 8
+
+        # Confirma que a cache é deste CSV e desta máquina
+        if header['byteorder'] != sys.byteorder:
+            return None
+        if any(array(typecode).itemsize != header['itemsize'].get(typecode) for _, typecode in _CACHE_ARRAYS):
+            return None
+        signature = _csv_signature(csv_path, with_hash=False)
+        if signature['size'] != header['csv']['size']:
+            return None
+        if signature['mtime_ns'] != header['csv']['mtime_ns'] and _csv_signature(csv_path)['hash'] != header['csv']['hash']:
+            return None
+
+        # Com strict=True, um CSV com erros tem de ser relido para os reportar
+        if strict and header['issues']:
+            return None
+
+        buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def block(field):
+        offset, length = header['layout'][field]
+        return buffer[start + offset:start + offset + length]
+
+    names = bytes(block('names')).decode('utf-8').split("\0") if header['num_guests'] else []
+    arrays = {field: block(field).cast(typecode) for field, typecode in _CACHE_ARRAYS}
+    strengths = {field: block(field).cast('d') if field in header['layout'] else None for field in _CACHE_STRENGTHS}
+
+    cached_scoring = problem_model.ScoringModel(**header['scoring'])
+    problem = problem_model.Problem(names, arrays['prefer_offsets'], arrays['prefer_targets'], arrays['avoid_offsets'],
+                                    arrays['avoid_targets'], header['perfect_score'],
+                                    pair_graph=(arrays['offsets'], arrays['neighbors'], arrays['weights'], header['self_cost']),
+                                    scoring=cached_scoring, prefer_strengths=strengths['prefer_strengths'],
+                                    avoid_strengths=strengths['avoid_strengths'])
+    problem.issues = header['issues']
+    if scoring is not None and scoring != cached_scoring:
+        problem = problem.with_scoring(scoring)
+    return problem
 
 # ========================================================================================================================================================
 # Função: generate_output_folder
@@ -46,18 +319,19 @@ def generate_output_folder():
 # ========================================================================================================================================================
 # Função: write_seating_arrangement
 # Descrição: Escreve os resultados da disposição das mesas num ficheiro .txt.
-#            Inclui métricas se forem fornecidas (score, optimality, etc).
+#            Inclui métricas se forem fornecidas (score, referência exata, etc).
 #
 # Parâmetros:
 #   - tables: lista de listas com os convidados por mesa
 #   - filename: caminho do ficheiro onde guardar (se None, cria novo em pasta com timestamp)
 #   - current_score: score da disposição gerada
-#   - perfect_score: score teórico máximo possível
-#   - optimality: percentagem de quão perto está do score perfeito
+#   - perfect_score: score se todas as preferências fossem satisfeitas (quase nunca atingível, só informativo)
+#   - reference: info de exact.branch_and_bound (opcional); escreve o score ótimo e a distância a ele, ou só o melhor score
+#     do branch and bound se o ótimo não foi provado
 #   - algorithm: nome do algoritmo usado
 # ========================================================================================================================================================
 
-def write_seating_arrangement(tables, filename=None, current_score=None, perfect_score=None, optimality=None, algorithm=None):
+def write_seating_arrangement(tables, filename=None, current_score=None, perfect_score=None, reference=None, algorithm=None):
 
     # Se não for fornecido um nome, cria uma pasta nova com timestamp
     if filename is None:
@@ -82,9 +356,15 @@ def write_seating_arrangement(tables, filename=None, current_score=None, perfect
                 txtfile.write(f"Algorithm: {algorithm}\n")
             txtfile.write(f"Score: {round(current_score,2)}\n")
             if perfect_score is not None:
-                txtfile.write(f"Perfect Score: {round(perfect_score,2)}\n")
-            if optimality is not None:
-                txtfile.write(f"Optimality: {round(optimality,1)}%\n\n")
+                txtfile.write(f"Perfect Score (all preferences met, usually unreachable): {round(perfect_score,2)}\n")
+            if reference is not None:
+                best_score = -reference['cost']
+                if reference['optimal']:
+                    gap = (best_score - current_score) / abs(best_score) * 100 if best_score else 0
+                    txtfile.write(f"Optimal Score (Branch and Bound): {round(best_score,2)} (gap {round(gap,1)}%)\n")
+                else:
+                    txtfile.write(f"Best Score (Branch and Bound, not proven optimal): {round(best_score,2)}\n")
+            txtfile.write("\n")
         
         # Escrita das mesas
         txtfile.write("-------------------- Tables ---------------------\n\n")
@@ -1,9 +1,14 @@
 import pygame  
 import Project1.file_handler as file_handler
 import Project1.seater as seater
+import Project1.problem as problem_model
+import Project1.decompose as decompose
 import Project1.ui as ui
 import os
 import Project1.benchmark as benchmark
+import Project1.plotting as plotting
+import Project1.background as background
+import Project1.exact as exact
 
 pygame.init()
 
@@ -33,19 +38,59 @@ params = {
     "initial_temperature": 200,
     "cooling_rate": 0.98,
     "iterations": 2000,
-    "mutation_rate": 0.01,
     "population_size": 50,
+    "num_replicas": 8,
+    "num_islands": 4,
+    "coarse_starts": 8,             # Disposições iniciais no nível mais grosseiro do Multilevel
+    "workers": None,                # Processos para as réplicas / ilhas (None = todos os cores)
+    "time_limit": None,             # Orçamento de tempo em segundos (None = sem limite, ver seater.solve)
+    "target_cost": None,            # Para quando o custo chegar a este valor
+    "stagnation": None,             # Para ao fim de N passos sem melhorar
+    "seed": None,                   # Semente das corridas (None = aleatória; ver seater.make_rng)
     "cooling_type": "exponential",  # Tipo de arrefecimento por default
+    "crossover": "slice",           # Crossover dos genéticos: "slice", "tables" ou "gpx" (ver seater.GA_CROSSOVERS)
+    "presolve": "off",              # Pré-resolução com super-nós e separações obrigatórias: "off" ou "on"
+    "polish": "off",                # Pós-otimização até um ótimo local: "off", "first" ou "steepest"
+    "decompose": "off",             # "on" resolve por comunidades (listas muito grandes, ver decompose.solve_decomposed)
+    "part_size": 250,               # Máximo de convidados por parte na decomposição
     "algorithm": "Simulated Annealing"  # Algoritmo selecionado por default
 }
 
-# Ler os dados dos convidados
-guests = file_handler.read_guest_preferences("guest_list.csv")
+# ============================================================================================================================================================
+# Função: solve_with_reference
+# Descrição: Corre o algoritmo (solver é seater.solve ou decompose.solve_decomposed) e, em listas pequenas (até
+# exact.EXACT_GUEST_LIMIT convidados), o branch and bound a partir da disposição encontrada, para servir de referência.
+# Corre dentro da BackgroundJob, para o loop do Pygame não parar à espera do branch and bound (que também para com o
+# "Cancel"; sem a prova do ótimo a referência fica com optimal=False). Se o algoritmo foi cancelado não há referência.
+# Devolve (mesas, métricas, referência).
+# ============================================================================================================================================================
+
+def solve_with_reference(solver, problem, algorithm, params, progress=None):
+
+    tables, metrics = solver(problem, algorithm, params, progress=progress)
+    reference = None
+    if problem.num_guests <= exact.EXACT_GUEST_LIMIT and metrics.get('stop_reason') != "cancelled":
+        _, reference = exact.branch_and_bound(problem, params["min_per_table"], params["max_per_table"], time_limit=5,
+                                              initial_tables=problem_model.encode_tables(tables, problem), progress=progress)
+    return tables, metrics, reference
+
+# Ler os dados dos convidados: o Problem (da cache binária, se estiver atualizada) é o que os algoritmos e as tarefas usam;
+# o dicionário de nomes só serve para a interface mostrar e editar os convidados
+problem = file_handler.load_problem("guest_list.csv")
+guests = problem_model.to_guests(problem)
 
 # Gerar uma disposição inicial aleatória e equilibrada
-tables = seater.create_balanced_seating(guests, params["min_per_table"], params["max_per_table"])  
+tables = problem_model.decode_tables(seater.create_balanced_seating(problem, params["min_per_table"], params["max_per_table"]), problem)
 
 current_score = None  # Vai ser calculado após correr o algoritmo
+reference = None      # Ótimo do branch and bound (só em listas pequenas, ver exact.EXACT_GUEST_LIMIT)
+
+# Tarefa em segundo plano (algoritmo, benchmark ou comparação) e o seu tipo
+job = None
+job_kind = None
+job_cancel_button = None
+
+clock = pygame.time.Clock()
 
 running = True  # Controla o loop principal da aplicação
 
@@ -53,6 +98,31 @@ running = True  # Controla o loop principal da aplicação
 while running:
     screen.fill((255, 255, 255))
 
+    # Verifica o progresso da tarefa em curso e trata o resultado quando termina
+    if job is not None and job.poll():
+        if job.error is not None:
+            print(f"Error: {job.error}")
+        elif job_kind == "solve":
+            # Um algoritmo cancelado devolve a melhor disposição encontrada até ao cancelamento
+            tables, metrics, reference = job.result
+            output_folder = file_handler.generate_output_folder()
+            plotting.plot_metrics_in_background(metrics, save_dir=output_folder)
+
+            current_score = -seater.calculate_cost(problem_model.encode_tables(tables, problem), problem)
+            perfect_score = seater.calculate_theoretical_perfect_score(problem)
+
+            file_handler.write_seating_arrangement(
+                tables,
+                filename=os.path.join(output_folder, "seating.txt"),
+                current_score=current_score,
+                perfect_score=perfect_score,
+                reference=reference,
+                algorithm=job.label
+            )
+            state = VIEW_SEATING
+        job = None
+        job_kind = None
+
     # Desenha o ecrã consoante o estado atual
     if state == MENU:
         button1_rect, button2_rect = ui.draw_main_menu(screen, font)
@@ -62,9 +132,11 @@ while running:
         input_box, guest_buttons, save_button, cancel_button = ui.draw_add_guest_menu(
             screen, font, new_guest_name, selected_prefers, selected_avoids, list(guests.keys()), input_active)
     elif state == VIEW_SEATING:
-        back_button, retry_button = ui.draw_seating_arrangement(screen, tables, font, score=current_score, guests=guests)
+        back_button, retry_button, job_cancel_button = ui.draw_seating_arrangement(screen, tables, font, score=current_score, guests=guests, job=job,
+                                                                                       reference=reference)
     elif state == PARAMETER_SELECTION:
-        param_buttons, back_button, start_button, benchmark_button, compare_button = ui.draw_parameter_selection(screen, font, params)
+        param_buttons, back_button, start_button, benchmark_button, compare_button, job_cancel_button = ui.draw_parameter_selection(
+            screen, font, params, job=job)
 
     # Processa os eventos do utilizador
     for event in pygame.event.get():
@@ -129,6 +201,7 @@ while running:
                                 "prefers": selected_prefers[:],
                                 "avoids": selected_avoids[:]
                             }
+                            problem = problem_model.compile_problem(guests)     # Recompila uma vez por alteração
                             state = VIEW_PREFERENCES
 
                     if cancel_button.collidepoint(mouse_pos):
@@ -137,123 +210,55 @@ while running:
                 elif state == VIEW_SEATING:
                     if back_button.collidepoint(mouse_pos):
                         state = MENU
-                    elif retry_button.collidepoint(mouse_pos):
-                        # Retry o algoritmo com os mesmos parâmetros
+                    elif job_cancel_button is not None and job_cancel_button.collidepoint(mouse_pos):
+                        job.cancel()
+                    elif retry_button.collidepoint(mouse_pos) and job is None:
+                        # Retry o algoritmo com os mesmos parâmetros (numa thread, a interface continua a responder)
                         try:
                             seater.validate_parameters(params, len(guests))
-                            output_folder = file_handler.generate_output_folder()
                             print("Retrying with parameters:", params)
-                            if params["algorithm"] == "Simulated Annealing":
-                                tables = seater.simulated_annealing(
-                                    guests=guests,
-                                    initial_temperature=params["initial_temperature"],
-                                    cooling_rate=params["cooling_rate"],
-                                    iterations=params["iterations"],
-                                    cooling_type=params["cooling_type"],
-                                    min_per_table=params["min_per_table"],
-                                    max_per_table=params["max_per_table"],
-                                    output_folder=output_folder
-                                )
-                            elif params["algorithm"] == "Genetic Algorithm":
-                                
-                                tables = seater.genetic_algorithm(
-                                    guests=guests,
-                                    min_per_table=params["min_per_table"],
-                                    max_per_table=params["max_per_table"],
-                                    population_size=params["population_size"],
-                                    generations=params["iterations"],
-                                    mutation_rate=params["mutation_rate"],
-                                    output_folder=output_folder
-                                )
-                            elif params["algorithm"] == "Hill Climbing":
-                                tables = seater.hill_climbing(
-                                    guests=guests,
-                                    min_per_table=params["min_per_table"],
-                                    max_per_table=params["max_per_table"],
-                                    iterations=params["iterations"],
-                                    output_folder=output_folder
-                                )
-
-                            current_score = -seater.calculate_cost(tables, guests)
-                            perfect_score = seater.calculate_theoretical_perfect_score(guests)
-                            optimality = (current_score / perfect_score * 100) if perfect_score > 0 else 0
-
-                            file_handler.write_seating_arrangement(
-                                tables,
-                                filename=os.path.join(output_folder, "seating.txt"),
-                                current_score=current_score,
-                                perfect_score=perfect_score,
-                                optimality=optimality,
-                                algorithm=params["algorithm"]
-                            )
+                            solver = decompose.solve_decomposed if params["decompose"] == "on" else seater.solve
+                            job = background.BackgroundJob(params["algorithm"], solve_with_reference, solver, problem, params["algorithm"],
+                                                           dict(params))
+                            job_kind = "solve"
                         except Exception as e:
                             print(f"Error: {e}")
 
                 elif state == PARAMETER_SELECTION:
                     if back_button.collidepoint(mouse_pos):
                         state = MENU
+                    elif job_cancel_button is not None and job_cancel_button.collidepoint(mouse_pos):
+                        job.cancel()
+                    elif job is not None:
+                        pass    # Só uma tarefa de cada vez
                     elif benchmark_button.collidepoint(mouse_pos):
                         try:
                             seater.validate_parameters(params, len(guests))
-                            benchmark.run_benchmark(guests, params, params["algorithm"], n_runs=10)
+                            job = background.BackgroundJob("Benchmark", benchmark.run_benchmark, problem, dict(params), params["algorithm"],
+                                                           n_runs=10, workers=None, seed=params["seed"])
+                            job_kind = "benchmark"
                         except Exception as e:
                             print(f"Benchmark error: {e}")
                     elif compare_button.collidepoint(mouse_pos):
                         try:
                             seater.validate_parameters(params, len(guests))
-                            algorithms_to_test = ["Simulated Annealing", "Genetic Algorithm", "Hill Climbing"]
-                            benchmark.compare_algorithms(guests, algorithms_to_test, params, n_runs=10)
+                            algorithms_to_test = list(seater.ALGORITHMS)
+                            if params["crossover"] != "slice":
+                                # Compara também com o crossover original
+                                algorithms_to_test += benchmark.crossover_variants(crossovers=["slice"])
+                            job = background.BackgroundJob("Compare", benchmark.compare_algorithms, problem, algorithms_to_test, dict(params),
+                                                           n_runs=10, workers=None, seed=params["seed"])
+                            job_kind = "compare"
                         except Exception as e:
                             print(f"Erro ao comparar algoritmos: {e}")
                     elif start_button.collidepoint(mouse_pos):
                         try:
                             seater.validate_parameters(params, len(guests))
                             print("Starting with parameters:", params)
-                            output_folder = file_handler.generate_output_folder()
-
-                            if params["algorithm"] == "Simulated Annealing":
-                                tables = seater.simulated_annealing(
-                                    guests=guests,
-                                    initial_temperature=params["initial_temperature"],
-                                    cooling_rate=params["cooling_rate"],
-                                    iterations=params["iterations"],
-                                    cooling_type=params["cooling_type"],
-                                    min_per_table=params["min_per_table"],
-                                    max_per_table=params["max_per_table"],
-                                    output_folder=output_folder
-                                )
-                            elif params["algorithm"] == "Genetic Algorithm":
-                                tables = seater.genetic_algorithm(
-                                    guests=guests,
-                                    min_per_table=params["min_per_table"],
-                                    max_per_table=params["max_per_table"],
-                                    population_size=params["population_size"],
-                                    generations=params["iterations"],
-                                    mutation_rate=params["mutation_rate"],
-                                    output_folder=output_folder
-                                )
-                            elif params["algorithm"] == "Hill Climbing":
-                                tables = seater.hill_climbing(
-                                    guests=guests,
-                                    min_per_table=params["min_per_table"],
-                                    max_per_table=params["max_per_table"],
-                                    iterations=params["iterations"],
-                                    output_folder=output_folder
-                                )
-
-                            current_score = -seater.calculate_cost(tables, guests)
-                            perfect_score = seater.calculate_theoretical_perfect_score(guests)
-                            optimality = (current_score / perfect_score * 100) if perfect_score > 0 else 0
-
-                            file_handler.write_seating_arrangement(
-                                tables,
-                                filename=os.path.join(output_folder, "seating.txt"),
-                                current_score=current_score,
-                                perfect_score=perfect_score,
-                                optimality=optimality,
-                                algorithm=params["algorithm"]
-                            )
-                            state = VIEW_SEATING
+                            solver = decompose.solve_decomposed if params["decompose"] == "on" else seater.solve
+                            job = background.BackgroundJob(params["algorithm"], solve_with_reference, solver, problem, params["algorithm"],
+                                                           dict(params))
+                            job_kind = "solve"
                         except Exception as e:
                             print(f"Error: {e}")
                     else:
@@ -261,11 +266,19 @@ while running:
                         for rect, key, operation in param_buttons:
                             if rect.collidepoint(mouse_pos):
                                 if key == "cooling_type":
-                                    types = ["exponential", "linear", "logarithmic"]
+                                    types = seater.COOLING_TYPES
                                     idx = types.index(params[key])
                                     params[key] = types[(idx + 1) % len(types)]
+                                elif key in ("presolve", "decompose"):
+                                    params[key] = "on" if params[key] == "off" else "off"
+                                elif key == "crossover":
+                                    crossovers = seater.GA_CROSSOVERS
+                                    params[key] = crossovers[(crossovers.index(params[key]) + 1) % len(crossovers)]
+                                elif key == "polish":
+                                    modes = ["off", "first", "steepest"]
+                                    params[key] = modes[(modes.index(params[key]) + 1) % len(modes)]
                                 elif key == "algorithm":
-                                    algorithms = ["Simulated Annealing", "Genetic Algorithm", "Hill Climbing"]
+                                    algorithms = seater.ALGORITHMS
                                     idx = algorithms.index(params[key])
                                     params[key] = algorithms[(idx + 1) % len(algorithms)]
                                 else:
@@ -275,14 +288,21 @@ while running:
                                         "initial_temperature": (10, 10, 1000),
                                         "cooling_rate": (0.005, 0.01, 1.0),
                                         "iterations": (100, 100, 10000),
-                                        "mutation_rate": (0.01, 0.01, 1.0),
                                         "population_size": (10, 10, 500),
+                                        "num_replicas": (1, 2, 32),
+                                        "num_islands": (1, 2, 32),
+                                        "coarse_starts": (1, 1, 64),
                                     }[key]
-                                    new_value = round(params[key] + (operation * step), 3)
-                                    params[key] = max(min(new_value, max_val), min_val)
+                                    if key == "initial_temperature" and (params[key] == "auto" or (operation < 0 and params[key] <= min_val)):
+                                        # Abaixo do mínimo a temperatura passa a "auto" (calibrada para a instância)
+                                        params[key] = min_val if params[key] == "auto" else "auto"
+                                    else:
+                                        new_value = round(params[key] + (operation * step), 3)
+                                        params[key] = max(min(new_value, max_val), min_val)
 
-    # Atualiza o ecrã
+    # Atualiza o ecrã (limitado a 30 fps para deixar o processador para a tarefa em curso)
     pygame.display.flip()
+    clock.tick(30)
 
 # Termina a aplicação
 pygame.quit()
\ No newline at end of file
@@ -0,0 +1,112 @@
+from array import array
+import numpy as np
+
+# ============================================================================================================================================================
+# Classe: MetricsRecorder
+# Descrição: Guarda as métricas de uma execução com um número limitado de pontos, para corridas longas (milhões de iterações)
+# não gastarem memória com listas enormes nem produzirem gráficos lentos. Cada campo é guardado num array('d').
+#
+# Modos:
+#   - "stride": guarda uma amostra a cada "stride" registos. Quando os buffers enchem, fica com metade dos pontos e
+#     duplica o stride, por isso o histórico fica sempre espalhado uniformemente pela corrida.
+#   - "minmax": junta os registos em blocos de "stride" e guarda, de cada bloco, a amostra com o menor e a com o maior
+#     valor do campo "key" (pela ordem em que aconteceram). Os picos continuam visíveis nos gráficos. Quando os buffers
+#     enchem, cada dois blocos são fundidos num só da mesma forma.
+#
+# max_points é o número máximo de pontos guardados por campo. finish() devolve um dicionário {campo: array NumPy}
+# que os gráficos (plotting.py) usam diretamente.
+# ============================================================================================================================================================
+
+class MetricsRecorder:
+
+    def __init__(self, fields, max_points=2000, mode="minmax", key=None):
+        if mode not in ("stride", "minmax"):
+            raise ValueError(f"Unsupported metrics mode: {mode}")
+        if max_points < 4:
+            raise ValueError("max_points must be at least 4.")
+
+        self.fields = tuple(fields)
+        self.mode = mode
+        self.max_points = max_points - max_points % 4                 # Múltiplo de 4 para a fusão de blocos
+        self.key = self.fields.index(key) if key is not None else min(1, len(self.fields) - 1)
+        self.stride = 1
+        self.count = 0
+
+        self._buffers = [array('d') for _ in self.fields]
+        self._bucket_low = None                                     # Amostra com o menor valor do bloco atual
+        self._bucket_high = None                                    # Amostra com o maior valor do bloco atual
+        self._bucket_first = None                                   # Qual das duas apareceu primeiro
+        self._bucket_size = 0
+
+    def __len__(self):
+        return len(self._buffers[0])
+
+    def record(self, *values):
+        self.count += 1
+
+        if self.mode == "stride":
+            if (self.count - 1) % self.stride:
+                return
+            if len(self._buffers[0]) >= self.max_points:
+                self._halve()
+                if (self.count - 1) % self.stride:
+                    return
+            for buffer, value in zip(self._buffers, values):
+                buffer.append(value)
+            return
+
+        # minmax
+        value = values[self.key]
+        if self._bucket_size == 0:
+            self._bucket_low = self._bucket_high = values
+            self._bucket_first = 'low'
+        elif value < self._bucket_low[self.key]:
+            self._bucket_low = values
+            self._bucket_first = 'high'
+        elif value > self._bucket_high[self.key]:
+            self._bucket_high = values
+            self._bucket_first = 'low'
+        self._bucket_size += 1
+
+        if self._bucket_size >= self.stride:
+            self._flush_bucket()
+
+    # Fecha o bloco atual: guarda o mínimo e o máximo pela ordem em que apareceram
+    def _flush_bucket(self):
+        if self._bucket_size == 0:
+            return
+        if len(self._buffers[0]) >= self.max_points:
+            self._merge_buckets()
+
+        if self._bucket_first == 'low':
+            first, second = self._bucket_low, self._bucket_high
+        else:
+            first, second = self._bucket_high, self._bucket_low
+        for buffer, a, b in zip(self._buffers, first, second):
+            buffer.append(a)
+            buffer.append(b)
+        self._bucket_size = 0
+
+    # Modo "stride": fica com os pontos de índice par e duplica o stride
+    def _halve(self):
+        self._buffers = [buffer[::2] for buffer in self._buffers]
+        self.stride *= 2
+
+    # Modo "minmax": cada dois blocos (4 pontos) passam a um só (o menor e o maior dos 4)
+    def _merge_buckets(self):
+        key_values = self._buffers[self.key]
+        merged = [array('d') for _ in self.fields]
+        for start in range(0, len(key_values) - 3, 4):
+            points = range(start, start + 4)
+            low = min(points, key=key_values.__getitem__)
+            high = max(points, key=key_values.__getitem__)
+            for buffer, target in zip(self._buffers, merged):
+                target.append(buffer[min(low, high)])
+                target.append(buffer[max(low, high)])
+        self._buffers = merged
+        self.stride *= 2
+
+    def finish(self):
+        if self.mode == "minmax":
+            self._flush_bucket()
+        return {field: np.frombuffer(buffer, dtype=np.float64).copy() for field, buffer in zip(self.fields, self._buffers)}
@@ -1,5 +1,60 @@
-import matplotlib.pyplot as plt
 import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# O matplotlib só é importado quando um gráfico é mesmo desenhado (os algoritmos não dependem dele)
+_plt = None
+
+# ============================================================================================================================================================
+# Função: _pyplot
+# Descrição: Importa o matplotlib (backend "Agg": os gráficos só são guardados em ficheiro) na primeira utilização.
+# ============================================================================================================================================================
+
+def _pyplot():
+    global _plt
+    if _plt is None:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        _plt = plt
+    return _plt
+
+# ============================================================================================================================================================
+# Função: plot_metrics
+# Descrição: Desenha os gráficos de uma execução a partir das métricas devolvidas pelos algoritmos
+# (escolhe o gráfico pelo campo 'algorithm').
+# ============================================================================================================================================================
+
+def plot_metrics(metrics, save_dir="results"):
+
+    algorithm = metrics.get('algorithm')
+    if algorithm == "Simulated Annealing":
+        plot_performance_metrics(metrics, save_dir=save_dir)
+    elif algorithm in ("Genetic Algorithm", "Island Genetic Algorithm"):
+        plot_genetic_progress(metrics['best_costs'], save_dir=save_dir)
+    elif algorithm == "Hill Climbing":
+        plot_hill_climbing_progress(metrics['costs'], save_dir=save_dir, iterations=metrics.get('iterations'))
+    elif algorithm == "Parallel Tempering":
+        plot_tempering_progress(metrics, save_dir=save_dir)
+    elif algorithm == "Tabu Search":
+        plot_tabu_progress(metrics, save_dir=save_dir)
+    elif algorithm == "Multilevel":
+        plot_multilevel_progress(metrics, save_dir=save_dir)
+
+# ============================================================================================================================================================
+# Função: plot_metrics_in_background
+# Descrição: Desenha os gráficos numa thread à parte (uma só, para o matplotlib nunca ser usado em paralelo), para a
+# interface não ficar à espera. Devolve o Future da tarefa.
+# ============================================================================================================================================================
+
+_background = None
+
+def plot_metrics_in_background(metrics, save_dir="results"):
+    global _background
+    if _background is None:
+        _background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plotting")
+    return _background.submit(plot_metrics, metrics, save_dir)
+
 
 # ============================================================================================================================================================
 # Função: plot_performance_metrics
@@ -8,6 +63,7 @@ import os
 # ============================================================================================================================================================
 
 def plot_performance_metrics(metrics, save_dir="results"):
+    plt = _pyplot()
     os.makedirs(save_dir, exist_ok=True)
 
     # Extrair listas de métricas
@@ -16,9 +72,8 @@ def plot_performance_metrics(metrics, save_dir="results"):
     best_costs = metrics['best_costs']
     temperatures = metrics['temperatures']
 
-    # Calcular variação de custo entre iterações
-    delta_costs = [costs[i] - costs[i-1] for i in range(1, len(costs))]
-    delta_costs.insert(0, 0)  # A primeira iteração não tem delta
+    # Calcular variação de custo entre os pontos guardados (a primeira iteração não tem delta)
+    delta_costs = np.diff(np.asarray(costs, dtype=np.float64), prepend=costs[0] if len(costs) else 0)
 
     # Criar figura com 4 subplots
     fig, axs = plt.subplots(2, 2, figsize=(14, 10))
@@ -65,11 +120,15 @@ def plot_performance_metrics(metrics, save_dir="results"):
 # Descrição: Mostra a evolução do custo durante o Hill Climbing.
 # ============================================================================================================================================================
 
-def plot_hill_climbing_progress(costs, save_dir="results"):
+def plot_hill_climbing_progress(costs, save_dir="results", iterations=None):
+    plt = _pyplot()
     
     os.makedirs(save_dir, exist_ok=True)
     plt.figure(figsize=(6, 4))
-    plt.plot(costs, marker='o', linestyle='-', label='Cost per iteration')
+    if iterations is None:
+        iterations = range(len(costs))
+    # Os marcadores só ajudam com poucos pontos
+    plt.plot(iterations, costs, marker='o' if len(costs) <= 500 else None, linestyle='-', label='Cost per iteration')
     plt.title("Hill Climbing Progress")
     plt.xlabel("Iteration")
     plt.ylabel("Cost")
@@ -78,12 +137,56 @@ def plot_hill_climbing_progress(costs, save_dir="results"):
     plt.savefig(os.path.join(save_dir, "hill_climbing_progress.png"))
     plt.close()
 
+# ============================================================================================================================================================
+# Função: plot_tabu_progress
+# Descrição: Mostra o custo atual (que sobe quando a procura sai de um ótimo local) e o melhor custo durante o Tabu Search.
+# ============================================================================================================================================================
+
+def plot_tabu_progress(metrics, save_dir="results"):
+    plt = _pyplot()
+
+    os.makedirs(save_dir, exist_ok=True)
+    plt.figure(figsize=(6, 4))
+    plt.plot(metrics['iterations'], metrics['costs'], linestyle='-', alpha=0.6, label='Current cost')
+    plt.plot(metrics['iterations'], metrics['best_costs'], linestyle='-', color='red', label='Best cost')
+    plt.title(f"Tabu Search Progress (tenure {metrics.get('tabu_tenure')})")
+    plt.xlabel("Iteration")
+    plt.ylabel("Cost")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(os.path.join(save_dir, "tabu_progress.png"))
+    plt.close()
+
+# ============================================================================================================================================================
+# Função: plot_multilevel_progress
+# Descrição: Mostra o custo depois de refinar cada nível do Multilevel, do nível mais grosseiro (poucos nós) aos convidados.
+# ============================================================================================================================================================
+
+def plot_multilevel_progress(metrics, save_dir="results"):
+    plt = _pyplot()
+
+    os.makedirs(save_dir, exist_ok=True)
+    nodes = list(reversed(metrics['levels']))[:len(metrics['level_costs'])]
+    steps = range(len(nodes))
+    plt.figure(figsize=(6, 4))
+    plt.plot(steps, metrics['level_costs'], marker='o', linestyle='-', color='red')
+    plt.xticks(steps, [str(count) for count in nodes])
+    plt.title("Multilevel Progress (cost after refining each level)")
+    plt.xlabel("Nodes in level")
+    plt.ylabel("Cost")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(os.path.join(save_dir, "multilevel_progress.png"))
+    plt.close()
+
 # ============================================================================================================================================================
 # Função: plot_genetic_progress
 # Descrição: Mostra a evolução do melhor score por geração no Genetic Algorithm.
 # ============================================================================================================================================================
 
 def plot_genetic_progress(best_scores, best_costs=None, save_dir="results"):
+    plt = _pyplot()
 
     os.makedirs(save_dir, exist_ok=True)
     plt.figure(figsize=(8, 5))
@@ -104,4 +207,61 @@ def plot_genetic_progress(best_scores, best_costs=None, save_dir="results"):
     plt.savefig(os.path.join(save_dir, "genetic_progress.png"))
     plt.close()
 
+# ============================================================================================================================================================
+# Função: plot_tempering_progress
+# Descrição: Mostra a evolução do melhor custo e do custo de cada réplica (por temperatura) no Parallel Tempering.
+# ============================================================================================================================================================
+
+def plot_tempering_progress(metrics, save_dir="results"):
+    plt = _pyplot()
 
+    os.makedirs(save_dir, exist_ok=True)
+    plt.figure(figsize=(8, 5))
+
+    iterations = metrics['iterations']
+    replica_costs = metrics['replica_costs']
+
+    for k, temperature in enumerate(metrics['temperatures']):
+        plt.plot(iterations, [costs[k] for costs in replica_costs], linewidth=0.8, alpha=0.6, label=f'T = {temperature:.2f}')
+
+    plt.plot(iterations, metrics['best_costs'], color='red', linestyle='--', linewidth=2, label='Best Cost')
+
+    plt.title("Parallel Tempering Progress")
+    plt.xlabel("Iteration")
+    plt.ylabel("Cost")
+    plt.legend(fontsize='small')
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(os.path.join(save_dir, "tempering_progress.png"))
+    plt.close()
+
+# ============================================================================================================================================================
+# Função: plot_cost_boxplot
+# Descrição: Boxplot dos custos finais das corridas de um benchmark ("boxplot.png").
+# ============================================================================================================================================================
+
+def plot_cost_boxplot(best_costs, algorithm, save_dir):
+    plt = _pyplot()
+    n_runs = len(best_costs)
+    plt.figure(figsize=(6, 6))
+    plt.boxplot(best_costs, vert=True, patch_artist=True)
+    plt.title(f"{algorithm} - Cost Distribution over {n_runs} Runs")
+    plt.ylabel("Final Cost")
+    plt.grid(True)
+    plt.savefig(os.path.join(save_dir, "boxplot.png"))
+    plt.close()
+
+# ============================================================================================================================================================
+# Função: plot_cost_comparison
+# Descrição: Boxplot comparativo dos custos finais de vários algoritmos ("comparison_boxplot.png").
+# ============================================================================================================================================================
+
+def plot_cost_comparison(all_costs, n_runs, save_dir):
+    plt = _pyplot()
+    plt.figure(figsize=(8, 6))
+    plt.boxplot(all_costs.values(), labels=all_costs.keys())
+    plt.title(f"Cost Comparison over {n_runs} Runs")
+    plt.ylabel("Final Cost")
+    plt.grid(True)
+    plt.savefig(os.path.join(save_dir, "comparison_boxplot.png"))
+    plt.close()
@@ -0,0 +1,166 @@
+from array import array
+
+# ============================================================================================================================================================
+# Classe: Presolve
+# Descrição: Resultado da pré-resolução de um Problem: as relações fortes passam a restrições antes da otimização.
+#   - "must-join": convidados que se preferem mutuamente (casais, amigos) são fundidos em super-nós (groups), que os
+#     algoritmos movem sempre juntos
+#   - "must-separate": pares que se evitam mutuamente (custo do par de pelo menos dois "avoids", sem preferências que o
+#     compensem) ou, se o modelo de pontuação tiver hard_avoids, todos os pares com um "avoid"; nenhum movimento os junta.
+#     Os "avoids" num só sentido continuam a ser penalizações: muitas vezes a melhor disposição junta alguns desses pares.
+#
+# Campos:
+#   - groups: lista de super-nós (tuplos de ids); convidados sem fusões formam um super-nó sozinhos
+#   - group_of: array('i') convidado -> índice do seu super-nó
+#   - separate: para cada convidado, o tuplo dos convidados de quem tem de ficar separado
+#   - info: {'groups', 'merged_pairs', 'skipped_pairs', 'largest_group', 'separated_pairs', 'max_group_size'}
+# ============================================================================================================================================================
+
+class Presolve:
+
+    def __init__(self, groups, group_of, separate, info):
+        self.groups = groups
+        self.group_of = group_of
+        self.separate = separate
+        self.info = info
+
+    # Convidados de "members" que ficariam numa mesa com alguém de quem têm de estar separados (ignorando "leaving")
+    def conflicts(self, members, table, seat_of, leaving=()):
+        separate = self.separate
+        return sum(1 for guest in members for other in separate[guest] if seat_of[other] == table and other not in leaving)
+
+# ============================================================================================================================================================
+# Função: presolve
+# Descrição: Constrói os super-nós e as restrições de separação de um Problem.
+# Os pares que se preferem mutuamente são fundidos dos mais fortes (mais negativos) para os mais fracos com union-find,
+# exceto se a fusão juntasse dois convidados que têm de ficar separados ou criasse um super-nó maior que max_group_size.
+# Por omissão os super-nós são pares (casais): super-nós maiores prendem cadeias de preferências que a melhor disposição
+# muitas vezes separa, e pioraram os resultados nos testes. sizes são as capacidades das mesas (seater._table_sizes); um
+# super-nó nunca é maior que metade da mesa mais pequena, para as mesas continuarem a poder ser preenchidas por igual.
+# O resultado fica guardado no próprio Problem (um por capacidade máxima de super-nó).
+# ============================================================================================================================================================
+
+def presolve(problem, sizes, max_group_size=2):
+
+    max_group_size = max(1, min(max_group_size, min(sizes) // 2 if sizes else 1))
+    cached = problem._presolved.get(max_group_size)
+    if cached is not None:
+        return cached
+
+    num_guests = problem.num_guests
+    offsets, neighbors, weights = problem.offsets, problem.neighbors, problem.weights
+
+    # Restrições de separação: vizinhos com custo de pelo menos dois "avoids" (ou de um "avoid" rígido)
+    scoring = problem.scoring
+    threshold = scoring.hard_avoid_weight if scoring.hard_avoids else 2 * scoring.avoid_cost()
+    separate = [tuple(neighbors[k] for k in range(offsets[g], offsets[g + 1]) if weights[k] > 0 and weights[k] >= threshold)
+                for g in range(num_guests)]
+
+    # Pares que se preferem mutuamente, com o peso do par
+    prefers = [set(problem.prefer_targets[problem.prefer_offsets[g]:problem.prefer_offsets[g + 1]]) for g in range(num_guests)]
+    candidates = []
+    for g in range(num_guests):
+        for k in range(offsets[g], offsets[g + 1]):
+            other = neighbors[k]
+            if other > g and weights[k] < 0 and other in prefers[g] and g in prefers[other]:
+                candidates.append((weights[k], g, other))
+    candidates.sort()
+
+    # Union-find com os membros de cada raiz (para verificar as separações ao fundir)
+    parent = list(range(num_guests))
+    members = [[g] for g in range(num_guests)]
+
+    def find(g):
+        while parent[g] != g:
+            parent[g] = parent[parent[g]]
+            g = parent[g]
+        return g
+
+    merged = skipped = 0
+    for _, g, other in candidates:
+        root1, root2 = find(g), find(other)
+        if root1 == root2:
+            continue
+        if len(members[root1]) + len(members[root2]) > max_group_size:
+            skipped += 1
+            continue
+        if len(members[root1]) > len(members[root2]):
+            root1, root2 = root2, root1
+        if any(find(enemy) == root2 for guest in members[root1] for enemy in separate[guest]):
+            skipped += 1
+            continue
+        parent[root1] = root2
+        members[root2].extend(members[root1])
+        members[root1] = []
+        merged += 1
+
+    groups = [tuple(sorted(members[g])) for g in range(num_guests) if parent[g] == g]
+    group_of = array('i', [0]) * num_guests
+    for index, group in enumerate(groups):
+        for guest in group:
+            group_of[guest] = index
+
+    info = {
+        'groups': len(groups),
+        'merged_pairs': merged,
+        'skipped_pairs': skipped,
+        'largest_group': max((len(group) for group in groups), default=0),
+        'separated_pairs': sum(len(enemies) for enemies in separate) // 2,
+        'max_group_size': max_group_size
+    }
+    result = Presolve(groups, group_of, separate, info)
+    problem._presolved[max_group_size] = result
+    return result
+
+# ============================================================================================================================================================
+# Função: presolved_seating
+# Descrição: Disposição inicial que respeita as restrições: os super-nós são sentados do maior para o menor (os empates
+# pela ordem de rng) na mesa com lugar que tem menos conflitos de separação e, entre essas, a melhor afinidade com quem
+# já lá está, onde entram os "avoids" que não são restrições (sem vizinhos sentados, a mais vazia). Um super-nó que já
+# não cabe inteiro em nenhuma mesa é sentado convidado a convidado. As mesas ficam com as capacidades de sizes.
+# ============================================================================================================================================================
+
+def presolved_seating(problem, presolved, sizes, rng):
+
+    offsets, neighbors, weights = problem.offsets, problem.neighbors, problem.weights
+    separate = presolved.separate
+    num_tables = len(sizes)
+    tables = [[] for _ in range(num_tables)]
+    room = list(sizes)
+    seat_of = array('i', [-1]) * problem.num_guests
+
+    order = sorted(presolved.groups, key=lambda group: (-len(group), rng.random()))
+
+    def place(members):
+        # Conflitos de separação e afinidade com as mesas onde já há vizinhos sentados
+        touched = {}
+        for guest in members:
+            enemies = separate[guest]
+            for k in range(offsets[guest], offsets[guest + 1]):
+                table = seat_of[neighbors[k]]
+                if table >= 0:
+                    conflicts, affinity = touched.get(table, (0, 0))
+                    touched[table] = (conflicts + (neighbors[k] in enemies), affinity + weights[k])
+
+        best_key, best_table = None, -1
+        for table in range(num_tables):
+            if room[table] < len(members):
+                continue
+            conflicts, affinity = touched.get(table, (0, 0))
+            key = (conflicts, affinity, -room[table])
+            if best_key is None or key < best_key:
+                best_key, best_table = key, table
+        if best_table < 0:
+            return False
+
+        for guest in members:
+            tables[best_table].append(guest)
+            seat_of[guest] = best_table
+        room[best_table] -= len(members)
+        return True
+
+    for group in order:
+        if not place(group):
+            for guest in group:
+                place((guest,))
+    return tables
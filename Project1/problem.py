@@ -0,0 +1,457 @@
+from array import array
+from collections import OrderedDict
+import hashlib
+import numpy as np
+
+# ============================================================================================================================================================
+# Classe: ScoringModel
+# Descrição: Modelo de pontuação usado por todos os avaliadores (calculate_cost, evaluate_seating, deltas dos movimentos,
+# avaliação em lote e branch and bound). É compilado uma só vez, quando o Problem é criado, no grafo de pares com pesos
+# (offsets / neighbors / weights): os ciclos dos algoritmos só somam pesos e nunca voltam a olhar para o tipo de relação.
+#
+# Campos:
+#   - prefer_weight: recompensa de cada preferência (por direção), multiplicada pela força da relação
+#   - avoid_weight: penalização de cada "avoid" (por direção), multiplicada pela força da relação
+#   - hard_avoids: com True os "avoids" passam a restrições rígidas: cada um custa hard_avoid_weight (sem força), muito
+#     acima de qualquer ganho possível, por isso os algoritmos só os deixam juntos se não houver alternativa
+#   - spread_penalty: penalização por convidado de diferença entre a maior e a menor mesa (quando a diferença passa de 1)
+#   - size_penalty: penalização por convidado de desvio de cada mesa ao tamanho médio
+# Os valores por omissão são os do custo original (+20 por "avoid", -10 por preferência, 200 e 20 de equilíbrio).
+# ============================================================================================================================================================
+
+class ScoringModel:
+
+    def __init__(self, prefer_weight=10, avoid_weight=20, hard_avoids=False, hard_avoid_weight=10000, spread_penalty=200,
+                 size_penalty=20):
+        for name, value in (('prefer_weight', prefer_weight), ('avoid_weight', avoid_weight), ('hard_avoid_weight', hard_avoid_weight),
+                            ('spread_penalty', spread_penalty), ('size_penalty', size_penalty)):
+            if value < 0:
+                raise ValueError(f"{name} must be non-negative.")
+
+        self.prefer_weight = prefer_weight
+        self.avoid_weight = avoid_weight
+        self.hard_avoids = bool(hard_avoids)
+        self.hard_avoid_weight = hard_avoid_weight
+        self.spread_penalty = spread_penalty
+        self.size_penalty = size_penalty
+
+    # Campos do modelo (guardados na cache binária para saber se o grafo de pares guardado ainda serve)
+    def to_dict(self):
+        return {
+            'prefer_weight': self.prefer_weight,
+            'avoid_weight': self.avoid_weight,
+            'hard_avoids': self.hard_avoids,
+            'hard_avoid_weight': self.hard_avoid_weight,
+            'spread_penalty': self.spread_penalty,
+            'size_penalty': self.size_penalty
+        }
+
+    def __eq__(self, other):
+        return isinstance(other, ScoringModel) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return "ScoringModel(" + ", ".join(f"{name}={value}" for name, value in self.to_dict().items()) + ")"
+
+    # Custo de um "avoid" (por direção) com uma dada força
+    def avoid_cost(self, strength=1):
+        return self.hard_avoid_weight if self.hard_avoids else self.avoid_weight * strength
+
+    # Penalizações de equilíbrio a partir dos tamanhos das mesas
+    def balance_penalty(self, table_sizes):
+
+        if not table_sizes:
+            return 0
+
+        cost = 0
+        avg_size = sum(table_sizes) / len(table_sizes)
+        spread = max(table_sizes) - min(table_sizes)
+
+        # Penaliza mesas com mais de 1 convidado de diferença
+        if spread > 1:
+            cost += spread * self.spread_penalty
+
+        # Penalidade proporcional à diferença de cada mesa para o tamanho médio
+        for size in table_sizes:
+            cost += abs(size - avg_size) * self.size_penalty
+
+        return cost
+
+DEFAULT_SCORING = ScoringModel()
+
+# ============================================================================================================================================================
+# Classe: Problem
+# Descrição: Representação compacta de uma lista de convidados. Cada convidado passa a ser um inteiro 0..n-1 e as relações
+# ficam guardadas em arrays no formato CSR (offsets + destinos), o que evita dicionários e listas de nomes nos ciclos
+# dos algoritmos. Os nomes só são usados para converter as mesas no fim (decode_tables).
+#
+# Campos:
+#   - names / index: nome de cada id e o id de cada nome
+#   - prefer_offsets / prefer_targets: para o convidado g, os preferidos são prefer_targets[prefer_offsets[g]:prefer_offsets[g+1]]
+#   - avoid_offsets / avoid_targets: o mesmo para as pessoas a evitar
+#   - prefer_strengths / avoid_strengths: força de cada relação (array('d') paralelo aos destinos) ou None se forem todas 1
+#   - scoring: o ScoringModel com que o grafo de pares foi compilado
+#   - offsets / neighbors / weights: grafo simétrico com o custo de cada par partilhar a mesa (por omissão +20 por "avoid" e
+#     -10 por "prefer", vezes a força, somando as duas direções). É o que os cálculos de custo e os deltas dos movimentos usam.
+#   - self_cost: custo constante de convidados que se referem a si próprios (estão sempre na própria mesa)
+#   - perfect_score: score teórico perfeito (prefer_weight vezes a força de cada preferência, tal como
+#     calculate_theoretical_perfect_score)
+# Os arrays podem ser array('i'/'d') ou memoryviews com o mesmo formato (ver file_handler.load_problem).
+# ============================================================================================================================================================
+
+class Problem:
+
+    def __init__(self, names, prefer_offsets, prefer_targets, avoid_offsets, avoid_targets, perfect_score=None, pair_graph=None,
+                 scoring=None, prefer_strengths=None, avoid_strengths=None):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.num_guests = len(self.names)
+
+        self.prefer_offsets = prefer_offsets
+        self.prefer_targets = prefer_targets
+        self.avoid_offsets = avoid_offsets
+        self.avoid_targets = avoid_targets
+        self.prefer_strengths = prefer_strengths
+        self.avoid_strengths = avoid_strengths
+        self.scoring = scoring if scoring is not None else DEFAULT_SCORING
+
+        # O grafo de pares pode vir já calculado (ex.: da cache binária em file_handler)
+        if pair_graph is None:
+            pair_graph = _build_pair_graph(self.num_guests, prefer_offsets, prefer_targets, avoid_offsets, avoid_targets,
+                                           self.scoring, prefer_strengths, avoid_strengths)
+        self.offsets, self.neighbors, self.weights, self.self_cost = pair_graph
+
+        if perfect_score is None:
+            total_strength = sum(prefer_strengths) if prefer_strengths is not None else len(prefer_targets)
+            perfect_score = total_strength * self.scoring.prefer_weight
+        self.perfect_score = perfect_score
+
+        self._edges = None
+        self._presolved = {}                                # Pré-resoluções já calculadas (ver presolve.presolve)
+
+    def __len__(self):
+        return self.num_guests
+
+    # Os arrays podem ser vistas (memoryview) sobre um ficheiro mapeado em memória, que não passam para outros processos:
+    # nesse caso são copiadas para arrays normais
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for field, typecode in (('prefer_offsets', 'i'), ('prefer_targets', 'i'), ('avoid_offsets', 'i'), ('avoid_targets', 'i'),
+                                ('prefer_strengths', 'd'), ('avoid_strengths', 'd'), ('offsets', 'i'), ('neighbors', 'i'),
+                                ('weights', 'd')):
+            if isinstance(state[field], memoryview):
+                state[field] = array(typecode, state[field])
+        state['_edges'] = None
+        state['_presolved'] = {}
+        return state
+
+    # Lista de arestas (cada par uma só vez) como arrays NumPy, criada na primeira avaliação em lote
+    def edges(self):
+        if self._edges is None:
+            offsets = np.frombuffer(self.offsets, dtype=np.int32)
+            neighbors = np.frombuffer(self.neighbors, dtype=np.int32)
+            weights = np.frombuffer(self.weights, dtype=np.float64)
+            sources = np.repeat(np.arange(self.num_guests, dtype=np.int32), np.diff(offsets))
+            keep = sources < neighbors
+            self._edges = (sources[keep], neighbors[keep], weights[keep])
+        return self._edges
+
+    # O mesmo problema compilado com outro modelo de pontuação (partilha os arrays das relações)
+    def with_scoring(self, scoring):
+        perfect_score = None
+        if self.scoring.prefer_weight:
+            perfect_score = self.perfect_score / self.scoring.prefer_weight * scoring.prefer_weight
+        problem = Problem(self.names, self.prefer_offsets, self.prefer_targets, self.avoid_offsets, self.avoid_targets, perfect_score,
+                          scoring=scoring, prefer_strengths=self.prefer_strengths, avoid_strengths=self.avoid_strengths)
+        problem.issues = getattr(self, 'issues', 0)
+        return problem
+
+# ============================================================================================================================================================
+# Função: compile_problem
+# Descrição: Converte o dicionário devolvido por file_handler.read_guest_preferences num Problem.
+# Nomes referidos nas preferências que não são convidados são ignorados (nunca estariam numa mesa).
+# As forças das relações vêm das chaves opcionais 'prefer_strengths' / 'avoid_strengths' (listas paralelas a 'prefers' /
+# 'avoids', ver to_guests); sem elas todas as relações têm força 1.
+# ============================================================================================================================================================
+
+def compile_problem(guests, scoring=None):
+
+    scoring = scoring if scoring is not None else DEFAULT_SCORING
+    names = list(guests.keys())
+    index = {name: i for i, name in enumerate(names)}
+    weighted = any('prefer_strengths' in preferences or 'avoid_strengths' in preferences for preferences in guests.values())
+
+    prefer_offsets, prefer_targets = array('i', [0]), array('i')
+    avoid_offsets, avoid_targets = array('i', [0]), array('i')
+    prefer_strengths, avoid_strengths = array('d'), array('d')
+    perfect_strength = 0
+
+    for name in names:
+        preferences = guests[name]
+        for key, strength_key, offsets, targets, strengths in (('prefers', 'prefer_strengths', prefer_offsets, prefer_targets, prefer_strengths),
+                                                               ('avoids', 'avoid_strengths', avoid_offsets, avoid_targets, avoid_strengths)):
+            relation_strengths = preferences.get(strength_key) or [1] * len(preferences[key])
+            for other, strength in zip(preferences[key], relation_strengths):
+                if other in index:
+                    targets.append(index[other])
+                    strengths.append(strength)
+            offsets.append(len(targets))
+
+        # Mantém o score perfeito original, que conta todas as preferências escritas no CSV
+        perfect_strength += sum(preferences.get('prefer_strengths') or [1] * len(preferences['prefers']))
+
+    if not weighted:
+        prefer_strengths = avoid_strengths = None
+
+    return Problem(names, prefer_offsets, prefer_targets, avoid_offsets, avoid_targets, perfect_strength * scoring.prefer_weight,
+                   scoring=scoring, prefer_strengths=prefer_strengths, avoid_strengths=avoid_strengths)
+
+# ============================================================================================================================================================
+# Função: as_problem
+# Descrição: Devolve o Problem correspondente a "guests", compilando-o apenas se ainda for o dicionário de nomes.
+# O último dicionário compilado fica memorizado (o mesmo objeto, com o mesmo número de convidados e de relações e o mesmo
+# modelo de pontuação), para as chamadas repetidas com nomes (ex.: calculate_cost na interface) não reconstruírem o grafo.
+# ============================================================================================================================================================
+
+_compiled = None    # (guests, impressão digital, scoring, Problem)
+
+def as_problem(guests, scoring=None):
+
+    global _compiled
+    if isinstance(guests, Problem):
+        return guests
+
+    fingerprint = (len(guests), sum(len(preferences['prefers']) + len(preferences['avoids']) for preferences in guests.values()))
+    cached = _compiled
+    if cached is not None and cached[0] is guests and cached[1] == fingerprint and cached[2] == scoring:
+        return cached[3]
+
+    problem = compile_problem(guests, scoring)
+    _compiled = (guests, fingerprint, scoring, problem)
+    return problem
+
+# ============================================================================================================================================================
+# Função: to_guests
+# Descrição: Reconstrói o dicionário {'prefers': [...], 'avoids': [...]} por nome (usado pela interface).
+# Se o problema tiver forças, o dicionário leva também 'prefer_strengths' / 'avoid_strengths' (ver compile_problem).
+# ============================================================================================================================================================
+
+def to_guests(problem):
+
+    names = problem.names
+    weighted = problem.prefer_strengths is not None or problem.avoid_strengths is not None
+    guests = {}
+    for g, name in enumerate(names):
+        prefer_range = slice(problem.prefer_offsets[g], problem.prefer_offsets[g + 1])
+        avoid_range = slice(problem.avoid_offsets[g], problem.avoid_offsets[g + 1])
+        guests[name] = {
+            'prefers': [names[other] for other in problem.prefer_targets[prefer_range]],
+            'avoids': [names[other] for other in problem.avoid_targets[avoid_range]]
+        }
+        if weighted:
+            for key, strengths, relation_range in (('prefer_strengths', problem.prefer_strengths, prefer_range),
+                                                   ('avoid_strengths', problem.avoid_strengths, avoid_range)):
+                guests[name][key] = list(strengths[relation_range]) if strengths is not None else [1] * (relation_range.stop - relation_range.start)
+    return guests
+
+# ============================================================================================================================================================
+# Funções: encode_tables / decode_tables
+# Descrição: Convertem mesas de nomes em mesas de ids e vice-versa.
+# ============================================================================================================================================================
+
+def encode_tables(tables, problem):
+    index = problem.index
+    return [[index[guest] for guest in table] for table in tables]
+
+def decode_tables(tables, problem):
+    names = problem.names
+    return [[names[guest] for guest in table] for table in tables]
+
+# ============================================================================================================================================================
+# Função: table_assignment
+# Descrição: Cria o array convidado -> mesa a partir de uma lista de mesas com ids.
+# ============================================================================================================================================================
+
+def table_assignment(tables, num_guests):
+
+    assignment = array('i', [-1]) * num_guests
+    for t, table in enumerate(tables):
+        for guest in table:
+            assignment[guest] = t
+    return assignment
+
+# ============================================================================================================================================================
+# Função: pair_cost
+# Descrição: Soma dos custos dos pares que partilham a mesa (sem as penalizações de equilíbrio), para mesas com ids.
+# ============================================================================================================================================================
+
+def pair_cost(tables, problem):
+
+    offsets, neighbors, weights = problem.offsets, problem.neighbors, problem.weights
+    assignment = table_assignment(tables, problem.num_guests)
+
+    cost = 0
+    for t, table in enumerate(tables):
+        for guest in table:
+            for k in range(offsets[guest], offsets[guest + 1]):
+                if assignment[neighbors[k]] == t:
+                    cost += weights[k]
+
+    # Cada par é visto pelos dois lados
+    return problem.self_cost + cost / 2
+
+# ============================================================================================================================================================
+# Função: pair_weight
+# Descrição: Custo de dois convidados partilharem a mesa (0 se não tiverem relação).
+# ============================================================================================================================================================
+
+def pair_weight(problem, guest, other):
+
+    neighbors = problem.neighbors
+    for k in range(problem.offsets[guest], problem.offsets[guest + 1]):
+        if neighbors[k] == other:
+            return problem.weights[k]
+    return 0
+
+# ============================================================================================================================================================
+# Função: _build_pair_graph
+# Descrição: Junta as preferências e as pessoas a evitar (nas duas direções) num único grafo simétrico com pesos, com os
+# pesos do modelo de pontuação e a força de cada relação. É aqui (e só aqui) que o tipo de relação é convertido em custo.
+# ============================================================================================================================================================
+
+def _build_pair_graph(num_guests, prefer_offsets, prefer_targets, avoid_offsets, avoid_targets, scoring=DEFAULT_SCORING,
+                      prefer_strengths=None, avoid_strengths=None):
+
+    pairs = [{} for _ in range(num_guests)]
+    self_cost = 0
+
+    def add_relations(offsets, targets, strengths, value):
+        nonlocal self_cost
+        for guest in range(num_guests):
+            for k in range(offsets[guest], offsets[guest + 1]):
+                other = targets[k]
+                cost = value(strengths[k] if strengths is not None else 1)
+                if other == guest:
+                    self_cost += cost
+                    continue
+                pairs[guest][other] = pairs[guest].get(other, 0) + cost
+                pairs[other][guest] = pairs[other].get(guest, 0) + cost
+
+    add_relations(avoid_offsets, avoid_targets, avoid_strengths, scoring.avoid_cost)
+    add_relations(prefer_offsets, prefer_targets, prefer_strengths, lambda strength: -scoring.prefer_weight * strength)
+
+    offsets, neighbors, weights = array('i', [0]), array('i'), array('d')
+    for guest_pairs in pairs:
+        for other in sorted(guest_pairs):
+            # Pares que se anulam (ex.: preferência mútua e um "avoid") não mudam o custo
+            if guest_pairs[other] != 0:
+                neighbors.append(other)
+                weights.append(guest_pairs[other])
+        offsets.append(len(neighbors))
+
+    return offsets, neighbors, weights, self_cost
+
+# ============================================================================================================================================================
+# Função: population_matrix
+# Descrição: Codifica uma população (lista de disposições com ids) numa matriz (pop_size, n_guests) com a mesa de cada convidado.
+# Convidados em falta ficam com -1.
+# ============================================================================================================================================================
+
+def population_matrix(population, num_guests):
+
+    matrix = np.full((len(population), num_guests), -1, dtype=np.int32)
+    for row, tables in enumerate(population):
+        for t, table in enumerate(tables):
+            matrix[row, table] = t
+    return matrix
+
+# ============================================================================================================================================================
+# Função: batch_cost
+# Descrição: Calcula o custo (o mesmo de seater.calculate_cost) de todas as linhas de uma matriz de atribuições de uma só vez.
+# A parte dos pares compara as mesas das duas pontas de cada aresta e multiplica pelos pesos; as penalizações de
+# equilíbrio usam os tamanhos das mesas obtidos com bincount. As linhas são processadas em blocos para limitar a memória.
+# ============================================================================================================================================================
+
+def batch_cost(assignments, problem, num_tables, max_block_cells=1 << 23):
+
+    assignments = np.asarray(assignments)
+    pop_size = assignments.shape[0]
+    sources, targets, weights = problem.edges()
+
+    costs = np.empty(pop_size, dtype=np.float64)
+    block = max(1, max_block_cells // max(1, len(weights)))
+    for start in range(0, pop_size, block):
+        rows = assignments[start:start + block]
+        same_table = rows[:, sources] == rows[:, targets]
+        costs[start:start + block] = same_table @ weights
+
+    costs += problem.self_cost
+
+    # Penalizações de equilíbrio (tal como em ScoringModel.balance_penalty)
+    scoring = problem.scoring
+    if num_tables:
+        row_offsets = (np.arange(pop_size, dtype=np.int64) * num_tables)[:, None]
+        sizes = np.bincount((assignments + row_offsets).ravel(), minlength=pop_size * num_tables).reshape(pop_size, num_tables)
+        spread = sizes.max(axis=1) - sizes.min(axis=1)
+        costs += np.where(spread > 1, spread * scoring.spread_penalty, 0)
+        costs += np.abs(sizes - sizes.sum(axis=1, keepdims=True) / num_tables).sum(axis=1) * scoring.size_penalty
+
+    return costs
+
+# ============================================================================================================================================================
+# Função: canonical_keys
+# Descrição: Calcula uma chave canónica para cada linha de uma matriz de atribuições, independente da ordem das mesas e da
+# ordem dos convidados dentro de cada mesa. As mesas são renumeradas pela ordem do menor id de convidado que contêm
+# e a atribuição resultante é resumida com blake2b (16 bytes por indivíduo).
+# ============================================================================================================================================================
+
+def canonical_keys(assignments, num_tables):
+
+    assignments = np.asarray(assignments)
+    pop_size, num_guests = assignments.shape
+    if pop_size == 0:
+        return []
+
+    # Menor convidado de cada mesa, por linha
+    first_guest = np.full(pop_size * num_tables, num_guests, dtype=np.int64)
+    flat = (assignments + (np.arange(pop_size, dtype=np.int64) * num_tables)[:, None]).ravel()
+    np.minimum.at(first_guest, flat, np.tile(np.arange(num_guests, dtype=np.int64), pop_size))
+
+    # Nova etiqueta de cada mesa = posição na ordenação pelo menor convidado
+    ranks = np.argsort(np.argsort(first_guest.reshape(pop_size, num_tables), axis=1, kind='stable'), axis=1)
+    canonical = np.take_along_axis(ranks, assignments.astype(np.int64), axis=1).astype(np.int32)
+
+    return [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in canonical]
+
+# ============================================================================================================================================================
+# Classe: FitnessCache
+# Descrição: Cache LRU limitada com o custo de indivíduos já avaliados (chaves de canonical_keys).
+# Conta os acertos e as falhas para as métricas da execução.
+# ============================================================================================================================================================
+
+class FitnessCache:
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        cost = self._entries.get(key)
+        if cost is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return cost
+
+    def put(self, key, cost):
+        if self.max_size <= 0:
+            return
+        self._entries[key] = cost
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
@@ -1,48 +1,77 @@
 import random
 import math
 import copy
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-import Project1.plotting as plotting
+import Project1.problem as problem_model
+import Project1.presolve as presolve_model
+from Project1.metrics import MetricsRecorder
+from Project1.problem import Problem
+
+# Os algoritmos aceitam um callback progress(passo, total, melhor_custo), chamado a cada PROGRESS_INTERVAL iterações
+# (ou a cada geração / época). Se devolver True, o algoritmo para e devolve a melhor disposição encontrada até aí.
+PROGRESS_INTERVAL = 500
+
+# ============================================================================================================================================================
+# Função: make_rng
+# Descrição: Gerador aleatório de uma corrida. Todos os algoritmos aceitam seed: None usa o módulo random (estado global,
+# como antes), um inteiro cria um random.Random próprio e um random.Random ou um numpy.random.Generator são usados como
+# fonte. Com geradores próprios as corridas são reprodutíveis e não partilham estado entre threads ou processos.
+# ============================================================================================================================================================
+
+def make_rng(seed=None):
+
+    if seed is None:
+        return random
+    if seed is random or isinstance(seed, random.Random):
+        return seed
+    if isinstance(seed, np.random.Generator):
+        return random.Random(int(seed.integers(2**63)))
+    return random.Random(seed)
+
+# ============================================================================================================================================================
+# Função: spawn_seeds
+# Descrição: n sementes independentes (64 bits) derivadas de seed (inteiro, gerador ou None), com numpy.random.SeedSequence,
+# para corridas, réplicas ou ilhas que correm em paralelo terem fluxos aleatórios que não colidem.
+# ============================================================================================================================================================
+
+def spawn_seeds(seed, n):
+
+    if seed is None or seed is random or isinstance(seed, (random.Random, np.random.Generator)):
+        seed = make_rng(seed).getrandbits(128)
+    return [int(child.generate_state(1, np.uint64)[0]) for child in np.random.SeedSequence(seed).spawn(n)]
 
 # ============================================================================================================================================================
 # Função: calculate_cost
 # Descrição: Calcula o custo total de uma disposição de convidados.
 # Penaliza estar com quem se quer evitar e recompensa estar com quem se prefere.
 # Penaliza também mesas desequilibradas.
+# Aceita mesas com nomes (e o dicionário de convidados) ou mesas com ids (e um Problem compilado).
 # ============================================================================================================================================================
 
 def calculate_cost(tables, guests):
     
-    cost = 0
-    # Itera sobre cada mesa
-    for table in tables:
-        for guest in table:
-            preferences = guests[guest]
-            
-            # Penaliza por estar com quem se quer evitar.
-            cost += sum(20 for avoided in preferences['avoids'] if avoided in table)
-
-            # Recompensa por estar com quem se prefere.
-            cost -= sum(10 for preferred in preferences['prefers'] if preferred in table)
+    # Penaliza por estar com quem se quer evitar e recompensa por estar com quem se prefere
+    if isinstance(guests, Problem):
+        problem = guests
+        cost = problem_model.pair_cost(tables, problem)
+    else:
+        problem = problem_model.as_problem(guests)
+        cost = problem_model.pair_cost(problem_model.encode_tables(tables, problem), problem)
                     
     # Penaliza mesas desequilibradas
-    table_sizes = [len(table) for table in tables]
-    if not table_sizes:
-        return cost
-    
-    avg_size = sum(table_sizes) / len(tables) if tables else 0
-    max_size = max(table_sizes)
-    min_size = min(table_sizes)
-    
-    # Penaliza mesas com mais de 1 convidado de diferença
-    if max_size - min_size > 1:
-        cost += (max_size - min_size) * 200 # Penalidade alta para mesas muito desequilibradas
-    
-    # Adiciona penalidade para mesas com tamanhos muito diferentes da média
-    for size in table_sizes:
-        cost += abs(size - avg_size) * 20  # Penalidade proporcional à diferença do tamanho médio
-                    
-    return cost
+    return cost + calculate_balance_penalty([len(table) for table in tables], problem.scoring)
+
+# ============================================================================================================================================================
+# Função: calculate_balance_penalty
+# Descrição: Penalizações de equilíbrio de calculate_cost, a partir dos tamanhos das mesas, com os coeficientes do modelo
+# de pontuação (por omissão 200 por convidado de diferença entre mesas e 20 por convidado de desvio à média).
+# ============================================================================================================================================================
+
+def calculate_balance_penalty(table_sizes, scoring=None):
+    return (scoring if scoring is not None else problem_model.DEFAULT_SCORING).balance_penalty(table_sizes)
 
 # ========================================================================================================================================================
 # Função: calculate_tables_needed
@@ -56,29 +85,16 @@ def calculate_tables_needed(num_guests, seats_per_table=6):
 # Função: evaluate_seating
 # Descrição: Avalia uma disposição de mesas atribuindo uma pontuação positiva
 # por estar com preferidos e negativa por estar com evitados.
+# (o simétrico da parte de pares de calculate_cost: por omissão +10 por cada preferido e -20 por cada evitado.)
 # ========================================================================================================================================================
 
 def evaluate_seating(tables, guests):
     
-    score = 0
-    
-    # Para cada mesa
-    for table in tables:
-        # Para cada convidado na mesa
-        for guest in table:
-            preferences = guests[guest]
-            
-            # Checka se pessoas preferidas estão na mesma mesa (bonus)
-            for preferred in preferences.get('prefers',[]):
-                if preferred in table:
-                    score += 10  # Aumenta a pontuação se preferidos estão juntos
-            
-            # Checka se pessoas evitadas estão na mesma mesa (penalidade)
-            for avoided in preferences.get('avoids',[]):
-                if avoided in table:
-                    score -= 20  # Diminui a pontuação se evitados estão juntos
-    
-    return score
+    if not isinstance(guests, Problem):
+        guests = problem_model.as_problem(guests)
+        tables = problem_model.encode_tables(tables, guests)
+
+    return -problem_model.pair_cost(tables, guests)
 
 # ========================================================================================================================================================
 # Função: calculate_theoretical_perfect_score
@@ -88,93 +104,336 @@ def evaluate_seating(tables, guests):
 
 def calculate_theoretical_perfect_score(guests):
     
+    if isinstance(guests, Problem):
+        return guests.perfect_score
+
     perfect_score = 0
     
     # Para cada convidado
     for guest, preferences in guests.items():
-        # Contar quantas pessoas preferidas quer que fiquem na mesma mesa que ele
-        preferred_count = len(preferences['prefers'])
-        # Adiciona 10 pontos por cada preferido
-        perfect_score += preferred_count * 10
+        # Soma das forças das preferências (1 cada, se o CSV não tiver forças)
+        preferred_strength = sum(preferences.get('prefer_strengths') or [1] * len(preferences['prefers']))
+        # Adiciona os pontos do modelo por cada preferido
+        perfect_score += preferred_strength * problem_model.DEFAULT_SCORING.prefer_weight
     
     return perfect_score
 
 # ========================================================================================================================================================
-# Função: create_neighbor
-# Descrição: Gera uma nova solução válida a partir da atual mudando convidados
-# entre mesas de forma a manter os limites.
+# Função: create_seating_state
+# Descrição: Cria o estado usado pelos movimentos incrementais: as mesas, o índice convidado -> mesa e a contagem de
+# mesas por tamanho (para saber o tamanho mínimo e máximo sem percorrer todas as mesas).
+# Com num_guests (mesas com ids de um Problem) o índice é um array; sem ele é um dicionário.
 # ========================================================================================================================================================
 
-def create_neighbor(tables, min_per_table, max_per_table):
-    
-    new_tables = copy.deepcopy(tables)                      # Cria uma cópia da disposição atual
-    
-    table_sizes = [len(table) for table in new_tables]      # Obtém o número de mesas
-    min_size = min(table_sizes)                             # Obtém o tamanho mínimo   
-    max_size = max(table_sizes)                             # Obtém o tamanho máximo    
-    
+def create_seating_state(tables, num_guests=None):
+
+    tables = [list(table) for table in tables]
+    size_counts = {}
+    for table in tables:
+        size_counts[len(table)] = size_counts.get(len(table), 0) + 1
+
+    if num_guests is None:
+        seat_of = {guest: i for i, table in enumerate(tables) for guest in table}
+    else:
+        seat_of = problem_model.table_assignment(tables, num_guests)
+
+    return {
+        'tables': tables,
+        'seat_of': seat_of,
+        'size_counts': size_counts,
+        'min_size': min(size_counts) if size_counts else 0,
+        'max_size': max(size_counts) if size_counts else 0,
+        'avg_size': sum(len(table) for table in tables) / len(tables) if tables else 0
+    }
+
+# ========================================================================================================================================================
+# Função: propose_move
+# Descrição: Escolhe aleatoriamente um movimento a partir do estado atual, com as mesmas regras de create_neighbor,
+# mas sem copiar as mesas. Um movimento é um tuplo ('move', convidado, mesa_origem, mesa_destino) ou
+# ('swap', convidado1, mesa1, convidado2, mesa2). Devolve None se o vizinho for igual à solução atual.
+# Com presolved (ver presolve.Presolve) os movimentos são de super-nós (ver propose_block_move).
+# ========================================================================================================================================================
+
+def propose_move(state, min_per_table, max_per_table, rng=random, presolved=None):
+
+    if presolved is not None:
+        return propose_block_move(state, presolved, min_per_table, max_per_table, rng)
+
+    tables = state['tables']
+    min_size = state['min_size']
+    max_size = state['max_size']
+
     # Se a diferença entre o tamanho máximo e mínimo for maior que 1, força a mudança
     if max_size - min_size > 1:
+        largest_tables = [i for i, table in enumerate(tables) if len(table) == max_size]
+        smallest_tables = [i for i, table in enumerate(tables) if len(table) == min_size]
 
-        # Identifica as mesas maiores e menores
-        largest_tables = [i for i, size in enumerate(table_sizes) if size == max_size]
-        smallest_tables = [i for i, size in enumerate(table_sizes) if size == min_size]
-        
-        # Escolhe aleatoriamente uma mesa maior e uma menor
-        from_table = random.choice(largest_tables)
-        to_table = random.choice(smallest_tables)
-        
-        if new_tables[from_table]:  # Verifica se a mesa não está vazia
-            guest_index = random.randint(0, len(new_tables[from_table]) - 1)
-            guest = new_tables[from_table].pop(guest_index)
-            new_tables[to_table].append(guest)      # Adiciona o convidado à mesa menor
+        from_table = rng.choice(largest_tables)
+        to_table = rng.choice(smallest_tables)
+        return ('move', rng.choice(tables[from_table]), from_table, to_table)
+
+    if len(tables) < 2:
+        return None
 
-        return new_tables
-    
-    # Mantém os limites de capacidade em todas as operações
-    def is_valid_move(from_table, to_table):
-        return (
-            len(new_tables[from_table]) > min_per_table and
-            len(new_tables[to_table]) < max_per_table
-        )
-    
     # Se não houver mesas desequilibradas, escolhe aleatoriamente entre swap e move
-    operation = random.choice(['swap', 'move'])
-    
-    if operation == 'swap' and len(new_tables) >= 2:
-        # Swap: Troca dois convidados entre mesas diferentes
-        table1_index = random.randint(0, len(new_tables) - 1)
-        table2_index = random.randint(0, len(new_tables) - 1)
-        
-        # Mantém a condição de que as mesas não sejam iguais
+    if rng.choice(['swap', 'move']) == 'swap':
+        table1_index = rng.randint(0, len(tables) - 1)
+        table2_index = rng.randint(0, len(tables) - 1)
         while table1_index == table2_index:
-            table2_index = random.randint(0, len(new_tables) - 1)
-            
-        # Verifica se as mesas não estão vazias
-        if new_tables[table1_index] and new_tables[table2_index]:
-            guest1_index = random.randint(0, len(new_tables[table1_index]) - 1)
-            guest2_index = random.randint(0, len(new_tables[table2_index]) - 1)
-            
-            # Troca os convidados entre as mesas
-            new_tables[table1_index][guest1_index], new_tables[table2_index][guest2_index] = \
-                new_tables[table2_index][guest2_index], new_tables[table1_index][guest1_index]
-    
-    elif operation == 'move' and len(new_tables) >= 2:
-        from_table = random.randint(0, len(new_tables) - 1)     
-        to_table = random.randint(0, len(new_tables) - 1)
-        if from_table != to_table and new_tables[from_table]:
-        
-        # Move: Move um convidado de uma mesa para outra
-            if is_valid_move(from_table, to_table):
-                guest_index = random.randint(0, len(new_tables[from_table]) - 1)
-                guest = new_tables[from_table].pop(guest_index)
-                new_tables[to_table].append(guest)
+            table2_index = rng.randint(0, len(tables) - 1)
+
+        if not (tables[table1_index] and tables[table2_index]):
+            return None
+        move = ('swap', rng.choice(tables[table1_index]), table1_index, rng.choice(tables[table2_index]), table2_index)
+        new_min, new_max = min_size, max_size
+    else:
+        from_table = rng.randint(0, len(tables) - 1)
+        to_table = rng.randint(0, len(tables) - 1)
+
+        # Mantém os limites de capacidade em todas as operações
+        if from_table == to_table or not tables[from_table]:
+            return None
+        if not (len(tables[from_table]) > min_per_table and len(tables[to_table]) < max_per_table):
+            return None
+        move = ('move', rng.choice(tables[from_table]), from_table, to_table)
+        new_min, new_max = _size_range_after_move(state, len(tables[from_table]), len(tables[to_table]))
 
     # Verifica se as mesas resultantes ainda estão dentro dos limites
-    if any(len(table) < min_per_table or len(table) > max_per_table for table in new_tables):
-        return tables 
-    
-    return new_tables
+    if new_min < min_per_table or new_max > max_per_table:
+        return None
+
+    return move
+
+# ========================================================================================================================================================
+# Função: propose_block_move
+# Descrição: Versão de propose_move para um problema pré-resolvido: move um super-nó inteiro para outra mesa ou troca dois
+# super-nós de mesa (com as mesmas regras de desequilíbrio de propose_move). Só propõe movimentos que não sentam nenhum
+# convidado com alguém de quem tem de estar separado e que deixam as mesas envolvidas dentro dos limites.
+# Um movimento é ('block', ((convidado, mesa_origem, mesa_destino), ...)); membros que já estão no destino não entram.
+# ========================================================================================================================================================
+
+def propose_block_move(state, presolved, min_per_table, max_per_table, rng=random):
+
+    tables = state['tables']
+    seat_of = state['seat_of']
+    if len(tables) < 2:
+        return None
+
+    # Com mesas desequilibradas, força a passagem de um super-nó de uma mesa maior para uma mais pequena
+    if state['max_size'] - state['min_size'] > 1:
+        from_table = rng.choice([i for i, table in enumerate(tables) if len(table) == state['max_size']])
+        to_table = rng.choice([i for i, table in enumerate(tables) if len(table) == state['min_size']])
+        kind = 'move'
+    else:
+        from_table = rng.randint(0, len(tables) - 1)
+        to_table = rng.randint(0, len(tables) - 2)
+        to_table += to_table >= from_table
+        kind = rng.choice(['swap', 'move'])
+    if not tables[from_table]:
+        return None
+
+    group = presolved.groups[presolved.group_of[rng.choice(tables[from_table])]]
+    steps = [(guest, seat_of[guest], to_table) for guest in group if seat_of[guest] != to_table]
+
+    if kind == 'swap':
+        if not tables[to_table]:
+            return None
+        other = presolved.groups[presolved.group_of[rng.choice(tables[to_table])]]
+        if other is group or presolved.conflicts(group, to_table, seat_of, other) or presolved.conflicts(other, from_table, seat_of, group):
+            return None
+        steps += [(guest, seat_of[guest], from_table) for guest in other if seat_of[guest] != from_table]
+    elif presolved.conflicts(group, to_table, seat_of):
+        return None
+
+    # Tamanhos das mesas envolvidas depois do movimento
+    sizes = {}
+    for _, source, target in steps:
+        sizes[source] = sizes.get(source, len(tables[source])) - 1
+        sizes[target] = sizes.get(target, len(tables[target])) + 1
+    if not steps or any(size < min_per_table or size > max_per_table for size in sizes.values()):
+        return None
+
+    return ('block', tuple(steps))
+
+# ========================================================================================================================================================
+# Função: calculate_move_delta
+# Descrição: Calcula a variação de custo (calculate_cost) provocada por um movimento, olhando apenas para os vizinhos
+# (no grafo de pares do Problem) dos convidados envolvidos e para as penalizações de equilíbrio das duas mesas afetadas.
+# ========================================================================================================================================================
+
+def calculate_move_delta(state, move, problem):
+
+    if move is None:
+        return 0
+    if move[0] == 'block':
+        return _block_move_delta(state, move[1], problem)
+
+    seat_of = state['seat_of']
+    offsets, neighbors, weights = problem.offsets, problem.neighbors, problem.weights
+
+    # Custo de um convidado partilhar a mesa com os vizinhos que lá estão sentados
+    def affinity(guest, table_index):
+        total = 0
+        for k in range(offsets[guest], offsets[guest + 1]):
+            if seat_of[neighbors[k]] == table_index:
+                total += weights[k]
+        return total
+
+    if move[0] == 'swap':
+        _, guest1, table1, guest2, table2 = move
+        return (affinity(guest1, table2) - affinity(guest1, table1)
+                + affinity(guest2, table1) - affinity(guest2, table2)
+                - 2 * problem_model.pair_weight(problem, guest1, guest2))
+
+    _, guest, from_table, to_table = move
+    delta = affinity(guest, to_table) - affinity(guest, from_table)
+
+    # Penalizações de equilíbrio: só mudam os tamanhos das duas mesas envolvidas
+    from_size = len(state['tables'][from_table])
+    to_size = len(state['tables'][to_table])
+    avg_size = state['avg_size']
+
+    old_spread = state['max_size'] - state['min_size']
+    new_min, new_max = _size_range_after_move(state, from_size, to_size)
+    new_spread = new_max - new_min
+    spread_penalty, size_penalty = problem.scoring.spread_penalty, problem.scoring.size_penalty
+    delta += (new_spread * spread_penalty if new_spread > 1 else 0) - (old_spread * spread_penalty if old_spread > 1 else 0)
+
+    delta += (abs(from_size - 1 - avg_size) - abs(from_size - avg_size)) * size_penalty
+    delta += (abs(to_size + 1 - avg_size) - abs(to_size - avg_size)) * size_penalty
+
+    return delta
+
+# ========================================================================================================================================================
+# Função: apply_move
+# Descrição: Aplica um movimento ao estado (no próprio estado, sem cópias).
+# ========================================================================================================================================================
+
+def apply_move(state, move):
+
+    if move is None:
+        return
+    if move[0] == 'block':
+        for guest, from_table, to_table in move[1]:
+            apply_move(state, ('move', guest, from_table, to_table))
+        return
+
+    tables = state['tables']
+    seat_of = state['seat_of']
+
+    if move[0] == 'swap':
+        _, guest1, table1, guest2, table2 = move
+        tables[table1][tables[table1].index(guest1)] = guest2
+        tables[table2][tables[table2].index(guest2)] = guest1
+        seat_of[guest1], seat_of[guest2] = table2, table1
+        return
+
+    _, guest, from_table, to_table = move
+    from_size = len(tables[from_table])
+    to_size = len(tables[to_table])
+
+    tables[from_table].remove(guest)
+    tables[to_table].append(guest)
+    seat_of[guest] = to_table
+
+    counts = state['size_counts']
+    state['min_size'], state['max_size'] = _size_range_after_move(state, from_size, to_size)
+    counts[from_size] -= 1
+    counts[from_size - 1] = counts.get(from_size - 1, 0) + 1
+    counts[to_size] -= 1
+    counts[to_size + 1] = counts.get(to_size + 1, 0) + 1
+
+# ========================================================================================================================================================
+# Função: _block_move_delta
+# Descrição: Variação de custo de um movimento de super-nós (lista de (convidado, origem, destino)). Os pares entre dois
+# convidados que se movem são vistos pelos dois lados e contam metade de cada vez; as penalizações de equilíbrio são
+# recalculadas para as mesas cujo tamanho muda.
+# ========================================================================================================================================================
+
+def _block_move_delta(state, steps, problem):
+
+    seat_of = state['seat_of']
+    tables = state['tables']
+    offsets, neighbors, weights = problem.offsets, problem.neighbors, problem.weights
+    target_of = {guest: to_table for guest, _, to_table in steps}
+
+    delta = 0
+    for guest, from_table, to_table in steps:
+        for k in range(offsets[guest], offsets[guest + 1]):
+            other = neighbors[k]
+            other_target = target_of.get(other)
+            if other_target is None:
+                delta += weights[k] * ((seat_of[other] == to_table) - (seat_of[other] == from_table))
+            else:
+                delta += weights[k] * ((other_target == to_table) - (seat_of[other] == from_table)) / 2
+
+    # Penalizações de equilíbrio das mesas que mudam de tamanho
+    changes = {}
+    for _, from_table, to_table in steps:
+        changes[from_table] = changes.get(from_table, 0) - 1
+        changes[to_table] = changes.get(to_table, 0) + 1
+    counts = dict(state['size_counts'])
+    avg_size = state['avg_size']
+    size_delta = 0
+    for table, change in changes.items():
+        if change:
+            size = len(tables[table])
+            counts[size] -= 1
+            counts[size + change] = counts.get(size + change, 0) + 1
+            size_delta += abs(size + change - avg_size) - abs(size - avg_size)
+    present = [size for size, count in counts.items() if count > 0]
+    old_spread = state['max_size'] - state['min_size']
+    new_spread = max(present) - min(present)
+
+    scoring = problem.scoring
+    delta += (new_spread * scoring.spread_penalty if new_spread > 1 else 0) - (old_spread * scoring.spread_penalty if old_spread > 1 else 0)
+    return delta + size_delta * scoring.size_penalty
+
+# ========================================================================================================================================================
+# Função: _size_range_after_move
+# Descrição: Devolve o tamanho mínimo e máximo das mesas se um convidado passar de uma mesa com from_size convidados
+# para uma mesa com to_size convidados. Como os tamanhos só mudam uma unidade, basta ajustar os limites atuais.
+# ========================================================================================================================================================
+
+def _size_range_after_move(state, from_size, to_size):
+
+    counts = state['size_counts']
+
+    def count(size):
+        # Número de mesas com este tamanho depois do movimento
+        return counts.get(size, 0) - (size == from_size) - (size == to_size) + (size == from_size - 1) + (size == to_size + 1)
+
+    new_min = min(state['min_size'], from_size - 1)
+    while count(new_min) == 0:
+        new_min += 1
+
+    new_max = max(state['max_size'], to_size + 1)
+    while count(new_max) == 0:
+        new_max -= 1
+
+    return new_min, new_max
+
+# ========================================================================================================================================================
+# Função: create_neighbor
+# Descrição: Gera uma nova solução válida a partir da atual mudando convidados
+# entre mesas de forma a manter os limites.
+# ========================================================================================================================================================
+
+def create_neighbor(tables, min_per_table, max_per_table, rng=random):
+
+    state = create_seating_state(tables)                      # Cria uma cópia da disposição atual
+    move = propose_move(state, min_per_table, max_per_table, rng)
+
+    if move is None:
+        return tables
+
+    apply_move(state, move)
+    return state['tables']
+
+COOLING_TYPES = ["exponential", "linear", "logarithmic", "adaptive"]
+
+# Operadores de crossover dos algoritmos genéticos (ver _ga_evolve)
+GA_CROSSOVERS = ["slice", "tables", "gpx"]
 
 # ========================================================================================================================================================
 # Função: validate_parameters
@@ -198,9 +457,9 @@ def validate_parameters(params, num_guests):
     if min_tables_needed > max_tables_needed:
         raise ValueError("Tamanho inviável para as mesas. min_per_table e max_per_table não permitem acomodar todos os convidados.")
     
-    # Verifica initial_temperature
-    if not (isinstance(params["initial_temperature"], (int, float)) and params["initial_temperature"] > 0):
-        raise ValueError("initial_temperature deve ser um número positivo.")
+    # Verifica initial_temperature ("auto" calibra a temperatura para cada instância)
+    if params["initial_temperature"] != "auto" and not (isinstance(params["initial_temperature"], (int, float)) and params["initial_temperature"] > 0):
+        raise ValueError("initial_temperature deve ser um número positivo ou 'auto'.")
     
     # Verifica cooling_rate
     if not (isinstance(params["cooling_rate"], (int, float)) and 0 < params["cooling_rate"] < 1):
@@ -211,25 +470,68 @@ def validate_parameters(params, num_guests):
         raise ValueError("iterations deve ser um inteiro positivo.")
     
     # Verifica cooling_type
-    if params["cooling_type"] not in ["exponential", "linear", "logarithmic"]:
-        raise ValueError("cooling_type deve ser 'exponential', 'linear' ou 'logarithmic'.")
+    if params["cooling_type"] not in COOLING_TYPES:
+        raise ValueError("cooling_type deve ser 'exponential', 'linear', 'logarithmic' ou 'adaptive'.")
+
+    # Verifica crossover (algoritmos genéticos)
+    if params.get("crossover", "slice") not in GA_CROSSOVERS:
+        raise ValueError("crossover deve ser 'slice', 'tables' ou 'gpx'.")
 
 # ========================================================================================================================================================
 # Função: create_balanced_seating
 # Descrição: Cria uma disposição inicial equilibrada entre mesas. Tenta maximizar
 # preferências já de início.
+# Devolve mesas com nomes para o dicionário de convidados e mesas com ids para um Problem.
+#
+# method escolhe o construtor:
+#   - "greedy": coloca os convidados um a um (ver _greedy_seating), em tempo quase linear. É o padrão.
+#   - "random": uma única distribuição aleatória (útil para dar diversidade, ex.: população do GA).
+#   - "shuffle": o método antigo, 1000 distribuições aleatórias e fica com a melhor.
 # ========================================================================================================================================================
 
-def create_balanced_seating(guests, min_per_table, max_per_table):
-    
-    # Cria uma lista de convidados e calcula o seu número total de convidados
-    guest_list = list(guests.keys())    
-    total_guests = len(guest_list)  
+def create_balanced_seating(guests, min_per_table, max_per_table, method="greedy", rng=random):
     
+    # Trabalha sempre com ids; os nomes só são recuperados no fim
+    problem = problem_model.as_problem(guests)
+
+    sizes = _table_sizes(problem.num_guests, min_per_table, max_per_table)
+
+    if method == "greedy":
+        best_tables = _greedy_seating(problem, sizes, rng)
+    elif method == "random":
+        best_tables = _shuffled_seating(list(range(problem.num_guests)), sizes, rng)
+    elif method == "presolve":
+        best_tables = presolve_model.presolved_seating(problem, presolve_model.presolve(problem, sizes), sizes, rng)
+    elif method == "shuffle":
+        best_tables = _shuffled_seating(list(range(problem.num_guests)), sizes, rng)
+        best_score = evaluate_seating(best_tables, problem)
+
+        # Experimenta várias disposições para encontrar uma boa
+        for attempt in range(1000):
+            new_tables = _shuffled_seating([guest for table in best_tables for guest in table], sizes, rng)
+            new_score = evaluate_seating(new_tables, problem)
+
+            if new_score > best_score:
+                best_score = new_score
+                best_tables = new_tables
+    else:
+        raise ValueError(f"Unsupported seating method: {method}")
+
+    if problem is guests:
+        return best_tables
+    return problem_model.decode_tables(best_tables, problem)
+
+# ========================================================================================================================================================
+# Função: _table_sizes
+# Descrição: Calcula o número de mesas e o tamanho de cada uma (o mais equilibrado possível dentro dos limites).
+# ========================================================================================================================================================
+
+def _table_sizes(total_guests, min_per_table, max_per_table):
+
     # Calcula o número de mesas necessárias
     num_tables = math.ceil(total_guests / max_per_table)
 
-    if num_tables * min_per_table > len(guest_list):
+    if num_tables * min_per_table > total_guests:
         raise ValueError("Número de mesas insuficiente para acomodar todos os convidados.")
     
     # Calcula o tamanho ideal de cada mesa
@@ -257,301 +559,1905 @@ def create_balanced_seating(guests, min_per_table, max_per_table):
             num_tables = test_num_tables
             base_size = test_base_size
             extra = test_extra
-    
-    # Inicializa a lista de mesas
-    random.shuffle(guest_list)
+
+    return [base_size + (1 if i < extra else 0) for i in range(num_tables)]
+
+# ========================================================================================================================================================
+# Função: _shuffled_seating
+# Descrição: Baralha os convidados e corta-os em mesas com os tamanhos indicados.
+# ========================================================================================================================================================
+
+def _shuffled_seating(guest_list, sizes, rng=random):
+    rng.shuffle(guest_list)
     tables = []
     guest_index = 0
-    
-    # Cria as mesas com o número ideal de convidados
-    for i in range(num_tables):
-        table_size = base_size + (1 if i < extra else 0)
-        table = guest_list[guest_index:guest_index + table_size]
-        tables.append(table)
-        guest_index += table_size
-    
-    # Verifica se o número de mesas não excede o máximo permitido
-    sizes = [len(table) for table in tables]
-    
-    best_tables = tables.copy()
-    best_score = evaluate_seating(tables, guests)
-    
-    # Experimenta várias disposições para encontrar uma boa
-    for attempt in range(1000):  
-        # Cria uma nova disposição aleatória
-        all_guests = []
-        for table in tables:
-            all_guests.extend(table)
-        
-        random.shuffle(all_guests)
-        
-        new_tables = []
-        start_idx = 0
-        
-        for size in sizes:
-            table = all_guests[start_idx:start_idx + size]
-            new_tables.append(table)
-            start_idx += size
-            
-        new_score = evaluate_seating(new_tables, guests)
-        
-        if new_score > best_score:
-            best_score = new_score
-            best_tables = [table.copy() for table in new_tables]
-                    
-    return best_tables
+    for size in sizes:
+        tables.append(guest_list[guest_index:guest_index + size])
+        guest_index += size
+    return tables
+
+# ========================================================================================================================================================
+# Função: _greedy_seating
+# Descrição: Construtor guloso sobre o grafo de pares. Percorre os convidados em largura (BFS) a partir de raízes aleatórias,
+# seguindo primeiro as preferências, para que grupos de amigos sejam colocados seguidos. Cada convidado vai para a mesa
+# com lugar livre de menor custo para ele (soma dos pesos dos pares já sentados lá: junta preferências e separa
+# "avoids"); sem preferências pendentes, as mesas livres vão sendo usadas à vez. Custa O(arestas + convidados) e,
+# com as raízes e a ordem das mesas aleatórias, gera disposições diferentes a cada chamada.
+# ========================================================================================================================================================
+
+def _greedy_seating(problem, sizes, rng=random):
+
+    offsets, neighbors, weights = problem.offsets, problem.neighbors, problem.weights
+    num_guests = problem.num_guests
+    num_tables = len(sizes)
+
+    # Ordem de visita: BFS com as preferências (pesos negativos) primeiro
+    roots = list(range(num_guests))
+    rng.shuffle(roots)
+    visited = bytearray(num_guests)
+    order = []
+    for root in roots:
+        if visited[root]:
+            continue
+        visited[root] = 1
+        queue = [root]
+        head = 0
+        while head < len(queue):
+            guest = queue[head]
+            head += 1
+            order.append(guest)
+            for k in sorted(range(offsets[guest], offsets[guest + 1]), key=weights.__getitem__):
+                if weights[k] < 0 and not visited[neighbors[k]]:
+                    visited[neighbors[k]] = 1
+                    queue.append(neighbors[k])
+
+    seat_of = [-1] * num_guests
+    free = list(sizes)
+    tables = [[] for _ in range(num_tables)]
+
+    # Mesas com lugares livres (remoção em O(1) trocando com a última) e um cursor que as percorre à vez
+    open_tables = [t for t in range(num_tables) if free[t]]
+    rng.shuffle(open_tables)
+    position = {t: i for i, t in enumerate(open_tables)}
+    cursor = 0
+
+    for guest in order:
+        # Custo de sentar o convidado em cada mesa com lugar onde já estão pessoas com quem tem relação
+        affinity = {}
+        for k in range(offsets[guest], offsets[guest + 1]):
+            t = seat_of[neighbors[k]]
+            if t >= 0 and free[t]:
+                affinity[t] = affinity.get(t, 0) + weights[k]
+
+        # Sem relações (ou só "avoids"), a próxima mesa da rotação mantém as mesas a encher por igual
+        cursor = (cursor + 1) % len(open_tables)
+        best_table = open_tables[cursor]
+        best_key = (affinity.get(best_table, 0), -free[best_table])
+        for t, value in affinity.items():
+            if (value, -free[t]) < best_key:
+                best_table, best_key = t, (value, -free[t])
+
+        tables[best_table].append(guest)
+        seat_of[guest] = best_table
+        free[best_table] -= 1
+
+        if not free[best_table]:
+            i = position.pop(best_table)
+            last = open_tables.pop()
+            if last != best_table:
+                open_tables[i] = last
+                position[last] = i
+
+    return tables
 
 # ========================================================================================================================================================
 # Função: simulated_annealing
 # Descrição: Implementa o algoritmo de Simulated Annealing para encontrar uma
-# disposição de convidados com custo mínimo. Guarda métricas e gráficos.
+# disposição de convidados com custo mínimo. Devolve as mesas e as métricas (os gráficos
+# ficam a cargo de plotting.plot_metrics).
+# As métricas por iteração guardam no máximo metrics_points pontos (ver metrics.MetricsRecorder e metrics_mode).
+# initial_method é o construtor da disposição inicial (ver create_balanced_seating).
+#
+# initial_temperature = "auto" calibra a temperatura inicial para a disposição inicial aceitar cerca de target_acceptance
+# dos movimentos que pioram o custo (ver calibrate_temperature).
+# Tipos de arrefecimento (todos acabam em MIN_TEMPERATURE no máximo):
+#   - "exponential": T = T0 * cooling_rate^i
+#   - "linear": desce de T0 até MIN_TEMPERATURE ao longo das iterations
+#   - "logarithmic": T = T0 / (1 + a * ln(1 + i)), com a = 50 * (1 - cooling_rate) (a = 1 com cooling_rate = 0.98)
+#   - "adaptive": a cada ADAPTIVE_WINDOW iterações ajusta T para a taxa de aceitação dos movimentos que pioram seguir um
+#     alvo que desce de target_acceptance até FINAL_ACCEPTANCE ao longo da corrida (não usa cooling_rate). Se o melhor
+#     custo não melhorar durante reheat_after iterações (por omissão um décimo da corrida), reaquece até REHEAT_FACTOR * T0.
+# Com presolve=True o problema é pré-resolvido (ver presolve.presolve): a disposição inicial respeita as restrições e os
+# movimentos são de super-nós que nunca juntam convidados que têm de ficar separados (ver propose_block_move).
 # ========================================================================================================================================================
 
-def simulated_annealing(guests, initial_temperature, cooling_rate, iterations, min_per_table, max_per_table, cooling_type, output_folder=None):
+MIN_TEMPERATURE = 0.01
+ADAPTIVE_WINDOW = 100
+FINAL_ACCEPTANCE = 1e-7
+REHEAT_FACTOR = 0.5
+
+def simulated_annealing(guests, initial_temperature, cooling_rate, iterations, min_per_table, max_per_table, cooling_type,
+                        metrics_points=2000, metrics_mode="minmax", initial_method="greedy", progress=None,
+                        target_acceptance=0.8, reheat_after=None, presolve=False, seed=None):
     
+    if cooling_type not in COOLING_TYPES:
+        raise ValueError(f"Unsupported cooling type: {cooling_type}")
+
     # Inicializa parâmetros
     metrics = {
+        'algorithm': "Simulated Annealing",
         'timestamp': datetime.now().strftime("%Y%m%d_%H%M%S"),
-        'iterations': [],
-        'costs': [],
-        'best_costs': [],
-        'temperatures': []
+        'reheats': 0
     }
+    recorder = MetricsRecorder(('iterations', 'costs', 'best_costs', 'temperatures'), metrics_points, metrics_mode, key='costs')
+    record = recorder.record
     
-    tables = create_balanced_seating(guests, min_per_table, max_per_table)      # Cria uma disposição inicial
-    current_cost = calculate_cost(tables, guests)                               # Calcula o custo inicial
+    rng = make_rng(seed)                                                        # Gerador aleatório da corrida
+    problem = problem_model.as_problem(guests)                                  # Representação compacta (ids)
+    presolved = _presolved(problem, min_per_table, max_per_table, presolve)     # Super-nós e separações (ou None)
+    if presolved is not None:
+        initial_method = "presolve"
+        metrics['presolve'] = presolved.info
+    tables = create_balanced_seating(problem, min_per_table, max_per_table, initial_method, rng)    # Cria uma disposição inicial
+    current_cost = calculate_cost(tables, problem)                              # Calcula o custo inicial
     best_tables = copy.deepcopy(tables)                                         # Guarda a melhor disposição        
     best_cost = current_cost                                                    # Guarda o melhor custo 
+
+    state = create_seating_state(tables, problem.num_guests)                    # Estado para movimentos incrementais
+    best_is_current = True                                                      # A melhor disposição ainda é a atual
+
+    if initial_temperature == "auto":
+        initial_temperature = calibrate_temperature(problem, state, min_per_table, max_per_table, target_acceptance, rng=rng,
+                                                    presolved=presolved)
+    metrics['initial_temperature'] = initial_temperature
     temperature = initial_temperature                                           # Inicializa a temperatura
+
+    # Estado do arrefecimento adaptativo
+    if reheat_after is None:
+        reheat_after = max(iterations // 10, 10 * ADAPTIVE_WINDOW)
+    uphill_proposed = uphill_accepted = 0
+    last_improvement = 0
+    log_rate = 50 * (1 - cooling_rate)
+    evaluations = 0                                                             # Movimentos avaliados
     
     for i in range(iterations):
         # Guarda métricas
-        metrics['iterations'].append(i)
-        metrics['costs'].append(current_cost)
-        metrics['best_costs'].append(best_cost)
-        metrics['temperatures'].append(temperature)
-        
-        # Gera um vizinho
-        neighbor_tables = create_neighbor(tables, min_per_table, max_per_table)
-        neighbor_cost = calculate_cost(neighbor_tables, guests)
+        record(i, current_cost, best_cost, temperature)
+
+        # Informa quem chamou (e para se for pedido)
+        if progress is not None and i % PROGRESS_INTERVAL == 0 and progress(i, iterations, best_cost):
+            break
         
-        # Calcula a diferença de custo
-        delta_cost = neighbor_cost - current_cost
+        # Gera um vizinho (como movimento) e calcula a diferença de custo
+        move = propose_move(state, min_per_table, max_per_table, rng, presolved)
+        delta_cost = calculate_move_delta(state, move, problem)
+        evaluations += 1
         
         # Decide se aceita o vizinho
-        if delta_cost < 0 or random.random() < math.exp(-delta_cost / temperature):
-            tables = neighbor_tables
-            current_cost = neighbor_cost
+        accepted = delta_cost < 0 or rng.random() < math.exp(-delta_cost / temperature)
+        if delta_cost > 0:
+            uphill_proposed += 1
+            uphill_accepted += accepted
+        if accepted:
+            # Só copia a melhor disposição quando está prestes a piorá-la
+            if best_is_current and delta_cost > 0:
+                best_tables = copy.deepcopy(state['tables'])
+                best_is_current = False
+
+            apply_move(state, move)
+            current_cost += delta_cost
             
             # Atualiza a melhor disposição se o custo for melhor
             if current_cost < best_cost:
-                best_tables = copy.deepcopy(tables)
                 best_cost = current_cost
+                best_is_current = True
+                last_improvement = i
         
         # Atualiza a temperatura
         if cooling_type == "exponential":
             temperature *= cooling_rate
         elif cooling_type == "linear":
-            temperature -= initial_temperature / iterations
+            temperature = initial_temperature - (initial_temperature - MIN_TEMPERATURE) * (i + 1) / iterations
         elif cooling_type == "logarithmic":
-            temperature = initial_temperature / (1 + math.log(1 + i))
+            temperature = initial_temperature / (1 + log_rate * math.log(1 + i))
+        elif (i + 1) % ADAPTIVE_WINDOW == 0:
+            target = target_acceptance * (FINAL_ACCEPTANCE / target_acceptance) ** ((i + 1) / iterations)
+            temperature = _adapt_temperature(temperature, uphill_accepted, uphill_proposed, target)
+            uphill_proposed = uphill_accepted = 0
+            if i - last_improvement >= reheat_after:
+                temperature = max(temperature, REHEAT_FACTOR * initial_temperature)
+                last_improvement = i
+                metrics['reheats'] += 1
 
-        if temperature < 0.01:  # Limite mínimo para a temperatura
-            break
-    
-    # Cria a pasta de resultados
-    if output_folder:
-        plotting.plot_performance_metrics(metrics, save_dir=output_folder)
-    else:
-        plotting.plot_performance_metrics(metrics)
+        if temperature < MIN_TEMPERATURE:  # Limite mínimo para a temperatura
+            if cooling_type != "adaptive":
+                break
+            temperature = MIN_TEMPERATURE
+
+    if best_is_current:
+        best_tables = copy.deepcopy(state['tables'])
+    metrics['evaluations'] = evaluations
+    metrics.update(recorder.finish())
     
-    return best_tables
+    # Os gráficos ficam para quem chamar (plotting.plot_metrics)
+    return problem_model.decode_tables(best_tables, problem), metrics
+
+# ========================================================================================================================================================
+# Função: calibrate_temperature
+# Descrição: Escolhe a temperatura inicial a partir dos próprios dados: avalia (sem aplicar) samples movimentos a partir da
+# disposição em state e procura a temperatura T com que a média de exp(-delta / T) dos movimentos que pioram é
+# target_acceptance (método iterativo de Ben-Ameur). Assim a temperatura acompanha a escala dos custos de cada instância.
+# presolved é a pré-resolução cujos movimentos vão ser usados (ver propose_move).
+# ========================================================================================================================================================
+
+def calibrate_temperature(problem, state, min_per_table, max_per_table, target_acceptance=0.8, samples=500, rng=random,
+                          presolved=None):
+
+    if not 0 < target_acceptance < 1:
+        raise ValueError("target_acceptance deve estar entre 0 e 1.")
+
+    deltas = []
+    for _ in range(samples):
+        delta = calculate_move_delta(state, propose_move(state, min_per_table, max_per_table, rng, presolved), problem)
+        if delta > 0:
+            deltas.append(delta)
+    if not deltas:
+        return 1.0                                                              # Nenhum movimento piora: qualquer T serve
+
+    temperature = -sum(deltas) / len(deltas) / math.log(target_acceptance)
+    for _ in range(50):
+        acceptance = sum(math.exp(-delta / temperature) for delta in deltas) / len(deltas)
+        if abs(acceptance - target_acceptance) < 1e-3:
+            break
+        temperature *= math.log(acceptance) / math.log(target_acceptance)
+    return max(temperature, MIN_TEMPERATURE)
+
+# ========================================================================================================================================================
+# Função: _adapt_temperature
+# Descrição: Corrige a temperatura para a taxa de aceitação dos movimentos que pioram se aproximar do alvo: com aceitação
+# observada p a T, exp(-d / T) ~ p, por isso T * ln(p) / ln(alvo) daria o alvo (a correção fica limitada a [0.5, 2]).
+# Numa janela sem aceitações só se sabe que p < 1 / proposed: com alvos mais baixos do que isso a temperatura continua a
+# descer em vez de aquecer.
+# ========================================================================================================================================================
+
+def _adapt_temperature(temperature, accepted, proposed, target):
+
+    if proposed == 0:
+        return temperature
+    # Sem aceitações (ou só aceitações) a taxa real está abaixo de 1 / proposed (ou acima de 1 - 1 / proposed)
+    observed = min(max(accepted, 0.5), proposed - 0.5) / proposed if proposed > 1 else 0.5
+    factor = min(max(math.log(observed) / math.log(target), 0.5), 2.0)
+    return temperature * factor
+
+# ========================================================================================================================================================
+# Função: _presolved
+# Descrição: Pré-resolução do problema para as capacidades das mesas de create_balanced_seating, ou None com presolve=False.
+# ========================================================================================================================================================
+
+def _presolved(problem, min_per_table, max_per_table, presolve):
+
+    if not presolve:
+        return None
+    return presolve_model.presolve(problem, _table_sizes(problem.num_guests, min_per_table, max_per_table))
 
 # ========================================================================================================================================================
 # Função: genetic_algorithm
 # Descrição: Algoritmo genético com seleção, crossover, mutação e elitismo.
 # Requer tuning para resultados mais estáveis.
+# crossover escolhe o operador (ver GA_CROSSOVERS e _ga_evolve): "slice" é o original, "tables" e "gpx" herdam mesas inteiras.
 # ========================================================================================================================================================
 
-def genetic_algorithm(guests, min_per_table, max_per_table, population_size, generations, mutation_rate, output_folder=None):
-    
-    # -----------------------------------------------------
-    # Criação da população inicial com disposições válidas
-    # -----------------------------------------------------
-    def create_initial_population():
-        population = []
-        for _ in range(population_size):
-            tables = create_balanced_seating(guests, min_per_table, max_per_table)
-            all_guests = [guest for table in tables for guest in table]
-
-            # Validação: garantir que não há convidados repetidos
-            if len(all_guests) != len(set(all_guests)):
-                raise ValueError("Convidados duplicados!")
-            population.append(tables)
-        return population
+def genetic_algorithm(guests, min_per_table, max_per_table, population_size, generations, cache_size=10000,
+                      initial_method="greedy", progress=None, seed=None, crossover="slice"):
     
-    # -----------------------------------------------------
-    # Seleção dos pais via torneio (Tournament Selection)
-    # Escolhe os dois melhores de um subconjunto aleatório
-    # -----------------------------------------------------
-    def select_parents(population):
-        tournament_size = min(10, len(population))                  # Assegura que o tamanho do torneio não exceda a população
-        tournament = random.sample(population, tournament_size)     # Seleciona aleatoriamente um subconjunto
-        tournament.sort(key=lambda x: calculate_cost(x, guests))    # Ordena pelo custo
-        return tournament[0], tournament[1]                         # Seleciona os dois melhores
-    
-    # -----------------------------------------------------
-    # Crossover: gera um filho combinando duas soluções
-    # Combina mesas dos pais evitando convidados repetidos
-    # -----------------------------------------------------
-    def crossover(parent1, parent2):
-        child = []
-        used_guests = set()
-
-        # Combina mesas de ambos os pais (sem repetições)
-        for table1, table2 in zip(parent1, parent2):
-            combined_table = []
-            for guest in table1 + table2:
-                if guest not in used_guests:
-                    combined_table.append(guest)    # Adiciona o convidado se não estiver repetido
-                    used_guests.add(guest)          # Marca como usado
-            child.append(combined_table)
-
-        # Verifica se há convidados por atribuir e adiciona
-        all_guests = set(guest for table in parent1 + parent2 for guest in table)
-        missing_guests = all_guests - used_guests
-
-        # Flatten da solução e redistribuição balanceada
-        flattened_child = [guest for table in child for guest in table]
-        flattened_child.extend(missing_guests)
-
-        # Calcula o tamanho necessário para cada mesa
-        num_tables = len(parent1)                               # Assume o mesmo número de mesas que os pais
-        avg_table_size = len(flattened_child) // num_tables     
-        extra_guests = len(flattened_child) % num_tables
-
-        # Cria mesas balanceadas
-        child = []
-        start_idx = 0
-        for i in range(num_tables):
-            table_size = avg_table_size + (1 if i < extra_guests else 0)
-            table = flattened_child[start_idx:start_idx + table_size]
-            child.append(table)
-            start_idx += table_size
-
-        # Validação do filho: todos os convidados presentes, sem duplicados
-        all_guests_in_child = [guest for table in child for guest in table]
-        if len(all_guests_in_child) != len(all_guests) or len(all_guests_in_child) != len(set(all_guests_in_child)):
-            raise ValueError("Crossover produziu um filho inválido!")
-
-        return child
-
-    # -----------------------------------------------------
-    # Mutação: troca dois convidados aleatórios entre mesas
-    # Ajuda a diversificar a população e escapar de mínimos
-    # -----------------------------------------------------
-    def mutate(individual):
-        
-        max_retries = 10  # Limita o número de tentativas para evitar loops infinitos
-        for _ in range(max_retries):
-            # Seleciona duas mesas aleatórias
-            table1, table2 = random.sample(individual, 2)
-
-            # Troca dois convidados entre as mesas
-            if table1 and table2:
-                guest1 = random.choice(table1)
-                guest2 = random.choice(table2)
-                table1[table1.index(guest1)], table2[table2.index(guest2)] = guest2, guest1
-
-            # Assegura que a mutação não cria duplicatas
-            all_guests = [guest for table in individual for guest in table]
-            if len(all_guests) == len(set(all_guests)):
-                return individual  # Retorna o indivíduo mutado se válido
-
-        # Se tentativas falharem, retorna o indivíduo original
-        print("Warning: Mutation failed to produce a valid individual after retries.")
-        return individual
-    
-    # -----------------------------------------------------
-    # Validação da população: todos os convidados e únicos
-    # -----------------------------------------------------
-    def validate_population(population, guests):
-        
-        for individual in population:
-            all_guests = [guest for table in individual for guest in table]
-            if len(all_guests) != len(guests):
-                raise ValueError("Population contains an invalid individual: Missing guests!")
-            if len(all_guests) != len(set(all_guests)):
-                raise ValueError("Population contains an invalid individual: Duplicate guests!")
+    if crossover not in GA_CROSSOVERS:
+        raise ValueError(f"Unsupported crossover: {crossover}")
+
+    rng = make_rng(seed)                            # Gerador aleatório da corrida
+    problem = problem_model.as_problem(guests)      # Os indivíduos são mesas de ids
+    cache = problem_model.FitnessCache(cache_size)  # Custos de indivíduos já vistos (elites, filhos repetidos)
+
+    metrics = {
+        'algorithm': "Genetic Algorithm",
+        'timestamp': datetime.now().strftime("%Y%m%d_%H%M%S"),
+        'crossover': crossover,
+        'generations': [],
+        'best_costs': [],
+        'cache_hits': 0,
+        'cache_misses': 0
+    }
 
     # -------------------------
     # Etapa 1: inicialização
     # -------------------------
-    population = create_initial_population()
-    validate_population(population, guests)
-    best_costs = []  # Guarda os melhores custos para plotar depois
+    population = _ga_initial_population(problem, population_size, min_per_table, max_per_table, initial_method, rng)
+    costs = _ga_evaluate_population(problem, population, cache)
+
     # -------------------------
     # Etapa 2: evolução
     # -------------------------
-    for generation in range(generations):
-        new_population = []
+    population, costs = _ga_evolve(problem, population, costs, generations, population_size, cache, metrics, progress=progress,
+                                   rng=rng, crossover=crossover)
 
-        # Geração de filhos
-        for _ in range(population_size // 2):
-            parent1, parent2 = select_parents(population)
-            child1, child2 = crossover(parent1, parent2), crossover(parent2, parent1)
-            new_population.extend([mutate(child1), mutate(child2)])
+    # -------------------------
+    # Etapa 3: resultado final
+    # -------------------------
+    best_index = min(range(len(population)), key=lambda i: costs[i])
+    best_tables = population[best_index]
+    metrics['cache_hits'] = cache.hits
+    metrics['cache_misses'] = cache.misses
+    metrics['cache_entries'] = len(cache)
+    metrics['evaluations'] = cache.hits + cache.misses
+    print(f"Best tables found: Cost = {costs[best_index]}")
+    return problem_model.decode_tables(best_tables, problem), metrics
 
-        # Elitismo: preserva os melhores da geração atual
-        elite_size = 5  # Number of best individuals to carry over
-        elites = sorted(population, key=lambda x: calculate_cost(x, guests))[:elite_size]
+# ========================================================================================================================================================
+# Função: _ga_initial_population
+# Descrição: Criação da população inicial com disposições válidas. Com o construtor guloso os indivíduos já partem de
+# boas disposições (e diferem entre si pelas escolhas aleatórias); "random" dá a população mais diversa.
+# ========================================================================================================================================================
 
-        # Combina elites e novos filhos
-        combined_population = elites + new_population
+def _ga_initial_population(problem, population_size, min_per_table, max_per_table, initial_method="greedy", rng=random):
+    population = []
+    for _ in range(population_size):
+        tables = create_balanced_seating(problem, min_per_table, max_per_table, initial_method, rng)
+        all_guests = [guest for table in tables for guest in table]
 
-        # Seleciona os melhores para a próxima geração
-        population = sorted(combined_population, key=lambda x: calculate_cost(x, guests))[:population_size]
-        validate_population(population, guests)
+        # Validação: garantir que não há convidados repetidos
+        if len(all_guests) != len(set(all_guests)):
+            raise ValueError("Convidados duplicados!")
+        population.append(tables)
+    return population
 
-        # Print debug ocasionalmente
-        if generation % 100 == 0:
-            best_cost = calculate_cost(population[0], guests)
-            best_costs.append(calculate_cost(population[0], guests))
-            print(f"Geracão {generation}: Melhor custo = {best_cost}")
-            print(f"Diversidade da Populacão: {len(set(tuple(tuple(table) for table in individual) for individual in population))} indivíduos únicos")
+# ========================================================================================================================================================
+# Função: _ga_select_parents
+# Descrição: Seleção dos pais via torneio (Tournament Selection). Escolhe os dois melhores de um subconjunto aleatório
+# (usa os custos já calculados para a geração).
+# ========================================================================================================================================================
 
-    # -------------------------
-    # Etapa 3: resultado final
-    # -------------------------
-    best_tables = min(population, key=lambda x: calculate_cost(x, guests))
-    plotting.plot_genetic_progress(best_costs, save_dir=output_folder)
-    print(f"Best tables found: Cost = {calculate_cost(best_tables, guests)}")
-    return best_tables
+def _ga_select_parents(population, costs, rng=random):
+    tournament_size = min(10, len(population))                              # Assegura que o tamanho do torneio não exceda a população
+    tournament = rng.sample(range(len(population)), tournament_size)     # Seleciona aleatoriamente um subconjunto
+    tournament.sort(key=lambda i: costs[i])                                 # Ordena pelo custo
+    return population[tournament[0]], population[tournament[1]]             # Seleciona os dois melhores
 
 # ========================================================================================================================================================
-# Função: hill_climbing
-# Descrição: Algoritmo ganancioso. Aceita apenas vizinhos que melhoram o custo.
-# Útil como baseline para comparação com heurísticas mais avançadas.
+# Função: _ga_crossover
+# Descrição: Crossover: gera um filho combinando duas soluções. Combina mesas dos pais evitando convidados repetidos.
 # ========================================================================================================================================================
-def hill_climbing(guests, min_per_table, max_per_table, iterations=500, output_folder=None):
-    
-    current = create_balanced_seating(guests, min_per_table, max_per_table)     # Cria uma disposição inicial
-    current_cost = calculate_cost(current, guests)                              # Calcula o custo inicial   
-    best = copy.deepcopy(current)                                               # Guarda a melhor disposição
-    best_cost = current_cost                                                    # Guarda o melhor custo 
 
-    costs = []                                                                 # Guarda os custos para plotar depois
-    for _ in range(iterations):
-        neighbor = create_neighbor(current, min_per_table, max_per_table)       # Gera um vizinho
-        neighbor_cost = calculate_cost(neighbor, guests)                        # Calcula o custo do vizinho
-        costs.append(neighbor_cost)                                             # Guarda o custo do vizinho
-        if neighbor_cost < current_cost:                                        # Aceita o vizinho se o custo for melhor
-            current = neighbor
-            current_cost = neighbor_cost
+def _ga_crossover(parent1, parent2):
+    child = []
+    used_guests = set()
+
+    # Combina mesas de ambos os pais (sem repetições)
+    for table1, table2 in zip(parent1, parent2):
+        combined_table = []
+        for guest in table1 + table2:
+            if guest not in used_guests:
+                combined_table.append(guest)    # Adiciona o convidado se não estiver repetido
+                used_guests.add(guest)          # Marca como usado
+        child.append(combined_table)
+
+    # Verifica se há convidados por atribuir e adiciona
+    all_guests = set(guest for table in parent1 + parent2 for guest in table)
+    missing_guests = all_guests - used_guests
+
+    # Flatten da solução e redistribuição balanceada
+    flattened_child = [guest for table in child for guest in table]
+    flattened_child.extend(missing_guests)
+
+    # Calcula o tamanho necessário para cada mesa
+    num_tables = len(parent1)                               # Assume o mesmo número de mesas que os pais
+    avg_table_size = len(flattened_child) // num_tables     
+    extra_guests = len(flattened_child) % num_tables
+
+    # Cria mesas balanceadas
+    child = []
+    start_idx = 0
+    for i in range(num_tables):
+        table_size = avg_table_size + (1 if i < extra_guests else 0)
+        table = flattened_child[start_idx:start_idx + table_size]
+        child.append(table)
+        start_idx += table_size
+
+    # Validação do filho: todos os convidados presentes, sem duplicados
+    all_guests_in_child = [guest for table in child for guest in table]
+    if len(all_guests_in_child) != len(all_guests) or len(all_guests_in_child) != len(set(all_guests_in_child)):
+        raise ValueError("Crossover produziu um filho inválido!")
+
+    return child
+
+# ========================================================================================================================================================
+# Função: _ga_table_crossover
+# Descrição: Crossovers que preservam mesas boas (os filhos herdam mesas inteiras em vez de uma lista re-cortada):
+#   - "tables": o filho herda a melhor metade das mesas de parent1 (pelo custo dos pares da mesa) e depois as melhores mesas
+#     de parent2 que não têm nenhum convidado já sentado. A ordem dos pais conta: o primeiro dá as mesas principais.
+#   - "gpx": partição alternada (como o GPX da coloração de grafos): cada pai à vez, começando por parent1, dá a sua mesa
+#     com o melhor custo contando só os convidados ainda por sentar; mesas sem nenhum par bom ficam por herdar.
+# Depois as mesas recebem as capacidades dos pais (as maiores para as mais cheias; quem excede a capacidade sai, o
+# convidado com pior afinidade primeiro) e a reparação senta os restantes convidados, por uma ordem aleatória, na mesa
+# com lugar onde o custo menos sobe (a afinidade com quem lá está). Os tamanhos ficam os dos pais, por isso as
+# penalizações de equilíbrio não mudam e basta comparar afinidades.
+# ========================================================================================================================================================
+
+def _ga_table_crossover(problem, parent1, parent2, crossover, rng=random):
+
+    offsets, neighbors, weights = problem.offsets, problem.neighbors, problem.weights
+    num_tables = len(parent1)
+    parents = (parent1, parent2)
+    seat = [-1] * problem.num_guests    # Mesa de cada convidado no filho
+    child = []
+
+    # Mesa de cada convidado em cada pai e custo dos pares (ainda por sentar no filho) de cada mesa dos pais
+    parent_seats = [problem_model.table_assignment(parent, problem.num_guests) for parent in parents]
+    rest_costs = []
+    for parent, parent_seat in zip(parents, parent_seats):
+        costs = [0] * num_tables
+        for t, table in enumerate(parent):
+            for guest in table:
+                for k in range(offsets[guest], offsets[guest + 1]):
+                    if parent_seat[neighbors[k]] == t:
+                        costs[t] += weights[k] / 2
+        rest_costs.append(costs)
+
+    # Afinidade de um convidado com os convidados sentados numa mesa do filho
+    def affinity(guest, table):
+        return sum(weights[k] for k in range(offsets[guest], offsets[guest + 1]) if seat[neighbors[k]] == table)
+
+    # Senta um grupo numa nova mesa do filho e (no "gpx") desconta os seus pares dos custos das mesas dos pais
+    def inherit(members):
+        for guest in members:
+            seat[guest] = len(child)
+            if crossover != "gpx":
+                continue
+            for parent_seat, costs in zip(parent_seats, rest_costs):
+                t = parent_seat[guest]
+                for k in range(offsets[guest], offsets[guest + 1]):
+                    if parent_seat[neighbors[k]] == t and seat[neighbors[k]] < 0:
+                        costs[t] -= weights[k]
+        child.append(list(members))
+
+    if crossover == "tables":
+        ranked1, ranked2 = (sorted(range(num_tables), key=costs.__getitem__) for costs in rest_costs)
+        for t in ranked1[:(num_tables + 1) // 2]:
+            inherit(parent1[t])
+        for t in ranked2:
+            if len(child) == num_tables:
+                break
+            if all(seat[guest] < 0 for guest in parent2[t]):
+                inherit(parent2[t])
+    else:
+        while len(child) < num_tables:
+            side = len(child) % 2
+            costs = rest_costs[side]
+            t = min(range(num_tables), key=costs.__getitem__)
+            if costs[t] > -1e-9:
+                break
+            inherit([guest for guest in parents[side][t] if seat[guest] < 0])
+
+    while len(child) < num_tables:
+        child.append([])
+
+    # Capacidades dos pais: as maiores para as mesas mais cheias
+    capacities = sorted((len(table) for table in parent1), reverse=True)
+    room = [0] * num_tables
+    for table, capacity in zip(sorted(range(num_tables), key=lambda t: -len(child[t])), capacities):
+        members = child[table]
+        while len(members) > capacity:
+            worst = max(members, key=lambda guest: affinity(guest, table))
+            members.remove(worst)
+            seat[worst] = -1
+        room[table] = capacity - len(members)
+
+    # Reparação: inserção gulosa pelo menor aumento de custo
+    pending = [guest for guest in range(problem.num_guests) if seat[guest] < 0]
+    rng.shuffle(pending)
+    for guest in pending:
+        gains = {}
+        for k in range(offsets[guest], offsets[guest + 1]):
+            table = seat[neighbors[k]]
+            if table >= 0:
+                gains[table] = gains.get(table, 0) + weights[k]
+        table = min((t for t in range(num_tables) if room[t] > 0), key=lambda t: (gains.get(t, 0), -room[t]))
+        child[table].append(guest)
+        seat[guest] = table
+        room[table] -= 1
+
+    return child
+
+# ========================================================================================================================================================
+# Função: _ga_mutate
+# Descrição: Mutação: troca dois convidados aleatórios entre mesas. Ajuda a diversificar a população e escapar de mínimos.
+# É aplicada a todos os filhos (não há taxa de mutação: uma troca por filho é a única mutação do algoritmo).
+# ========================================================================================================================================================
+
+def _ga_mutate(individual, rng=random):
+    
+    max_retries = 10  # Limita o número de tentativas para evitar loops infinitos
+    for _ in range(max_retries):
+        # Seleciona duas mesas aleatórias
+        table1, table2 = rng.sample(individual, 2)
+
+        # Troca dois convidados entre as mesas
+        if table1 and table2:
+            guest1 = rng.choice(table1)
+            guest2 = rng.choice(table2)
+            table1[table1.index(guest1)], table2[table2.index(guest2)] = guest2, guest1
+
+        # Assegura que a mutação não cria duplicatas
+        all_guests = [guest for table in individual for guest in table]
+        if len(all_guests) == len(set(all_guests)):
+            return individual  # Retorna o indivíduo mutado se válido
+
+    # Se tentativas falharem, retorna o indivíduo original
+    print("Warning: Mutation failed to produce a valid individual after retries.")
+    return individual
+
+# ========================================================================================================================================================
+# Função: _ga_evaluate_population
+# Descrição: Avaliação em lote: valida e calcula o custo de todos os indivíduos numa só passagem vetorizada (NumPy).
+# Indivíduos já avaliados vêm da cache (chave canónica). Todos os indivíduos têm o mesmo número de mesas.
+# ========================================================================================================================================================
+
+def _ga_evaluate_population(problem, population, cache):
+
+    num_tables = len(population[0])
+    matrix = problem_model.population_matrix(population, problem.num_guests)
+    for individual, row in zip(population, matrix):
+        if (row < 0).any():
+            raise ValueError("Population contains an invalid individual: Missing guests!")
+        if sum(len(table) for table in individual) != problem.num_guests:
+            raise ValueError("Population contains an invalid individual: Duplicate guests!")
+
+    keys = problem_model.canonical_keys(matrix, num_tables)
+    costs = [cache.get(key) for key in keys]
+
+    # Avalia apenas os indivíduos novos (e só uma vez cada, mesmo que estejam repetidos)
+    pending = {}
+    for i, (key, cost) in enumerate(zip(keys, costs)):
+        if cost is None:
+            pending.setdefault(key, []).append(i)
+
+    if pending:
+        rows = [indices[0] for indices in pending.values()]
+        new_costs = problem_model.batch_cost(matrix[rows], problem, num_tables).tolist()
+        for (key, indices), cost in zip(pending.items(), new_costs):
+            cache.put(key, cost)
+            for i in indices:
+                costs[i] = cost
+
+    return costs
+
+# ========================================================================================================================================================
+# Função: _ga_evolve
+# Descrição: Evolui uma população durante "generations" gerações (seleção, crossover, mutação e elitismo).
+# first_generation é o número da primeira geração (para os prints e para as métricas quando a evolução é feita por partes).
+# progress é chamado no fim de cada geração (ver PROGRESS_INTERVAL).
+# crossover: "slice" (_ga_crossover, junta as mesas dos pais e volta a cortar a lista) ou "tables" / "gpx"
+# (_ga_table_crossover, herdam mesas inteiras e reparam o resto).
+# ========================================================================================================================================================
+
+def _ga_evolve(problem, population, costs, generations, population_size, cache, metrics, first_generation=0, verbose=True,
+               progress=None, rng=random, crossover="slice"):
+
+    for generation in range(first_generation, first_generation + generations):
+        new_population = []
+
+        # Geração de filhos
+        for _ in range(population_size // 2):
+            parent1, parent2 = _ga_select_parents(population, costs, rng)
+            if crossover == "slice":
+                child1, child2 = _ga_crossover(parent1, parent2), _ga_crossover(parent2, parent1)
+            else:
+                child1 = _ga_table_crossover(problem, parent1, parent2, crossover, rng)
+                child2 = _ga_table_crossover(problem, parent2, parent1, crossover, rng)
+            new_population.extend([_ga_mutate(child1, rng), _ga_mutate(child2, rng)])
+
+        # Os filhos são avaliados uma única vez por geração
+        new_costs = _ga_evaluate_population(problem, new_population, cache)
+
+        # Elitismo: preserva os melhores da geração atual (os custos já são conhecidos)
+        elite_size = 5  # Number of best individuals to carry over
+        elites = sorted(range(len(population)), key=lambda i: costs[i])[:elite_size]
+
+        # Combina elites e novos filhos
+        combined_population = [population[i] for i in elites] + new_population
+        combined_costs = [costs[i] for i in elites] + new_costs
+
+        # Seleciona os melhores para a próxima geração
+        order = sorted(range(len(combined_population)), key=lambda i: combined_costs[i])[:population_size]
+        population = [combined_population[i] for i in order]
+        costs = [combined_costs[i] for i in order]
+
+        # Print debug ocasionalmente
+        if generation % 100 == 0:
+            best_cost = costs[0]
+            metrics['best_costs'].append(best_cost)
+            metrics['generations'].append(generation)
+            if verbose:
+                print(f"Geracão {generation}: Melhor custo = {best_cost}")
+                print(f"Diversidade da Populacão: {len(set(tuple(tuple(table) for table in individual) for individual in population))} indivíduos únicos")
+
+        if progress is not None and progress(generation + 1, first_generation + generations, costs[0]):
+            break
+
+    return population, costs
+
+# ========================================================================================================================================================
+# Função: island_genetic_algorithm
+# Descrição: Modelo de ilhas do algoritmo genético. num_islands subpopulações (cada uma com population_size indivíduos)
+# evoluem de forma independente com os mesmos operadores do genetic_algorithm e, a cada migration_interval gerações,
+# os migration_size melhores de cada ilha substituem os piores da ilha seguinte (anel). As ilhas podem correr num pool
+# de processos (workers != 1; None = todos os cores), o que também atrasa a convergência prematura de uma população única.
+# ========================================================================================================================================================
+
+def island_genetic_algorithm(guests, min_per_table, max_per_table, population_size, generations, num_islands=4,
+                             migration_interval=20, migration_size=2, workers=1, cache_size=10000, initial_method="greedy",
+                             progress=None, seed=None, crossover="slice"):
+
+    if crossover not in GA_CROSSOVERS:
+        raise ValueError(f"Unsupported crossover: {crossover}")
+
+    rng = make_rng(seed)
+    problem = problem_model.as_problem(guests)
+
+    islands = []
+    for _ in range(num_islands):
+        population = _ga_initial_population(problem, population_size, min_per_table, max_per_table, initial_method, rng)
+        islands.append((population, None))
+
+    metrics = {
+        'algorithm': "Island Genetic Algorithm",
+        'timestamp': datetime.now().strftime("%Y%m%d_%H%M%S"),
+        'crossover': crossover,
+        'generations': [],
+        'best_costs': [],
+        'migrations': 0
+    }
+
+    executor = None
+    if workers != 1 and num_islands > 1:
+        executor = ProcessPoolExecutor(max_workers=min(workers or num_islands, num_islands),
+                                       initializer=_init_island_worker, initargs=(problem, cache_size))
+    else:
+        _init_island_worker(problem, cache_size)
+
+    try:
+        done = 0
+        while done < generations:
+            steps = min(migration_interval, generations - done)
+
+            # Cada ilha evolui "steps" gerações, com uma semente própria por época (a mesma com ou sem processos)
+            seeds = spawn_seeds(rng, num_islands)
+            if executor:
+                futures = [executor.submit(_island_worker, population, costs, steps, population_size, done, seed, crossover)
+                           for (population, costs), seed in zip(islands, seeds)]
+                islands = [future.result() for future in futures]
+            else:
+                islands = [_island_worker(population, costs, steps, population_size, done, seed, crossover)
+                           for (population, costs), seed in zip(islands, seeds)]
+
+            done += steps
+            best_cost = min(min(costs) for _, costs in islands)
+            metrics['generations'].append(done)
+            metrics['best_costs'].append(best_cost)
+            print(f"Geracão {done}: Melhor custo (todas as ilhas) = {best_cost}")
+
+            if progress is not None and progress(done, generations, best_cost):
+                break
+
+            # Migração em anel: os melhores de cada ilha substituem os piores da ilha seguinte
+            if done < generations and num_islands > 1:
+                migrants = []
+                for population, costs in islands:
+                    order = sorted(range(len(population)), key=lambda i: costs[i])[:migration_size]
+                    migrants.append([(copy.deepcopy(population[i]), costs[i]) for i in order])
+
+                for k, (population, costs) in enumerate(islands):
+                    incoming = migrants[k - 1]
+                    worst = sorted(range(len(population)), key=lambda i: costs[i], reverse=True)[:len(incoming)]
+                    for i, (individual, cost) in zip(worst, incoming):
+                        population[i] = individual
+                        costs[i] = cost
+                metrics['migrations'] += 1
+    finally:
+        if executor:
+            executor.shutdown()
+
+    best_tables, best_cost = min(((population[i], costs[i]) for population, costs in islands for i in range(len(population))),
+                                 key=lambda item: item[1])
+
+    # Indivíduos avaliados: a população inicial e population_size filhos por geração, em cada ilha
+    metrics['evaluations'] = num_islands * (population_size + population_size // 2 * 2 * done)
+    print(f"Best tables found: Cost = {best_cost}")
+    return problem_model.decode_tables(best_tables, problem), metrics
+
+# Estado de cada processo das ilhas: o Problem e uma cache de fitness própria (mantém-se entre épocas)
+_island_problem = None
+_island_cache = None
+
+def _init_island_worker(problem, cache_size):
+    global _island_problem, _island_cache
+    _island_problem = problem
+    _island_cache = problem_model.FitnessCache(cache_size)
+
+def _island_worker(population, costs, generations, population_size, first_generation, seed=None, crossover="slice"):
+    if costs is None:
+        costs = _ga_evaluate_population(_island_problem, population, _island_cache)
+
+    metrics = {'generations': [], 'best_costs': []}
+    return _ga_evolve(_island_problem, population, costs, generations, population_size, _island_cache, metrics,
+                      first_generation=first_generation, verbose=False, rng=make_rng(seed), crossover=crossover)
+
+# ========================================================================================================================================================
+# Função: hill_climbing
+# Descrição: Algoritmo ganancioso. Aceita apenas vizinhos que melhoram o custo.
+# Útil como baseline para comparação com heurísticas mais avançadas.
+# Com presolve=True usa a pré-resolução e os movimentos de super-nós (como em simulated_annealing).
+# ========================================================================================================================================================
+def hill_climbing(guests, min_per_table, max_per_table, iterations=500, metrics_points=2000, metrics_mode="minmax",
+                  initial_method="greedy", progress=None, presolve=False, seed=None):
+    
+    rng = make_rng(seed)                                                        # Gerador aleatório da corrida
+    problem = problem_model.as_problem(guests)                                  # Representação compacta (ids)
+    presolved = _presolved(problem, min_per_table, max_per_table, presolve)     # Super-nós e separações (ou None)
+    if presolved is not None:
+        initial_method = "presolve"
+    current = create_balanced_seating(problem, min_per_table, max_per_table, initial_method, rng)   # Cria uma disposição inicial
+    current_cost = calculate_cost(current, problem)                             # Calcula o custo inicial   
+    state = create_seating_state(current, problem.num_guests)                   # Estado para movimentos incrementais
+
+    recorder = MetricsRecorder(('iterations', 'costs'), metrics_points, metrics_mode, key='costs')    # Custos para plotar depois
+    evaluations = 0                                                             # Movimentos avaliados
+    for i in range(iterations):
+        move = propose_move(state, min_per_table, max_per_table, rng, presolved)    # Gera um vizinho (como movimento)
+        neighbor_cost = current_cost + calculate_move_delta(state, move, problem)   # Calcula o custo do vizinho
+        evaluations += 1
+        recorder.record(i, neighbor_cost)                                       # Guarda o custo do vizinho
+        if neighbor_cost < current_cost:                                        # Aceita o vizinho se o custo for melhor
+            apply_move(state, move)                                             # Só aceita melhorias: a atual é sempre a melhor
+            current_cost = neighbor_cost
+        if progress is not None and i % PROGRESS_INTERVAL == 0 and progress(i, iterations, current_cost):
+            break
+
+    best = state['tables']
+
+    metrics = {
+        'algorithm': "Hill Climbing",
+        'timestamp': datetime.now().strftime("%Y%m%d_%H%M%S"),
+        'evaluations': evaluations
+    }
+    if presolved is not None:
+        metrics['presolve'] = presolved.info
+    metrics.update(recorder.finish())
+    return problem_model.decode_tables(best, problem), metrics
+
+# ========================================================================================================================================================
+# Função: tabu_search
+# Descrição: Tabu search sobre os mesmos movimentos de create_neighbor (mover um convidado para outra mesa ou trocar dois
+# convidados de mesa). Em cada iteração avalia toda a vizinhança de uma vez com NumPy e aplica o melhor movimento permitido,
+# mesmo que piore. Os convidados movidos ficam tabu durante tabu_tenure iterações (por omissão ~raiz do número de
+# convidados), exceto se o movimento levar a um novo melhor custo (aspiração).
+#
+# A vizinhança é avaliada por pares de mesas (ver _TableAffinity): para cada mesa de origem a e de destino b, o melhor
+# convidado a sair de a para b. Daí sai o melhor movimento (mais a variação do equilíbrio) e, para as trocas entre
+# convidados sem relação, a melhor troca entre cada par de mesas; as trocas entre convidados relacionados (e as que não dá
+# para estimar assim) são avaliadas exatamente (ver _tabu_full_move), por isso o melhor movimento é sempre o da vizinhança.
+#
+# Com mais de TABU_FULL_NEIGHBOURHOOD convidados a vizinhança inteira fica cara (~9 ms por iteração com 2000 convidados),
+# por isso cada iteração avalia só uma lista de candidatos: candidate_size convidados ao acaso (por omissão 2 * raiz do
+# número de convidados) mais os vizinhos dos convidados movidos na iteração anterior, cujas afinidades acabaram de mudar.
+# Para esses avalia todos os movimentos para outras mesas e todas as trocas entre eles, com a mesma aspiração.
+# candidate_size >= número de convidados força a vizinhança inteira.
+# ========================================================================================================================================================
+
+TABU_FULL_NEIGHBOURHOOD = 300
+
+def tabu_search(guests, min_per_table, max_per_table, iterations=1000, tabu_tenure=None, metrics_points=2000, metrics_mode="minmax",
+                initial_method="greedy", progress=None, seed=None, candidate_size=None):
+
+    problem = problem_model.as_problem(guests)
+    num_guests = problem.num_guests
+    rng = make_rng(seed)
+    tables = create_balanced_seating(problem, min_per_table, max_per_table, initial_method, rng)
+    state = create_seating_state(tables, num_guests)
+    current_cost = calculate_cost(state['tables'], problem)
+    view = _TableAffinity(problem, state)
+
+    if tabu_tenure is None:
+        tabu_tenure = max(5, int(math.sqrt(num_guests)))
+    if candidate_size is None and num_guests > TABU_FULL_NEIGHBOURHOOD:
+        candidate_size = 2 * int(math.sqrt(num_guests))
+    if candidate_size is not None and candidate_size >= num_guests:
+        candidate_size = None                                                   # Vizinhança inteira
+    pairs = _related_pairs(problem) if candidate_size is None else None
+    sampler = np.random.default_rng(rng.getrandbits(64))                        # Amostras da lista de candidatos
+
+    tabu_until = np.zeros(num_guests + 1, dtype=np.int64)                      # Posição extra: lugares vazios
+    best_cost = current_cost
+    best_tables = None                                                          # None: a melhor é a atual
+    recorder = MetricsRecorder(('iterations', 'costs', 'best_costs'), metrics_points, metrics_mode, key='costs')
+    evaluations = 0                                                             # Movimentos avaliados
+    moved = []                                                                  # Convidados movidos na última iteração
+
+    for i in range(iterations):
+        recorder.record(i, current_cost, best_cost)
+        if progress is not None and i % 10 == 0 and progress(i, iterations, best_cost):
+            break
+
+        tabu = tabu_until > i
+        tabu[num_guests] = False
+        if candidate_size is None:
+            move, best_delta = _tabu_full_move(view, pairs, tabu, current_cost, best_cost, min_per_table, max_per_table,
+                                               problem.scoring)
+            evaluations += num_guests * (view.num_tables - 1)
+            if move is None:
+                break                                                           # Todos os movimentos estão bloqueados
+        else:
+            sample = [sampler.integers(num_guests, size=candidate_size)]
+            candidates = np.unique(np.concatenate(sample + [view.neighbors[view.offsets[g]:view.offsets[g + 1]] for g in moved]))
+            move, best_delta = _tabu_candidate_move(view, candidates, tabu, current_cost, best_cost, min_per_table, max_per_table,
+                                                    problem.scoring)
+            evaluations += len(candidates) * (view.num_tables - 1)
+            if move is None:
+                moved = []
+                continue                                                        # Outra amostra na próxima iteração
+
+        # Só copia a melhor disposição quando está prestes a piorá-la
+        if best_tables is None and best_delta > 0:
+            best_tables = copy.deepcopy(state['tables'])
+
+        apply_move(state, move)
+        view.apply(move)
+        moved = [move[1], move[3]] if move[0] == 'swap' else [move[1]]
+        for guest in moved:
+            tabu_until[guest] = i + 1 + tabu_tenure
+        current_cost += best_delta
+
+        if current_cost < best_cost - 1e-9:
+            best_cost = current_cost
+            best_tables = None
+
+    if best_tables is None:
+        best_tables = copy.deepcopy(state['tables'])
+
+    metrics = {
+        'algorithm': "Tabu Search",
+        'timestamp': datetime.now().strftime("%Y%m%d_%H%M%S"),
+        'tabu_tenure': tabu_tenure,
+        'candidate_size': candidate_size,                                       # None: vizinhança inteira
+        'evaluations': evaluations                                              # Movimentos avaliados (sem contar as trocas)
+    }
+    metrics.update(recorder.finish())
+    return problem_model.decode_tables(best_tables, problem), metrics
+
+# ========================================================================================================================================================
+# Função: _tabu_full_move
+# Descrição: Melhor movimento permitido de toda a vizinhança (ver tabu_search), como (movimento, variação do custo), ou
+# (None, inf) se estiverem todos bloqueados. pairs são os pares relacionados (ver _related_pairs). As trocas são avaliadas
+# como em local_search_polish: as de convidados relacionados aresta a aresta, as outras pela melhor saída de cada mesa (só
+# exata se esses dois convidados não forem relacionados; senão as trocas entre as duas mesas são avaliadas uma a uma), e
+# as de convidados tabu, que só contam com aspiração, uma a uma.
+# ========================================================================================================================================================
+
+def _tabu_full_move(view, pairs, tabu, current_cost, best_cost, min_per_table, max_per_table, scoring):
+
+    slots, gains = view.table_gains()
+    allowed = np.where(tabu[slots][:, :, None], np.inf, gains)
+    leaving = allowed.argmin(axis=1)                                            # [a, b]: lugar do melhor convidado a sair de a para b
+    best_out = np.take_along_axis(allowed, leaving[:, None, :], axis=1)[:, 0, :]
+    balance = _move_balance_deltas(view.sizes, min_per_table, max_per_table, scoring)
+
+    # Melhor movimento permitido
+    move_delta = best_out + balance
+    from_table, to_table = divmod(int(np.argmin(move_delta)), view.num_tables)
+    best_delta = move_delta[from_table, to_table]
+    move = None
+    if best_delta < np.inf:
+        move = ('move', int(slots[from_table, leaving[from_table, to_table]]), from_table, to_table)
+
+    # Aspiração: movimentos de convidados tabu que dão um novo melhor custo
+    tabu_guests = np.flatnonzero(tabu)
+    if len(tabu_guests):
+        tabu_delta = view.affinity[tabu_guests] - view.own[tabu_guests][:, None] + balance[view.seat[tabu_guests]]
+        k, table = divmod(int(np.argmin(tabu_delta)), view.num_tables)
+        if tabu_delta[k, table] < best_delta and current_cost + tabu_delta[k, table] < best_cost - 1e-9:
+            best_delta = tabu_delta[k, table]
+            move = ('move', int(tabu_guests[k]), int(view.seat[tabu_guests[k]]), table)
+
+    # Trocas entre convidados relacionados: avaliadas diretamente, aresta a aresta
+    sources, targets, weights, related = pairs
+    seat_s, seat_t = view.seat[sources], view.seat[targets]
+    edge_delta = (view.affinity[sources, seat_t] - view.own[sources] + view.affinity[targets, seat_s] - view.own[targets]
+                  - 2 * weights)
+    blocked = (tabu[sources] | tabu[targets]) & (current_cost + edge_delta >= best_cost - 1e-9)
+    edge_delta[(seat_s == seat_t) | blocked] = np.inf
+    if len(edge_delta):
+        e = int(np.argmin(edge_delta))
+        if edge_delta[e] < best_delta:
+            best_delta = edge_delta[e]
+            move = ('swap', int(sources[e]), int(seat_s[e]), int(targets[e]), int(seat_t[e]))
+
+    # Trocas entre convidados sem relação e fora da lista tabu: a melhor entre as mesas a e b é a soma das duas melhores
+    # saídas, desde que esses dois convidados não sejam relacionados
+    estimate = best_out + best_out.T
+    table1, table2 = np.nonzero(np.triu(estimate < best_delta, 1))
+    guest1 = slots[table1, leaving[table1, table2]].astype(np.int64)
+    guest2 = slots[table2, leaving[table2, table1]].astype(np.int64)
+    adjacent = _are_related(related, guest1, guest2, view.num_guests)
+
+    free = np.flatnonzero(~adjacent)
+    if len(free):
+        p = free[np.argmin(estimate[table1[free], table2[free]])]
+        if estimate[table1[p], table2[p]] < best_delta:
+            best_delta = estimate[table1[p], table2[p]]
+            move = ('swap', int(guest1[p]), int(table1[p]), int(guest2[p]), int(table2[p]))
+    adjacent = np.flatnonzero(adjacent)
+    for p in adjacent[np.argsort(estimate[table1[adjacent], table2[adjacent]])]:     # Os mais promissores primeiro
+        a, b = int(table1[p]), int(table2[p])
+        if estimate[a, b] >= best_delta:
+            break
+        swap_delta = view.swap_deltas(slots, gains, a, b)
+        blocked = tabu[slots[a]][:, None] | tabu[slots[b]][None, :]
+        swap_delta = np.where(blocked & (current_cost + swap_delta >= best_cost - 1e-9), np.inf, swap_delta)
+        x, y = divmod(int(np.argmin(swap_delta)), swap_delta.shape[1])
+        if swap_delta[x, y] < best_delta:
+            best_delta = swap_delta[x, y]
+            move = ('swap', int(slots[a, x]), a, int(slots[b, y]), b)
+
+    # Aspiração: trocas de convidados tabu (com qualquer outro convidado) que dão um novo melhor custo
+    if len(tabu_guests):
+        swap_delta = view.guest_swap_deltas(tabu_guests)
+        swap_delta[current_cost + swap_delta >= best_cost - 1e-9] = np.inf
+        k, other = divmod(int(np.argmin(swap_delta)), swap_delta.shape[1])
+        if swap_delta[k, other] < best_delta:
+            best_delta = swap_delta[k, other]
+            move = ('swap', int(tabu_guests[k]), int(view.seat[tabu_guests[k]]), other, int(view.seat[other]))
+
+    return move, best_delta
+
+# ========================================================================================================================================================
+# Função: _tabu_candidate_move
+# Descrição: Como _tabu_full_move, mas só com os movimentos dos convidados de candidates para outras mesas e as trocas
+# entre eles. Os movimentos tabu só são permitidos se derem um novo melhor custo (aspiração).
+# ========================================================================================================================================================
+
+def _tabu_candidate_move(view, candidates, tabu, current_cost, best_cost, min_per_table, max_per_table, scoring):
+
+    seats = view.seat[candidates]
+    blocked = tabu[candidates]
+    gains = view.candidate_gains(candidates)
+    swap_delta = view.candidate_swap_deltas(candidates, gains)
+
+    move_delta = gains
+    move_delta += _move_balance_deltas(view.sizes, min_per_table, max_per_table, scoring, rows=seats)
+    tabu_delta = move_delta[blocked]
+    tabu_delta[current_cost + tabu_delta >= best_cost - 1e-9] = np.inf
+    move_delta[blocked] = tabu_delta
+    x, table = divmod(int(np.argmin(move_delta)), view.num_tables)
+    best_delta = move_delta[x, table]
+    move = ('move', int(candidates[x]), int(seats[x]), table) if best_delta < np.inf else None
+
+    swap_delta = np.where((blocked[:, None] | blocked[None, :]) & (current_cost + swap_delta >= best_cost - 1e-9), np.inf, swap_delta)
+    x, y = divmod(int(np.argmin(swap_delta)), len(candidates))
+    if swap_delta[x, y] < best_delta:
+        best_delta = swap_delta[x, y]
+        move = ('swap', int(candidates[x]), int(seats[x]), int(candidates[y]), int(seats[y]))
+
+    return move, best_delta
+
+# ========================================================================================================================================================
+# Função: _related_pairs / _are_related
+# Descrição: Pares com relação (cada um uma vez), para as trocas entre convidados relacionados: (sources, targets, weights,
+# related), com related as chaves ordenadas dos pares. _are_related diz, para cada i, se guest1[i] e guest2[i] são
+# relacionados.
+# ========================================================================================================================================================
+
+def _related_pairs(problem):
+
+    sources, targets, weights = problem.edges()
+    sources, targets = sources.astype(np.int64), targets.astype(np.int64)
+    return sources, targets, weights, np.sort(sources * problem.num_guests + targets)
+
+def _are_related(related, guest1, guest2, num_guests):
+
+    if not len(related):
+        return np.zeros(len(guest1), dtype=bool)
+    keys = np.minimum(guest1, guest2) * num_guests + np.maximum(guest1, guest2)
+    return related[np.minimum(np.searchsorted(related, keys), len(related) - 1)] == keys
+
+# ========================================================================================================================================================
+# Função: local_search_polish
+# Descrição: Pós-otimização de uma disposição já encontrada (por qualquer algoritmo): aplica movimentos e trocas que baixam
+# o custo, respeitando min_per_table / max_per_table, até chegar a um ótimo local, ou seja, até nenhum movimento de um
+# convidado e nenhuma troca entre dois convidados melhorar o custo.
+#   - "steepest": em cada passo aplica o melhor movimento/troca de toda a vizinhança
+#   - "first": aplica o melhor movimento de um convidado se algum melhorar; só procura trocas quando já não há movimentos
+# A vizinhança é avaliada com a matriz de afinidades (_TableAffinity). As trocas entre convidados relacionados são avaliadas
+# aresta a aresta; para as outras, a melhor troca entre as mesas a e b é a soma da melhor saída de a para b com a melhor
+# saída de b para a (só se esses dois convidados forem relacionados é preciso avaliar as trocas das duas mesas uma a uma).
+# time_limit (segundos) limita o tempo do polimento: ao esgotar-se, devolve a disposição atual (melhor que a inicial).
+# Recebe e devolve as mesas com nomes (como os algoritmos). Devolve (mesas, info) com
+# info = {'strategy', 'initial_cost', 'cost', 'moves', 'swaps', 'elapsed', 'stop_reason'}; stop_reason é "local_optimum",
+# "max_steps", "time_limit" ou "cancelled".
+# ========================================================================================================================================================
+
+def local_search_polish(guests, tables, min_per_table, max_per_table, strategy="first", max_steps=None, progress=None,
+                        time_limit=None):
+
+    if strategy not in ("first", "steepest"):
+        raise ValueError(f"Unsupported polish strategy: {strategy}")
+
+    start = time.perf_counter()
+    problem = problem_model.as_problem(guests)
+    state = create_seating_state(problem_model.encode_tables(tables, problem), problem.num_guests)
+    initial_cost = cost = calculate_cost(state['tables'], problem)
+    view = _TableAffinity(problem, state)
+
+    sources, targets, weights, related = _related_pairs(problem)
+
+    moves = swaps = steps = 0
+    stop_reason = "max_steps"
+    while max_steps is None or steps < max_steps:
+        if time_limit is not None and time.perf_counter() - start >= time_limit:
+            stop_reason = "time_limit"
+            break
+        if progress is not None and steps % 10 == 0 and progress(steps, max_steps, cost):
+            stop_reason = "cancelled"
+            break
+        steps += 1
+
+        slots, gains = view.table_gains()
+        leaving = gains.argmin(axis=1)                                          # [a, b]: lugar do melhor convidado a sair de a para b
+        best_out = np.take_along_axis(gains, leaving[:, None, :], axis=1)[:, 0, :]
+        move_delta = best_out + _move_balance_deltas(view.sizes, min_per_table, max_per_table, problem.scoring)
+        from_table, to_table = divmod(int(np.argmin(move_delta)), view.num_tables)
+        best_delta = min(move_delta[from_table, to_table], -1e-9)
+        move = None
+        if best_delta < -1e-9:
+            move = ('move', int(slots[from_table, leaving[from_table, to_table]]), from_table, to_table)
+
+        if move is None or strategy == "steepest":
+            # Trocas entre convidados relacionados: avaliadas diretamente, aresta a aresta
+            seat_s, seat_t = view.seat[sources], view.seat[targets]
+            edge_delta = (view.affinity[sources, seat_t] - view.own[sources] + view.affinity[targets, seat_s] - view.own[targets]
+                          - 2 * weights)
+            edge_delta[seat_s == seat_t] = np.inf
+            if len(edge_delta):
+                e = int(np.argmin(edge_delta))
+                if edge_delta[e] < best_delta:
+                    best_delta = edge_delta[e]
+                    move = ('swap', int(sources[e]), int(seat_s[e]), int(targets[e]), int(seat_t[e]))
+
+            # Trocas entre convidados sem relação: para as mesas a e b, a melhor é a soma das duas melhores saídas, desde que
+            # esses dois convidados não sejam relacionados; se forem, as trocas entre as duas mesas são avaliadas uma a uma
+            estimate = best_out + best_out.T
+            table1, table2 = np.nonzero(np.triu(estimate < best_delta, 1))
+            guest1 = slots[table1, leaving[table1, table2]].astype(np.int64)
+            guest2 = slots[table2, leaving[table2, table1]].astype(np.int64)
+            adjacent = _are_related(related, guest1, guest2, problem.num_guests)
+
+            free = np.flatnonzero(~adjacent)
+            if len(free):
+                p = free[np.argmin(estimate[table1[free], table2[free]])]
+                if estimate[table1[p], table2[p]] < best_delta:
+                    best_delta = estimate[table1[p], table2[p]]
+                    move = ('swap', int(guest1[p]), int(table1[p]), int(guest2[p]), int(table2[p]))
+            for p in np.flatnonzero(adjacent):
+                a, b = int(table1[p]), int(table2[p])
+                if estimate[a, b] >= best_delta:
+                    continue
+                swap_delta = view.swap_deltas(slots, gains, a, b)
+                x, y = divmod(int(np.argmin(swap_delta)), swap_delta.shape[1])
+                if swap_delta[x, y] < best_delta:
+                    best_delta = swap_delta[x, y]
+                    move = ('swap', int(slots[a, x]), a, int(slots[b, y]), b)
+
+        if move is None:
+            stop_reason = "local_optimum"
+            break                                                               # Ótimo local
+
+        apply_move(state, move)
+        view.apply(move)
+        cost += best_delta
+        if move[0] == 'swap':
+            swaps += 1
+        else:
+            moves += 1
+
+    info = {
+        'strategy': strategy,
+        'initial_cost': initial_cost,
+        'cost': float(cost),
+        'moves': moves,
+        'swaps': swaps,
+        'elapsed': time.perf_counter() - start,
+        'stop_reason': stop_reason
+    }
+    return problem_model.decode_tables(state['tables'], problem), info
+
+# ========================================================================================================================================================
+# Classe: _TableAffinity
+# Descrição: Matriz de afinidades de uma disposição (convidado x mesa: custo dos pares que o convidado teria em cada mesa),
+# atualizada incrementalmente a cada movimento, usada para avaliar a vizinhança inteira com NumPy (tabu_search e
+# local_search_polish). Tem uma linha extra a infinito para os lugares vazios das mesas mais pequenas.
+#   - table_gains(): slots[a, k] é o k-ésimo convidado da mesa a (ou num_guests) e gains[a, k, b] a variação do custo dos
+#     pares se esse convidado for para a mesa b
+#   - swap_deltas(slots, gains, a, b): variação exata de cada troca entre as mesas a e b (slots de a x slots de b)
+#   - guest_swap_deltas(guests): variação exata de cada troca de guests[x] com cada convidado (infinito na mesma mesa)
+#   - candidate_gains(candidates) e candidate_swap_deltas(candidates, gains): o mesmo só para uma lista de convidados
+#     (lista de candidatos do tabu_search em problemas grandes): gains[x, b] ao mover candidates[x] para a mesa b e
+#     deltas[x, y] ao trocar candidates[x] com candidates[y] (infinito se estiverem na mesma mesa)
+# ========================================================================================================================================================
+
+class _TableAffinity:
+
+    def __init__(self, problem, state):
+        self.num_guests = problem.num_guests
+        self.num_tables = len(state['tables'])
+        self.offsets = np.frombuffer(problem.offsets, dtype=np.int32)
+        self.neighbors = np.frombuffer(problem.neighbors, dtype=np.int32)
+        self.weights = np.frombuffer(problem.weights, dtype=np.float64)
+
+        self.seat = np.append(np.frombuffer(state['seat_of'], dtype=np.int32), 0)
+        self.sizes = np.array([len(table) for table in state['tables']])
+        sources = np.repeat(np.arange(self.num_guests), np.diff(self.offsets))
+        self.affinity = np.zeros((self.num_guests + 1, self.num_tables))
+        np.add.at(self.affinity, (sources, self.seat[self.neighbors]), self.weights)
+        self.affinity[self.num_guests] = np.inf
+        self.own = np.zeros(self.num_guests + 1)                               # Afinidade de cada convidado com a própria mesa
+        self.position = np.zeros(self.num_guests + 1, dtype=np.int64)          # Lugar de cada convidado em slots
+
+    def relocate(self, guest, from_table, to_table):
+        start, end = self.offsets[guest], self.offsets[guest + 1]
+        np.subtract.at(self.affinity, (self.neighbors[start:end], from_table), self.weights[start:end])
+        np.add.at(self.affinity, (self.neighbors[start:end], to_table), self.weights[start:end])
+        self.seat[guest] = to_table
+        self.sizes[from_table] -= 1
+        self.sizes[to_table] += 1
+
+    def apply(self, move):
+        if move[0] == 'swap':
+            self.relocate(move[1], move[2], move[4])
+            self.relocate(move[3], move[4], move[2])
+        else:
+            self.relocate(move[1], move[2], move[3])
+
+    def table_gains(self):
+        num_guests = self.num_guests
+        seat = self.seat[:num_guests]
+        self.own[:num_guests] = self.affinity[np.arange(num_guests), seat]
+
+        order = np.argsort(seat, kind='stable')
+        starts = np.cumsum(self.sizes) - self.sizes
+        self.position[order] = np.arange(num_guests) - starts[seat[order]]
+        slots = np.full((self.num_tables, self.sizes.max()), num_guests)
+        slots[seat[order], self.position[order]] = order
+
+        gains = self.affinity[slots] - self.own[slots][:, :, None]
+        return slots, gains
+
+    def swap_deltas(self, slots, gains, table1, table2):
+        deltas = gains[table1, :, table2][:, None] + gains[table2, :, table1][None, :]
+        for x, guest in enumerate(slots[table1]):
+            if guest == self.num_guests:
+                break
+            start, end = self.offsets[guest], self.offsets[guest + 1]
+            others = self.neighbors[start:end]
+            at_table2 = self.seat[others] == table2
+            deltas[x, self.position[others[at_table2]]] -= 2 * self.weights[start:end][at_table2]
+        return deltas
+
+    def guest_swap_deltas(self, guests):
+        num_guests = self.num_guests
+        seat = self.seat[:num_guests]
+        own = self.affinity[np.arange(num_guests), seat]
+        deltas = (self.affinity[guests][:, seat] - own[guests][:, None]
+                  + (self.affinity[np.arange(num_guests)[:, None], seat[guests][None, :]] - own[:, None]).T)
+        deltas[seat[guests][:, None] == seat[None, :]] = np.inf
+
+        starts = self.offsets[guests]
+        counts = self.offsets[guests + 1] - starts
+        edges = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - starts, counts)
+        np.subtract.at(deltas, (np.repeat(np.arange(len(guests)), counts), self.neighbors[edges]), 2 * self.weights[edges])
+        return deltas
+
+    def candidate_gains(self, candidates):
+        return self.affinity[candidates] - self.affinity[candidates, self.seat[candidates]][:, None]
+
+    def candidate_swap_deltas(self, candidates, gains):
+        seats = self.seat[candidates]
+        deltas = gains[:, seats] + gains[:, seats].T
+        deltas[seats[:, None] == seats[None, :]] = np.inf
+
+        # Pares relacionados entre candidatos: deixam de ser vizinhos (ou passam a sê-lo) nas duas direções
+        index = np.full(self.num_guests, -1)
+        index[candidates] = np.arange(len(candidates))
+        starts = self.offsets[candidates]
+        counts = self.offsets[candidates + 1] - starts
+        sources = np.repeat(np.arange(len(candidates)), counts)
+        edges = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - starts, counts)
+        targets = index[self.neighbors[edges]]
+        related = targets >= 0
+        np.subtract.at(deltas, (sources[related], targets[related]), 2 * self.weights[edges[related]])
+        return deltas
+
+# ========================================================================================================================================================
+# Função: _move_balance_deltas
+# Descrição: Variação das penalizações de equilíbrio (calculate_balance_penalty) ao mover um convidado da mesa i para a
+# mesa j, para todos os pares (i, j) de uma vez. Movimentos impossíveis (mesma mesa ou fora dos limites) ficam a infinito.
+# A variação só depende dos tamanhos das duas mesas (e de quantas mesas há de cada tamanho), por isso é calculada uma vez
+# por par de tamanhos e depois distribuída pelas mesas. Com rows só devolve as linhas dessas mesas de origem (uma linha por
+# elemento de rows, que pode ter repetições).
+# ========================================================================================================================================================
+
+def _move_balance_deltas(sizes, min_per_table, max_per_table, scoring=problem_model.DEFAULT_SCORING, rows=None):
+
+    num_tables = len(sizes)
+    avg_size = sizes.sum() / num_tables
+    rows = np.arange(num_tables) if rows is None else rows
+    values = np.arange(sizes.max() + 2)                                         # Tamanhos possíveis antes e depois
+    from_values = values[:, None]
+    to_values = values[None, :]
+
+    # Maior e menor tamanho das outras mesas (exceto a de origem e a de destino), pelas contagens de cada tamanho
+    remaining = (np.bincount(sizes, minlength=len(values))
+                 - (from_values[:, :, None] == values) - (to_values[:, :, None] == values))
+    others_max = np.where(remaining > 0, values, -np.inf).max(axis=2)
+    others_min = np.where(remaining > 0, values, np.inf).min(axis=2)
+
+    from_sizes = from_values - 1
+    to_sizes = to_values + 1
+    new_max = np.maximum(np.maximum(from_sizes, to_sizes), others_max)
+    new_min = np.minimum(np.minimum(from_sizes, to_sizes), others_min)
+    new_spread = new_max - new_min
+    old_spread = sizes.max() - sizes.min()
+
+    spread_penalty, size_penalty = scoring.spread_penalty, scoring.size_penalty
+    delta = np.where(new_spread > 1, new_spread * spread_penalty, 0) - (old_spread * spread_penalty if old_spread > 1 else 0)
+    delta = delta + (np.abs(from_sizes - avg_size) - np.abs(from_values - avg_size)) * size_penalty
+    delta = delta + (np.abs(to_sizes - avg_size) - np.abs(to_values - avg_size)) * size_penalty
+    delta = np.where((from_sizes < min_per_table) | (to_sizes > max_per_table), np.inf, delta)
+
+    result = delta[sizes[rows]][:, sizes]
+    result[rows[:, None] == np.arange(num_tables)[None, :]] = np.inf
+    return result
+
+# ========================================================================================================================================================
+# Função: parallel_tempering
+# Descrição: Parallel Tempering (replica exchange). Corre num_replicas cadeias de Simulated Annealing a temperaturas fixas
+# (escada geométrica entre min_temperature e max_temperature, que pode ser "auto") e, a cada swap_interval iterações,
+# tenta trocar as disposições entre temperaturas vizinhas. As réplicas quentes exploram e as frias refinam, sem depender
+# de um arrefecimento que pare cedo. Com workers != 1 as réplicas correm num pool de processos (None = todos os cores).
+# Com presolve=True usa a pré-resolução e os movimentos de super-nós (como em simulated_annealing).
+# ========================================================================================================================================================
+
+def parallel_tempering(guests, min_per_table, max_per_table, iterations, num_replicas=8, max_temperature=200, min_temperature=1,
+                       swap_interval=100, workers=1, initial_method="greedy", progress=None, presolve=False, seed=None):
+
+    rng = make_rng(seed)
+    problem = problem_model.as_problem(guests)
+    presolved = _presolved(problem, min_per_table, max_per_table, presolve)
+    if presolved is not None:
+        initial_method = "presolve"
+    replicas = [create_balanced_seating(problem, min_per_table, max_per_table, initial_method, rng) for _ in range(num_replicas)]
+    costs = [calculate_cost(tables, problem) for tables in replicas]
+
+    # Escada de temperaturas (da mais fria para a mais quente); "auto" calibra a mais quente (ver calibrate_temperature)
+    if max_temperature == "auto":
+        max_temperature = max(calibrate_temperature(problem, create_seating_state(replicas[0], problem.num_guests), min_per_table,
+                                                    max_per_table, rng=rng, presolved=presolved), min_temperature)
+    if num_replicas == 1:
+        temperatures = [max_temperature]
+    else:
+        ratio = max_temperature / min_temperature
+        temperatures = [min_temperature * ratio ** (k / (num_replicas - 1)) for k in range(num_replicas)]
+
+    best_index = min(range(num_replicas), key=lambda k: costs[k])
+    best_tables = copy.deepcopy(replicas[best_index])
+    best_cost = costs[best_index]
+
+    metrics = {
+        'algorithm': "Parallel Tempering",
+        'timestamp': datetime.now().strftime("%Y%m%d_%H%M%S"),
+        'temperatures': temperatures,
+        'iterations': [],
+        'best_costs': [],
+        'replica_costs': [],
+        'swap_attempts': 0,
+        'swap_accepts': 0
+    }
+    if presolved is not None:
+        metrics['presolve'] = presolved.info
+
+    executor = None
+    if workers != 1 and num_replicas > 1:
+        executor = ProcessPoolExecutor(max_workers=min(workers or num_replicas, num_replicas),
+                                       initializer=_init_tempering_worker, initargs=(problem,))
+
+    try:
+        done = 0
+        epoch = 0
+        while done < iterations:
+            steps = min(swap_interval, iterations - done)
+
+            # Cada réplica faz "steps" iterações à sua temperatura, com uma semente própria por época (a mesma com ou sem processos)
+            seeds = spawn_seeds(rng, num_replicas)
+            if executor:
+                futures = [executor.submit(_tempering_worker, replicas[k], costs[k], temperatures[k], steps,
+                                           min_per_table, max_per_table, presolve, seeds[k])
+                           for k in range(num_replicas)]
+                results = [future.result() for future in futures]
+            else:
+                results = [_anneal_at_temperature(problem, replicas[k], costs[k], temperatures[k], steps, min_per_table, max_per_table,
+                                                  make_rng(seeds[k]), presolved)
+                           for k in range(num_replicas)]
+
+            for k, (tables, cost, replica_best, replica_best_cost) in enumerate(results):
+                replicas[k], costs[k] = tables, cost
+                if replica_best_cost < best_cost:
+                    best_tables, best_cost = replica_best, replica_best_cost
+
+            # Troca entre temperaturas vizinhas (alterna pares pares/ímpares em cada época)
+            for k in range(epoch % 2, num_replicas - 1, 2):
+                metrics['swap_attempts'] += 1
+                exponent = (1 / temperatures[k] - 1 / temperatures[k + 1]) * (costs[k] - costs[k + 1])
+                if exponent >= 0 or rng.random() < math.exp(exponent):
+                    replicas[k], replicas[k + 1] = replicas[k + 1], replicas[k]
+                    costs[k], costs[k + 1] = costs[k + 1], costs[k]
+                    metrics['swap_accepts'] += 1
+
+            done += steps
+            epoch += 1
+            metrics['iterations'].append(done)
+            metrics['best_costs'].append(best_cost)
+            metrics['replica_costs'].append(list(costs))
+
+            if progress is not None and progress(done, iterations, best_cost):
+                break
+    finally:
+        if executor:
+            executor.shutdown()
+
+    metrics['evaluations'] = done * num_replicas
+    return problem_model.decode_tables(best_tables, problem), metrics
+
+# ========================================================================================================================================================
+# Função: _anneal_at_temperature
+# Descrição: Executa "steps" iterações de Metropolis a temperatura fixa a partir de uma disposição (mesas com ids).
+# Devolve a disposição final, o seu custo e a melhor disposição (e custo) vista pelo caminho.
+# presolved é a pré-resolução cujos movimentos são usados (ver propose_move).
+# ========================================================================================================================================================
+
+def _anneal_at_temperature(problem, tables, cost, temperature, steps, min_per_table, max_per_table, rng=random, presolved=None):
+
+    state = create_seating_state(tables, problem.num_guests)
+    best_tables = None
+    best_cost = cost
+    best_is_current = True
+
+    for _ in range(steps):
+        move = propose_move(state, min_per_table, max_per_table, rng, presolved)
+        delta_cost = calculate_move_delta(state, move, problem)
+
+        if delta_cost < 0 or rng.random() < math.exp(-delta_cost / temperature):
+            if best_is_current and delta_cost > 0:
+                best_tables = copy.deepcopy(state['tables'])
+                best_is_current = False
+
+            apply_move(state, move)
+            cost += delta_cost
+
+            if cost < best_cost:
+                best_cost = cost
+                best_is_current = True
+
+    if best_is_current:
+        best_tables = copy.deepcopy(state['tables'])
+
+    return state['tables'], cost, best_tables, best_cost
+
+# Estado de cada processo do pool do Parallel Tempering (o Problem só é enviado no arranque)
+_tempering_problem = None
+
+def _init_tempering_worker(problem):
+    global _tempering_problem
+    _tempering_problem = problem
+
+def _tempering_worker(tables, cost, temperature, steps, min_per_table, max_per_table, presolve, seed):
+    presolved = _presolved(_tempering_problem, min_per_table, max_per_table, presolve)
+    return _anneal_at_temperature(_tempering_problem, tables, cost, temperature, steps, min_per_table, max_per_table, make_rng(seed),
+                                  presolved)
+
+# ========================================================================================================================================================
+# Função: multilevel_search
+# Descrição: Solver multinível (coarsen - solve - refine), como nos particionadores de grafos grandes:
+#   1. Coarsening: em cada nível os pares de nós com a preferência mais forte entre si são fundidos (heavy edge matching,
+#      por uma ordem aleatória) num nó com o tamanho (número de convidados) dos dois, até restarem poucos nós ou quase
+#      nenhum par se fundir. Um nó nunca passa de metade da maior mesa, para os nós continuarem a caber nas mesas.
+#   2. Solve: no nível mais grosseiro, coarse_starts disposições iniciais gulosas (como create_balanced_seating, com os
+#      nós do maior para o menor) são refinadas e fica a melhor.
+#   3. Uncoarsening: a disposição é projetada nível a nível (cada nó herda a mesa do nó que o contém) e refinada em cada
+#      nível com uma procura local de movimentos e trocas de nós (ver _refine_level), tal como o hill_climbing mas com
+#      nós de vários tamanhos e o melhor movimento de cada nó avaliado de uma vez com NumPy.
+# Cada nível custa O(nós * mesas) por passagem, por isso o tempo cresce quase linearmente com o número de convidados.
+# progress(nível, níveis, melhor_custo) é chamado depois de cada nível; se devolver True, a disposição atual é projetada
+# logo nos convidados. Devolve (mesas, métricas) com 'levels' (nós por nível, do mais fino ao mais grosseiro) e
+# 'level_costs' (custo depois de refinar cada nível, do mais grosseiro ao mais fino).
+# ========================================================================================================================================================
+
+def multilevel_search(guests, min_per_table, max_per_table, coarse_starts=8, max_passes=10, progress=None, seed=None):
+
+    rng = make_rng(seed)
+    problem = problem_model.as_problem(guests)
+    capacities = _table_sizes(problem.num_guests, min_per_table, max_per_table)
+    num_tables = len(capacities)
+    max_node_size = max(1, max(capacities) // 2)
+
+    # Nível 0: os próprios convidados
+    offsets, neighbors, weights = problem.offsets, problem.neighbors, problem.weights
+    levels = [([1] * problem.num_guests,
+               [{neighbors[k]: weights[k] for k in range(offsets[g], offsets[g + 1])} for g in range(problem.num_guests)])]
+    mappings = []
+
+    # 1. Coarsening
+    target_nodes = max(2 * num_tables, 20)
+    while len(levels[-1][0]) > target_nodes:
+        mapping, coarse = _coarsen_level(*levels[-1], max_node_size, rng)
+        if len(coarse[0]) > 0.95 * len(levels[-1][0]):
+            break
+        mappings.append(mapping)
+        levels.append(coarse)
+
+    metrics = {
+        'algorithm': "Multilevel",
+        'timestamp': datetime.now().strftime("%Y%m%d_%H%M%S"),
+        'levels': [len(sizes) for sizes, _ in levels],
+        'level_costs': [],
+        'evaluations': 0
+    }
+
+    # Projeta a disposição de um nível nos convidados (para medir o custo real)
+    def guest_tables(part, level):
+        for mapping in reversed(mappings[:level]):
+            part = [part[node] for node in mapping]
+        tables = [[] for _ in range(num_tables)]
+        for guest, table in enumerate(part):
+            tables[table].append(guest)
+        return tables
+
+    # 2. Solve no nível mais grosseiro
+    sizes, adjacency = levels[-1]
+    best_part, best_cost = None, float('inf')
+    for _ in range(coarse_starts):
+        part = _initial_level_assignment(sizes, adjacency, capacities, rng)
+        cost, evaluations = _refine_level(sizes, adjacency, part, num_tables, min_per_table, max_per_table, problem.scoring,
+                                          max_passes, rng)
+        metrics['evaluations'] += evaluations
+        if cost < best_cost:
+            best_part, best_cost = part, cost
+    part = best_part
+
+    level = len(levels) - 1
+    metrics['level_costs'].append(calculate_cost(guest_tables(part, level), problem))
+    stopped = progress is not None and progress(len(levels) - level, len(levels), metrics['level_costs'][-1])
+
+    # 3. Uncoarsening com refinamento em cada nível
+    while level > 0 and not stopped:
+        mapping = mappings[level - 1]
+        part = [part[node] for node in mapping]
+        level -= 1
+        sizes, adjacency = levels[level]
+        _, evaluations = _refine_level(sizes, adjacency, part, num_tables, min_per_table, max_per_table, problem.scoring,
+                                       max_passes, rng)
+        metrics['evaluations'] += evaluations
+        metrics['level_costs'].append(calculate_cost(guest_tables(part, level), problem))
+        stopped = progress is not None and progress(len(levels) - level, len(levels), metrics['level_costs'][-1])
+
+    tables = guest_tables(part, level)
+    return problem_model.decode_tables(tables, problem), metrics
+
+# ========================================================================================================================================================
+# Função: _coarsen_level
+# Descrição: Um passo de coarsening: cada nó (por ordem aleatória) é emparelhado com o vizinho livre com a preferência mais
+# forte (peso mais negativo), se o tamanho dos dois não passar de max_node_size. Devolve o mapa nó -> nó grosseiro e o
+# nível grosseiro (tamanhos e adjacências com os pesos somados; os pares dentro de um nó deixam de contar).
+# ========================================================================================================================================================
+
+def _coarsen_level(sizes, adjacency, max_node_size, rng):
+
+    num_nodes = len(sizes)
+    order = list(range(num_nodes))
+    rng.shuffle(order)
+    match = [-1] * num_nodes
+
+    for node in order:
+        if match[node] >= 0:
+            continue
+        partner, partner_weight = node, 0
+        for other, weight in adjacency[node].items():
+            if weight < partner_weight and match[other] < 0 and other != node and sizes[node] + sizes[other] <= max_node_size:
+                partner, partner_weight = other, weight
+        match[node] = partner
+        match[partner] = node
+
+    mapping = [-1] * num_nodes
+    coarse_sizes = []
+    for node in range(num_nodes):
+        if mapping[node] < 0:
+            mapping[node] = mapping[match[node]] = len(coarse_sizes)
+            coarse_sizes.append(sizes[node] + (sizes[match[node]] if match[node] != node else 0))
+
+    coarse_adjacency = [{} for _ in coarse_sizes]
+    for node in range(num_nodes):
+        coarse = coarse_adjacency[mapping[node]]
+        for other, weight in adjacency[node].items():
+            target = mapping[other]
+            if target != mapping[node]:
+                coarse[target] = coarse.get(target, 0) + weight
+
+    return mapping, (coarse_sizes, coarse_adjacency)
+
+# ========================================================================================================================================================
+# Função: _initial_level_assignment
+# Descrição: Disposição inicial de um nível: nós do maior para o menor (empates por rng) na mesa com lugar onde têm a melhor
+# afinidade com quem já lá está (sem vizinhos sentados, a mais vazia). Um nó que não cabe em nenhuma mesa vai para a mais
+# vazia (o refinamento corrige o desequilíbrio). Devolve a mesa de cada nó.
+# ========================================================================================================================================================
+
+def _initial_level_assignment(sizes, adjacency, capacities, rng):
+
+    num_tables = len(capacities)
+    room = list(capacities)
+    part = [-1] * len(sizes)
+
+    for node in sorted(range(len(sizes)), key=lambda node: (-sizes[node], rng.random())):
+        affinity = {}
+        for other, weight in adjacency[node].items():
+            if part[other] >= 0:
+                affinity[part[other]] = affinity.get(part[other], 0) + weight
+        fits = [t for t in range(num_tables) if room[t] >= sizes[node]]
+        if fits:
+            table = min(fits, key=lambda t: (affinity.get(t, 0), -room[t]))
+        else:
+            table = max(range(num_tables), key=lambda t: room[t])
+        part[node] = table
+        room[table] -= sizes[node]
+    return part
+
+# ========================================================================================================================================================
+# Função: _refine_level
+# Descrição: Procura local de um nível (altera "part" no próprio sítio). Em cada passagem, para cada nó (por ordem aleatória):
+#   - avalia de uma vez o movimento para todas as mesas (afinidade do nó com cada mesa, da matriz nós x mesas, mais a
+#     variação do equilíbrio, ver _node_move_balance) e aplica o melhor se baixar o custo;
+#   - senão, tenta trocá-lo com os nós da mesa para onde mais gostaria de ir.
+# Para ao fim de max_passes passagens ou quando uma passagem não melhora nada. Os movimentos respeitam min_per_table /
+# max_per_table (contados em convidados). Devolve (custo do nível, avaliações); o custo não inclui os pares dentro dos nós.
+# ========================================================================================================================================================
+
+def _refine_level(sizes, adjacency, part, num_tables, min_per_table, max_per_table, scoring, max_passes, rng):
+
+    num_nodes = len(sizes)
+    affinity = np.zeros((num_nodes, num_tables))
+    table_sizes = np.zeros(num_tables)
+    members = [set() for _ in range(num_tables)]
+    for node in range(num_nodes):
+        table_sizes[part[node]] += sizes[node]
+        members[part[node]].add(node)
+        for other, weight in adjacency[node].items():
+            affinity[other, part[node]] += weight
+    avg_size = table_sizes.sum() / num_tables
+
+    def move(node, target):
+        source = part[node]
+        part[node] = target
+        table_sizes[source] -= sizes[node]
+        table_sizes[target] += sizes[node]
+        members[source].remove(node)
+        members[target].add(node)
+        for other, weight in adjacency[node].items():
+            affinity[other, source] -= weight
+            affinity[other, target] += weight
+
+    evaluations = 0
+    order = list(range(num_nodes))
+    for _ in range(max_passes):
+        improved = False
+        rng.shuffle(order)
+        for node in order:
+            source, size = part[node], sizes[node]
+            gains = affinity[node] - affinity[node, source]
+            deltas = gains + _node_move_balance(table_sizes, source, size, min_per_table, max_per_table, avg_size, scoring)
+            evaluations += num_tables
+            target = int(np.argmin(deltas))
+            if deltas[target] < -1e-9:
+                move(node, target)
+                improved = True
+                continue
+
+            # Troca com um nó da mesa mais atraente
+            gains[source] = np.inf
+            target = int(np.argmin(gains))
+            if gains[target] >= 0:
+                continue
+            best_delta, best_other = -1e-9, -1
+            for other in members[target]:
+                change = sizes[other] - size
+                if change:
+                    new_sizes = table_sizes.copy()
+                    new_sizes[source] += change
+                    new_sizes[target] -= change
+                    if not (min_per_table <= new_sizes[source] <= max_per_table and min_per_table <= new_sizes[target] <= max_per_table):
+                        continue
+                    balance = scoring.balance_penalty(list(new_sizes)) - scoring.balance_penalty(list(table_sizes))
+                else:
+                    balance = 0
+                delta = (gains[target] + affinity[other, source] - affinity[other, target]
+                         - 2 * adjacency[node].get(other, 0) + balance)
+                evaluations += 1
+                if delta < best_delta:
+                    best_delta, best_other = delta, other
+            if best_other >= 0:
+                move(node, target)
+                move(best_other, source)
+                improved = True
+        if not improved:
+            break
+
+    pairs = sum(affinity[node, part[node]] for node in range(num_nodes)) / 2
+    return pairs + scoring.balance_penalty(list(table_sizes)), evaluations
+
+# ========================================================================================================================================================
+# Função: _node_move_balance
+# Descrição: Variação das penalizações de equilíbrio ao mover um nó com "size" convidados da mesa source para cada uma das
+# mesas (vetor por mesa de destino). Movimentos impossíveis (a mesma mesa ou fora dos limites) ficam a infinito.
+# ========================================================================================================================================================
+
+def _node_move_balance(table_sizes, source, size, min_per_table, max_per_table, avg_size, scoring):
+
+    num_tables = len(table_sizes)
+    from_size = table_sizes[source] - size
+    to_sizes = table_sizes + size
+
+    # Maior e menor tamanho das outras mesas (exceto a origem e o destino)
+    def extreme_of_others(values, pick):
+        values = values.copy()
+        values[source] = np.nan
+        if num_tables < 3:
+            return np.full(num_tables, np.nan)
+        first = pick(values)
+        second_values = values.copy()
+        second_values[first] = np.nan
+        result = np.full(num_tables, values[first])
+        result[first] = second_values[pick(second_values)]
+        return result
+
+    others_max = extreme_of_others(table_sizes, np.nanargmax)
+    others_min = extreme_of_others(table_sizes, np.nanargmin)
+    new_max = np.fmax(np.maximum(from_size, to_sizes), others_max)
+    new_min = np.fmin(np.minimum(from_size, to_sizes), others_min)
+    new_spread = new_max - new_min
+    old_spread = table_sizes.max() - table_sizes.min()
+
+    delta = np.where(new_spread > 1, new_spread * scoring.spread_penalty, 0) - (old_spread * scoring.spread_penalty if old_spread > 1 else 0)
+    delta = delta + (abs(from_size - avg_size) - abs(table_sizes[source] - avg_size)) * scoring.size_penalty
+    delta = delta + (np.abs(to_sizes - avg_size) - np.abs(table_sizes - avg_size)) * scoring.size_penalty
+
+    invalid = (to_sizes > max_per_table) | (np.arange(num_tables) == source)
+    if from_size < min_per_table:
+        invalid[:] = True
+    return np.where(invalid, np.inf, delta)
+
+# Algoritmos disponíveis na interface e nas comparações (pela ordem em que aparecem)
+ALGORITHMS = ["Simulated Annealing", "Genetic Algorithm", "Hill Climbing", "Parallel Tempering", "Island Genetic Algorithm", "Tabu Search",
+              "Multilevel"]
+
+# ========================================================================================================================================================
+# Função: run_algorithm
+# Descrição: Executa o algoritmo indicado com os parâmetros da interface (dicionário params) e devolve as mesas e as métricas.
+# Usado pela interface e pelos benchmarks para não repetir a escolha do algoritmo.
+# params["seed"] (opcional) é a semente da corrida (ver make_rng).
+# params["presolve"] = "on" pré-resolve o problema (ver presolve.presolve): todos os algoritmos partem de disposições que
+# respeitam as restrições e o SA, o Hill Climbing e o Parallel Tempering passam a mover super-nós.
+# ========================================================================================================================================================
+
+def run_algorithm(guests, algorithm, params, progress=None):
+
+    presolve = params.get("presolve", "off") == "on"
+    initial_method = "presolve" if presolve else params.get("initial_method", "greedy")
+
+    if algorithm == "Simulated Annealing":
+        return simulated_annealing(
+            guests=guests,
+            initial_temperature=params["initial_temperature"],
+            cooling_rate=params["cooling_rate"],
+            iterations=params["iterations"],
+            cooling_type=params["cooling_type"],
+            min_per_table=params["min_per_table"],
+            max_per_table=params["max_per_table"],
+            metrics_points=params.get("metrics_points", 2000),
+            metrics_mode=params.get("metrics_mode", "minmax"),
+            initial_method=initial_method,
+            progress=progress,
+            presolve=presolve,
+            seed=params.get("seed")
+        )
+    elif algorithm == "Genetic Algorithm":
+        return genetic_algorithm(
+            guests=guests,
+            min_per_table=params["min_per_table"],
+            max_per_table=params["max_per_table"],
+            population_size=params["population_size"],
+            generations=params["iterations"],
+            initial_method=initial_method,
+            progress=progress,
+            seed=params.get("seed"),
+            crossover=params.get("crossover", "slice")
+        )
+    elif algorithm == "Hill Climbing":
+        return hill_climbing(
+            guests=guests,
+            min_per_table=params["min_per_table"],
+            max_per_table=params["max_per_table"],
+            iterations=params["iterations"],
+            metrics_points=params.get("metrics_points", 2000),
+            metrics_mode=params.get("metrics_mode", "minmax"),
+            initial_method=initial_method,
+            progress=progress,
+            presolve=presolve,
+            seed=params.get("seed")
+        )
+    elif algorithm == "Island Genetic Algorithm":
+        return island_genetic_algorithm(
+            guests=guests,
+            min_per_table=params["min_per_table"],
+            max_per_table=params["max_per_table"],
+            population_size=params["population_size"],
+            generations=params["iterations"],
+            num_islands=params.get("num_islands", 4),
+            migration_interval=params.get("migration_interval", 20),
+            workers=params.get("workers", 1),
+            initial_method=initial_method,
+            progress=progress,
+            seed=params.get("seed"),
+            crossover=params.get("crossover", "slice")
+        )
+    elif algorithm == "Parallel Tempering":
+        return parallel_tempering(
+            guests=guests,
+            min_per_table=params["min_per_table"],
+            max_per_table=params["max_per_table"],
+            iterations=params["iterations"],
+            num_replicas=params.get("num_replicas", 8),
+            max_temperature=params["initial_temperature"],
+            swap_interval=params.get("swap_interval", 100),
+            workers=params.get("workers", 1),
+            initial_method=initial_method,
+            progress=progress,
+            presolve=presolve,
+            seed=params.get("seed")
+        )
+    elif algorithm == "Tabu Search":
+        return tabu_search(
+            guests=guests,
+            min_per_table=params["min_per_table"],
+            max_per_table=params["max_per_table"],
+            iterations=params["iterations"],
+            tabu_tenure=params.get("tabu_tenure"),
+            candidate_size=params.get("candidate_size"),
+            metrics_points=params.get("metrics_points", 2000),
+            metrics_mode=params.get("metrics_mode", "minmax"),
+            initial_method=initial_method,
+            progress=progress,
+            seed=params.get("seed")
+        )
+    elif algorithm == "Multilevel":
+        return multilevel_search(
+            guests=guests,
+            min_per_table=params["min_per_table"],
+            max_per_table=params["max_per_table"],
+            coarse_starts=params.get("coarse_starts", 8),
+            max_passes=params.get("max_passes", 10),
+            progress=progress,
+            seed=params.get("seed")
+        )
+    else:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+
+# ========================================================================================================================================================
+# Classe: SearchBudget
+# Descrição: Critérios de paragem comuns a todos os algoritmos, usados como callback progress (ver PROGRESS_INTERVAL):
+#   - time_limit: segundos de relógio (medidos desde a criação)
+#   - target_cost: para assim que o melhor custo for <= target_cost
+#   - stagnation: para ao fim de "stagnation" passos do algoritmo sem melhorar (iterações no SA / Hill Climbing / Parallel
+#     Tempering / Tabu Search, gerações nos genéticos); a verificação é feita a cada chamada do callback
+# Regista o traço de convergência (tempo, passo e melhor custo em cada melhoria) e o motivo da paragem. Um progress
+# externo (ex.: o da interface) continua a ser chamado e pode cancelar a execução.
+# ========================================================================================================================================================
+
+class SearchBudget:
+
+    def __init__(self, time_limit=None, target_cost=None, stagnation=None, progress=None):
+        if time_limit is not None and time_limit <= 0:
+            raise ValueError("time_limit deve ser positivo.")
+        if stagnation is not None and (not isinstance(stagnation, int) or stagnation <= 0):
+            raise ValueError("stagnation deve ser um inteiro positivo.")
+
+        self.time_limit = time_limit
+        self.target_cost = target_cost
+        self.stagnation = stagnation
+        self.progress = progress
+
+        self.start = time.perf_counter()
+        self.best_cost = None
+        self.last_improvement = 0
+        self.last_step = 0
+        self.stop_reason = None
+        self.trace = {'time': [], 'step': [], 'best_cost': []}
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def improve(self, step, best_cost):
+        if self.best_cost is None or best_cost < self.best_cost:
+            self.best_cost = best_cost
+            self.last_improvement = step
+            self.trace['time'].append(self.elapsed())
+            self.trace['step'].append(step)
+            self.trace['best_cost'].append(best_cost)
+
+    def __call__(self, step, total, best_cost):
+        self.last_step = step
+        self.improve(step, best_cost)
+
+        if self.progress is not None and self.progress(step, total, best_cost):
+            self.stop_reason = "cancelled"
+        elif self.time_limit is not None and self.elapsed() >= self.time_limit:
+            self.stop_reason = "time_limit"
+        elif self.target_cost is not None and self.best_cost <= self.target_cost:
+            self.stop_reason = "target_cost"
+        elif self.stagnation is not None and step - self.last_improvement >= self.stagnation:
+            self.stop_reason = "stagnation"
+        return self.stop_reason is not None
+
+# ========================================================================================================================================================
+# Função: solve
+# Descrição: Interface "anytime" comum a todos os algoritmos. Corre run_algorithm com um SearchBudget (time_limit, target_cost e
+# stagnation vêm dos argumentos ou, se não forem dados, de params) e devolve a melhor disposição encontrada e as métricas,
+# com o traço de convergência ('trace'), o motivo da paragem ('stop_reason': "completed" se o algoritmo chegou ao fim das
+# iterações) e o tempo total ('elapsed').
+# Com params["polish"] = "first" ou "steepest", a disposição do algoritmo passa ainda por local_search_polish (o resultado
+# fica em metrics['polish']), com o que resta do time_limit; se o tempo já acabou, o polimento não corre.
+# Para limitar só pelo tempo, basta dar um número de iterações alto: o algoritmo para quando o orçamento acabar.
+# ========================================================================================================================================================
+
+def solve(guests, algorithm, params, time_limit=None, target_cost=None, stagnation=None, progress=None):
+
+    problem = problem_model.as_problem(guests)
+    budget = SearchBudget(
+        time_limit=time_limit if time_limit is not None else params.get("time_limit"),
+        target_cost=target_cost if target_cost is not None else params.get("target_cost"),
+        stagnation=stagnation if stagnation is not None else params.get("stagnation"),
+        progress=progress
+    )
+
+    tables, metrics = run_algorithm(problem, algorithm, params, progress=budget)
+
+    # Pós-otimização opcional até um ótimo local (ver local_search_polish)
+    polish = params.get("polish", "off")
+    remaining = None if budget.time_limit is None else budget.time_limit - budget.elapsed()
+    if polish != "off" and budget.stop_reason not in ("cancelled", "time_limit") and (remaining is None or remaining > 0):
+        tables, metrics['polish'] = local_search_polish(problem, tables, params["min_per_table"], params["max_per_table"], polish,
+                                                         progress=progress, time_limit=remaining)
+        if metrics['polish']['stop_reason'] in ("cancelled", "time_limit"):
+            budget.stop_reason = metrics['polish']['stop_reason']
+
+    # A última melhoria pode ter acontecido depois da última chamada do callback
+    budget.improve(budget.last_step, calculate_cost(problem_model.encode_tables(tables, problem), problem))
 
-            if neighbor_cost < best_cost:                                       # Atualiza a melhor disposição se o custo for melhor
-                best = copy.deepcopy(neighbor)                                  
-                best_cost = neighbor_cost 
+    metrics['trace'] = budget.trace
+    metrics['stop_reason'] = budget.stop_reason or "completed"
+    metrics['elapsed'] = budget.elapsed()
+    return tables, metrics
 
-    plotting.plot_hill_climbing_progress(costs, save_dir=output_folder)
-    return best              
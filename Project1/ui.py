@@ -1,4 +1,5 @@
 import pygame
+import Project1.problem as problem_model
 import Project1.seater as seater
 
 # Variáveis globais relacionadas a scrolling
@@ -15,8 +16,7 @@ parameters = {
     "iterations": 1000,
     "cooling_type": "exponential",
     "algorithm": "Simulated Annealing",
-    "population_size": 100,
-    "mutation_rate": 0.05
+    "population_size": 100
 }
 
 # Restrições de alguns dos parâmetros
@@ -58,10 +58,12 @@ def draw_parameters_menu(screen, font, selected_index):
 # ========================================================================================================================================================
 # Função: draw_parameter_selection
 # Descrição: Gera uma interface interativa para a seleção e a personalização de parâmetros específicos de acordo com o algoritmo
-# escolhido (Simulated Annealing, Genetic Algorithm ou Hill Climbing). Permite a navegação entre valores e a seleção
-# através de botões incrementais, decrementais e menus suspensos.
+# escolhido (Simulated Annealing, Genetic Algorithm, Hill Climbing, Parallel Tempering, Island Genetic Algorithm, Tabu Search ou Multilevel). Permite a navegação entre valores e a seleção
+# através de botões incrementais, decrementais e menus suspensos. Ao lado do algoritmo há o seletor do modo de decomposição
+# (params["decompose"], ver decompose.solve_decomposed).
+# Com uma tarefa em curso (job) mostra o progresso e um botão "Cancel" por baixo dos botões de navegação.
 # ========================================================================================================================================================
-def draw_parameter_selection(screen, font, params):
+def draw_parameter_selection(screen, font, params, job=None):
     screen.fill((240, 248, 255)) # Cor de fundo da janela
 
      # Título do menu de parâmetros
@@ -84,31 +86,76 @@ def draw_parameter_selection(screen, font, params):
             ("Cooling Rate", "cooling_rate", 0.01, 1.0),
             ("Iterations", "iterations", 100, 10000),
             ("Cooling Type", "cooling_type", None, None),
+            ("Presolve", "presolve", None, None),
+            ("Polish", "polish", None, None),
         ],
         "Genetic Algorithm": [
             ("Min per Table", "min_per_table", 1, 10),
             ("Max per Table", "max_per_table", 1, 10),
             ("Population Size", "population_size", 10, 500),
-            ("Mutation Rate", "mutation_rate", 0.01, 1.0),
+            ("Crossover", "crossover", None, None),
             ("Generations", "iterations", 100, 10000),
+            ("Presolve", "presolve", None, None),
+            ("Polish", "polish", None, None),
         ],
         "Hill Climbing": [
             ("Min per Table", "min_per_table", 1, 10),
             ("Max per Table", "max_per_table", 1, 10),
-            ("Iterations", "iterations", 100, 10000)
+            ("Iterations", "iterations", 100, 10000),
+            ("Presolve", "presolve", None, None),
+            ("Polish", "polish", None, None)
+        ],
+        "Parallel Tempering": [
+            ("Min per Table", "min_per_table", 1, 10),
+            ("Max per Table", "max_per_table", 1, 10),
+            ("Max Temp", "initial_temperature", 1, 1000),
+            ("Replicas", "num_replicas", 2, 32),
+            ("Iterations", "iterations", 100, 10000),
+            ("Presolve", "presolve", None, None),
+            ("Polish", "polish", None, None)
+        ],
+        "Island Genetic Algorithm": [
+            ("Min per Table", "min_per_table", 1, 10),
+            ("Max per Table", "max_per_table", 1, 10),
+            ("Island Pop. Size", "population_size", 10, 500),
+            ("Islands", "num_islands", 2, 32),
+            ("Crossover", "crossover", None, None),
+            ("Generations", "iterations", 100, 10000),
+            ("Presolve", "presolve", None, None),
+            ("Polish", "polish", None, None),
+        ],
+        "Tabu Search": [
+            ("Min per Table", "min_per_table", 1, 10),
+            ("Max per Table", "max_per_table", 1, 10),
+            ("Iterations", "iterations", 100, 10000),
+            ("Polish", "polish", None, None)
+        ],
+        "Multilevel": [
+            ("Min per Table", "min_per_table", 1, 10),
+            ("Max per Table", "max_per_table", 1, 10),
+            ("Coarse Starts", "coarse_starts", 1, 64),
+            ("Polish", "polish", None, None)
         ]
     }
 
      # Seleciona o algoritmo
     algorithm_label = font.render("Algorithm:", True, (0, 0, 0))
     screen.blit(algorithm_label, (50, y))
-    algorithm_rect = pygame.Rect(0, y, 210, 30)
+    algorithm_rect = pygame.Rect(0, y, 260, 30)
     algorithm_rect.centerx = screen.get_width() // 2 + 50
     pygame.draw.rect(screen, (255, 255, 255), algorithm_rect)
     pygame.draw.rect(screen, (0, 0, 0), algorithm_rect, 2)
     algorithm_text = font.render(params["algorithm"], True, (0, 0, 0))
     screen.blit(algorithm_text, algorithm_text.get_rect(center=algorithm_rect.center))
     buttons.append((algorithm_rect, "algorithm", None))
+
+    # Modo de decomposição (vale para todos os algoritmos, por isso fica na linha do algoritmo)
+    decompose_rect = pygame.Rect(algorithm_rect.right + 10, y, screen.get_width() - algorithm_rect.right - 20, 30)
+    pygame.draw.rect(screen, (255, 255, 255), decompose_rect)
+    pygame.draw.rect(screen, (0, 0, 0), decompose_rect, 2)
+    decompose_text = font.render(f"Decompose: {params.get('decompose', 'off')}", True, (0, 0, 0))
+    screen.blit(decompose_text, decompose_text.get_rect(center=decompose_rect.center))
+    buttons.append((decompose_rect, "decompose", "cycle"))
     y += 50
 
     #  Parâmetros para o algoritmo selecionado
@@ -123,8 +170,8 @@ def draw_parameter_selection(screen, font, params):
         value_rect = pygame.Rect(0, y, 150, 30)
         value_rect.centerx = center_x
 
-        if key == "cooling_type":
-            # Campo de seleção para o tipo de arrefecimento do  Simmulated Annealing
+        if key in ("cooling_type", "crossover", "presolve", "polish"):
+            # Campo de seleção (tipo de arrefecimento do Simmulated Annealing, crossover dos genéticos, pré-resolução ou pós-otimização)
             pygame.draw.rect(screen, (255, 255, 255), value_rect)
             pygame.draw.rect(screen, (0, 0, 0), value_rect, 2)
             type_text = font.render(str(params.get(key, "")), True, (0, 0, 0))
@@ -173,7 +220,12 @@ def draw_parameter_selection(screen, font, params):
         screen.blit(text_surface, text_surface.get_rect(center=button.center))
         buttons_rects.append(button)
 
-    return buttons, *buttons_rects
+    # Progresso da tarefa em curso
+    cancel_button = None
+    if job is not None:
+        cancel_button = draw_job_status(screen, font, job, start_x, y_button + button_height + 15)
+
+    return buttons, *buttons_rects, cancel_button
 
 
 
@@ -373,10 +425,11 @@ def draw_main_menu(screen, font):
 
 # ========================================================================================================================================================
 # Função: draw_seating_arrangement
-# Descrição: Desenha a disposição das mesas e convidados, exibindo o título, a pontuação da disposição atual, pontuação teórica perfeita e 
-# a percentagem de otimização. Também exibe os botões "Back" e "Retry".
+# Descrição: Desenha a disposição das mesas e convidados, exibindo o título, a pontuação da disposição atual, pontuação teórica perfeita e,
+# se houver (listas pequenas, ver exact.EXACT_GUEST_LIMIT), a pontuação ótima do branch and bound e a distância a ela (reference).
+# Também exibe os botões "Back" e "Retry" (e o progresso com "Cancel" durante um Retry).
 # ========================================================================================================================================================
-def draw_seating_arrangement(screen, tables, font, score=None, guests=None):
+def draw_seating_arrangement(screen, tables, font, score=None, guests=None, job=None, reference=None):
     screen.fill((240, 248, 255)) # Cor da Janela
     
     # Titulo
@@ -395,11 +448,12 @@ def draw_seating_arrangement(screen, tables, font, score=None, guests=None):
         perfect_text = font.render(f'Perfect Score: {perfect_score}', True, (100, 100, 100))
         screen.blit(perfect_text, (screen.get_width() - 300, 45))
         
-        # Percentagem de quão próxima está do ideal
-        if perfect_score > 0:  
-            percentage = min(100, max(0, (score / perfect_score) * 100))
-            percentage_text = font.render(f'Optimality: {percentage:.1f}%', True, (0, 0, 100))
-            screen.blit(percentage_text, (screen.get_width() - 300, 70))
+        # Distância ao ótimo provado pelo branch and bound (o score perfeito quase nunca é atingível)
+        if reference is not None and reference['optimal']:
+            best_score = -reference['cost']
+            gap = (best_score - score) / abs(best_score) * 100 if best_score else 0
+            optimum_text = font.render(f'Optimum: {round(best_score, 2)} (gap {gap:.1f}%)', True, (0, 0, 100))
+            screen.blit(optimum_text, (screen.get_width() - 300, 70))
     
     # Desenha cada mesa e seus convidados
     y_offset = 80 - scroll_offset['seating']
@@ -429,8 +483,28 @@ def draw_seating_arrangement(screen, tables, font, score=None, guests=None):
     text = font.render('Retry', True, (255, 255, 255))
     text_rect = text.get_rect(center=(120 + 100 // 2, screen.get_height() - 40))
     screen.blit(text, text_rect)
+
+    # Progresso do Retry em curso
+    cancel_button = None
+    if job is not None:
+        cancel_button = draw_job_status(screen, font, job, 230, screen.get_height() - 55)
     
-    return back_button, retry_button
+    return back_button, retry_button, cancel_button
+
+# ========================================================================================================================================================
+# Função: draw_job_status
+# Descrição: Desenha o botão "Cancel" e o estado de uma tarefa em segundo plano (passo atual e melhor custo até agora).
+# Devolve o retângulo do botão.
+# ========================================================================================================================================================
+def draw_job_status(screen, font, job, x, y):
+    cancel_button = pygame.Rect(x, y, 100, 30)
+    pygame.draw.rect(screen, (255, 149, 0), cancel_button, border_radius=10)
+    cancel_text = font.render('Cancel', True, (0, 0, 0))
+    screen.blit(cancel_text, cancel_text.get_rect(center=cancel_button.center))
+
+    status_text = font.render(job.status_text(), True, (0, 0, 100))
+    screen.blit(status_text, (x + 110, y + 5))
+    return cancel_button
 
 # ========================================================================================================================================================
 # Função: handle_scroll_event
@@ -453,7 +527,7 @@ def calculate_perfect_score(tables, guests=None):
     if guests is None:
         # Estimativa aproximada caso os dados não estejam disponíveis
         total_guests = sum(len(table) for table in tables)
-        # Assume 3 preferências por convidado, 10 pontos cada
-        return total_guests * 3 * 10
+        # Assume 3 preferências por convidado, com os pontos do modelo de pontuação por omissão
+        return total_guests * 3 * problem_model.DEFAULT_SCORING.prefer_weight
     else:        
         return seater.calculate_theoretical_perfect_score(guests)
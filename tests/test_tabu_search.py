@@ -0,0 +1,78 @@
+import copy
+import random
+
+import numpy as np
+import pytest
+
+import Project1.problem as problem_model
+import Project1.seater as seater
+
+# ========================================================================================================================================================
+# Testes: o melhor movimento do tabu_search em modo vizinhança inteira (_tabu_full_move) tem de ser o melhor de todos os
+# movimentos e trocas permitidos, avaliados à força bruta com calculate_cost, com e sem convidados tabu (aspiração).
+# ========================================================================================================================================================
+
+MIN_PER_TABLE, MAX_PER_TABLE = 3, 6
+
+
+def random_guests(num_guests, rng):
+    names = [f"G{i}" for i in range(num_guests)]
+    guests = {}
+    for name in names:
+        others = [other for other in names if other != name]
+        picks = rng.sample(others, rng.randint(0, 5))
+        split = rng.randint(0, len(picks))
+        guests[name] = {'prefers': picks[:split], 'avoids': picks[split:]}
+    return guests
+
+
+def brute_force_best(problem, tables, tabu, current_cost, best_cost):
+    best = np.inf
+
+    def consider(candidate, guests_moved):
+        nonlocal best
+        delta = seater.calculate_cost(candidate, problem) - current_cost
+        if any(tabu[guest] for guest in guests_moved) and current_cost + delta >= best_cost - 1e-9:
+            return
+        best = min(best, delta)
+
+    for a, table in enumerate(tables):
+        for guest in table:
+            for b, other_table in enumerate(tables):
+                if b == a:
+                    continue
+                if len(table) - 1 >= MIN_PER_TABLE and len(other_table) + 1 <= MAX_PER_TABLE:
+                    candidate = copy.deepcopy(tables)
+                    candidate[a].remove(guest)
+                    candidate[b].append(guest)
+                    consider(candidate, [guest])
+                if b > a:
+                    for other in other_table:
+                        candidate = copy.deepcopy(tables)
+                        candidate[a][candidate[a].index(guest)] = other
+                        candidate[b][candidate[b].index(other)] = guest
+                        consider(candidate, [guest, other])
+    return best
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_full_move_matches_brute_force(seed):
+    rng = random.Random(seed)
+    problem = problem_model.as_problem(random_guests(rng.randint(12, 24), rng))
+    tables = seater.create_balanced_seating(problem, MIN_PER_TABLE, MAX_PER_TABLE, "random", rng)
+    state = seater.create_seating_state(tables, problem.num_guests)
+    view = seater._TableAffinity(problem, state)
+
+    tabu = np.zeros(problem.num_guests + 1, dtype=bool)
+    if seed % 2:
+        tabu[rng.sample(range(problem.num_guests), rng.randint(1, 5))] = True
+    current_cost = seater.calculate_cost(state['tables'], problem)
+    best_cost = current_cost - rng.choice([0, 5, 20])
+
+    move, delta = seater._tabu_full_move(view, seater._related_pairs(problem), tabu, current_cost, best_cost, MIN_PER_TABLE,
+                                         MAX_PER_TABLE, problem.scoring)
+    assert delta == pytest.approx(brute_force_best(problem, state['tables'], tabu, current_cost, best_cost))
+
+    # A variação devolvida é a do movimento escolhido
+    seater.apply_move(state, move)
+    assert seater.calculate_cost(state['tables'], problem) - current_cost == pytest.approx(delta)